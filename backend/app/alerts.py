@@ -0,0 +1,460 @@
+"""
+Bildirim outbox'ı ve arka plan göndericisi
+
+Ingest, çalıştırmanın aynı kelimenin önceki çalıştırmasına göre farkından
+(`app.run_diff.store_run_diff`) `position_alerts` ile uyarıları üretir:
+eşiği aşan pozisyon değişimleri, kritik düşüşler ve ilk
+`ALERT_ENTRY_EXIT_TOP` sıraya giren / sonuçlardan çıkan URL'ler. Uyarılar
+`enqueue_alerts` ile sitenin veritabanındaki `alert_outbox` tablosuna,
+aramayla aynı transaction içinde yazar; günlük özet de aynı tabloya eklenir
+(`enqueue_daily_summary`).
+Her satırın bir tekillik anahtarı vardır (tür:çalıştırma:url), aynı uyarı
+ikinci kez eklenmez. Commit sonrası `alert_dispatcher.notify` göndericiyi
+uyandırır; SMTP'ye hiçbir zaman ingest thread'inden bağlanılmaz.
+
+Gönderici kendi event loop'unu tek bir arka plan thread'inde çalıştırır.
+Uyandırıldıktan sonra `ALERT_DIGEST_WINDOW_SECONDS` bekler (aynı anda
+çalışan diğer kelime ve sitelerin uyarıları da aynı özete girsin), ardından
+tüm sitelerin zamanı gelmiş satırlarını `ALERT_OUTBOX_BATCH`'lik parçalar
+halinde okur: pozisyon uyarıları alıcılara tek bir özet email olarak,
+günlük özetler ayrı email'ler olarak gönderilir. Tüm email'ler
+`email_service`'in aynı SMTP bağlantısını kullanır. Gönderilemeyen satırlar
+üstel artan bekleme (`ALERT_RETRY_BASE_SECONDS` × 2^deneme, en fazla
+`ALERT_RETRY_MAX_SECONDS`) ile tekrar denenir, `ALERT_MAX_ATTEMPTS`
+denemeden sonra `failed` olarak bırakılır. Gönderici ayrıca
+`ALERT_OUTBOX_POLL_SECONDS`'ta bir tabloyu kontrol eder; böylece process
+yeniden başladığında ya da SMTP geri geldiğinde bekleyen bildirimler
+gönderilir.
+
+Bir URL için uyarı gönderildikten sonra `ALERT_COOLDOWN_MINUTES` boyunca
+aynı URL'nin yeni uyarıları `suppressed` olarak işaretlenir; bekleme
+süresinde kritik düşüşe dönen ya da sonuçlardan çıkan URL yine de
+bildirilir. Aynı turda bir URL'nin birden fazla uyarısı varsa en yenisi
+gönderilir; eskiler ancak özet gönderildikten sonra `suppressed` olur,
+gönderim başarısızsa onlar da tekrar denenir. Email kapalıysa satırlar
+`skipped` olur. Sonuçlanan satırlar
+`ALERT_OUTBOX_RETENTION_DAYS` gün sonra silinir.
+
+Ayarlar:
+    ALERT_CHANGE_THRESHOLD       Uyarı için en az pozisyon değişimi (varsayılan 3)
+    ALERT_CRITICAL_DROP          Kritik sayılan en az pozisyon düşüşü (varsayılan 5)
+    ALERT_ENTRY_EXIT_TOP         Bu sıraya giren / bu sıradan sonuçlardan çıkan URL'ler için uyarı (varsayılan 3, 0: kapalı)
+    ALERT_DIGEST_WINDOW_SECONDS  Uyarıların tek email'de toplandığı süre (varsayılan 30)
+    ALERT_COOLDOWN_MINUTES       Aynı URL için tekrar uyarı gönderilmeyen süre (varsayılan 60)
+    ALERT_OUTBOX_BATCH           Site başına tek seferde okunan satır (varsayılan 500)
+    ALERT_OUTBOX_POLL_SECONDS    Bekleyen satırların kontrol aralığı (varsayılan 60)
+    ALERT_RETRY_BASE_SECONDS     İlk tekrar denemeden önceki bekleme (varsayılan 60)
+    ALERT_RETRY_MAX_SECONDS      En uzun tekrar deneme beklemesi (varsayılan 3600)
+    ALERT_MAX_ATTEMPTS           En fazla gönderim denemesi (varsayılan 10)
+    ALERT_OUTBOX_RETENTION_DAYS  Sonuçlanan satırların saklanma süresi (varsayılan 30)
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import orjson
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.database import AlertOutbox, get_session_maker
+from app.email_service import email_service
+from app.metrics import alerts_total, alert_digests_total
+
+logger = logging.getLogger(__name__)
+
+ALERT_CHANGE_THRESHOLD = int(os.getenv("ALERT_CHANGE_THRESHOLD", "3"))
+ALERT_CRITICAL_DROP = int(os.getenv("ALERT_CRITICAL_DROP", "5"))
+ALERT_ENTRY_EXIT_TOP = int(os.getenv("ALERT_ENTRY_EXIT_TOP", "3"))
+ALERT_DIGEST_WINDOW_SECONDS = float(os.getenv("ALERT_DIGEST_WINDOW_SECONDS", "30"))
+ALERT_COOLDOWN_MINUTES = float(os.getenv("ALERT_COOLDOWN_MINUTES", "60"))
+ALERT_OUTBOX_BATCH = int(os.getenv("ALERT_OUTBOX_BATCH", "500"))
+ALERT_OUTBOX_POLL_SECONDS = float(os.getenv("ALERT_OUTBOX_POLL_SECONDS", "60"))
+ALERT_RETRY_BASE_SECONDS = float(os.getenv("ALERT_RETRY_BASE_SECONDS", "60"))
+ALERT_RETRY_MAX_SECONDS = float(os.getenv("ALERT_RETRY_MAX_SECONDS", "3600"))
+ALERT_MAX_ATTEMPTS = int(os.getenv("ALERT_MAX_ATTEMPTS", "10"))
+ALERT_OUTBOX_RETENTION_DAYS = float(os.getenv("ALERT_OUTBOX_RETENTION_DAYS", "30"))
+
+DAILY_SUMMARY = "daily_summary"
+# Bekleme süresinde daha önce gönderilmemişse yine de bildirilen türler
+ESCALATING_KINDS = ("critical", "exited")
+_PURGE_INTERVAL_SECONDS = 3600
+
+
+def classify_change(old_position: int, new_position: int) -> Optional[str]:
+    """Pozisyon değişiminin uyarı türü ("critical", "change") ya da None
+
+    Kritik düşüş aynı zamanda değişim eşiğini de geçer; URL başına tek uyarı
+    üretilir.
+    """
+    change = new_position - old_position
+    if change >= ALERT_CRITICAL_DROP:
+        return "critical"
+    if abs(change) >= ALERT_CHANGE_THRESHOLD:
+        return "change"
+    return None
+
+
+class PositionAlert:
+    """Bir URL'nin tek çalıştırmadaki pozisyon değişimi
+
+    Yeni giren URL'de (`entered`) eski, sonuçlardan çıkan URL'de (`exited`)
+    yeni pozisyon None'dır.
+    """
+
+    __slots__ = ("kind", "site_id", "keyword", "url", "domain", "old_position", "new_position")
+
+    def __init__(
+        self,
+        kind: str,
+        site_id: str,
+        keyword: Optional[str],
+        url: str,
+        domain: str,
+        old_position: Optional[int],
+        new_position: Optional[int]
+    ):
+        self.kind = kind
+        self.site_id = site_id
+        self.keyword = keyword
+        self.url = url
+        self.domain = domain
+        self.old_position = old_position
+        self.new_position = new_position
+
+    @property
+    def change(self) -> Optional[int]:
+        """Yeni pozisyon eksi eski pozisyon (pozitif: düşüş); giren/çıkan URL'de None"""
+        if self.old_position is None or self.new_position is None:
+            return None
+        return self.new_position - self.old_position
+
+    @property
+    def severe(self) -> bool:
+        return self.kind in ESCALATING_KINDS
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PositionAlert":
+        return cls(**{name: data.get(name) for name in cls.__slots__})
+
+
+def position_alerts(site_id: str, diff: Dict) -> List[PositionAlert]:
+    """Çalıştırma farkından (`app.run_diff.compute_diff`) URL başına en fazla bir uyarı üretir"""
+    keyword = diff.get("search_query")
+    alerts = []
+    for item in diff["moved"]:
+        kind = classify_change(item["previous_position"], item["position"])
+        if kind:
+            alerts.append(PositionAlert(
+                kind, site_id, keyword, item["url"], item["domain"], item["previous_position"], item["position"]
+            ))
+    for item in diff["entered"]:
+        if item["position"] <= ALERT_ENTRY_EXIT_TOP:
+            alerts.append(PositionAlert("entered", site_id, keyword, item["url"], item["domain"], None, item["position"]))
+    for item in diff["exited"]:
+        if item["previous_position"] <= ALERT_ENTRY_EXIT_TOP:
+            alerts.append(PositionAlert(
+                "exited", site_id, keyword, item["url"], item["domain"], item["previous_position"], None
+            ))
+    return alerts
+
+
+def enqueue_alerts(db: Session, search_result_id: int, alerts: Sequence[PositionAlert]) -> int:
+    """Pozisyon uyarılarını outbox'a ekler (ingest transaction'ı içinde; commit çağıran tarafta)"""
+    if not alerts:
+        return 0
+    now = datetime.utcnow()
+    stmt = sqlite_insert(AlertOutbox).values([
+        {
+            "dedupe_key": f"{alert.kind}:{search_result_id}:{alert.url}",
+            "kind": alert.kind,
+            "url": alert.url,
+            "search_result_id": search_result_id,
+            "payload": orjson.dumps(alert.to_dict()).decode(),
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        }
+        for alert in alerts
+    ])
+    db.execute(stmt.on_conflict_do_nothing(index_elements=["dedupe_key"]))
+    return len(alerts)
+
+
+def enqueue_daily_summary(db: Session, date: str, summary: Dict) -> None:
+    """Günlük özeti outbox'a ekler; aynı gün için ikinci özet eklenmez (commit çağıran tarafta)"""
+    now = datetime.utcnow()
+    stmt = sqlite_insert(AlertOutbox).values(
+        dedupe_key=f"{DAILY_SUMMARY}:{date}",
+        kind=DAILY_SUMMARY,
+        payload=orjson.dumps(summary).decode(),
+        status="pending",
+        attempts=0,
+        next_attempt_at=now,
+        created_at=now
+    )
+    db.execute(stmt.on_conflict_do_nothing(index_elements=["dedupe_key"]))
+
+
+def retry_delay(attempts: int) -> float:
+    """`attempts`. başarısız denemeden sonraki bekleme (saniye)"""
+    return min(ALERT_RETRY_BASE_SECONDS * 2 ** (attempts - 1), ALERT_RETRY_MAX_SECONDS)
+
+
+class _DueRows:
+    """Bir sitenin bu turda gönderilecek satırları"""
+
+    def __init__(self, site_id: str):
+        self.site_id = site_id
+        self.alerts: List[Tuple[int, PositionAlert]] = []
+        # Aynı URL'nin daha yeni uyarısıyla birlikte okunan satırlar (id, tür)
+        self.duplicates: List[Tuple[int, str]] = []
+        self.summaries: List[Tuple[int, Dict]] = []
+        self.full = False
+
+
+def _load_due(site_id: str, cooldown_seconds: float, purge: bool) -> _DueRows:
+    """Zamanı gelmiş satırları okur; bekleme süresinde gönderilmiş URL'lerin uyarılarını `suppressed` yapar
+
+    Aynı turdaki tekrarlar burada işaretlenmez (`_DueRows.duplicates`),
+    sonuçları özetin gönderim sonucuna göre yazılır.
+    """
+    now = datetime.utcnow()
+    due = _DueRows(site_id)
+    db = get_session_maker(site_id)()
+    try:
+        rows = db.query(AlertOutbox.id, AlertOutbox.kind, AlertOutbox.url, AlertOutbox.payload).filter(
+            AlertOutbox.status == "pending",
+            AlertOutbox.next_attempt_at <= now
+        ).order_by(AlertOutbox.id).limit(ALERT_OUTBOX_BATCH).all()
+        due.full = len(rows) >= ALERT_OUTBOX_BATCH
+
+        urls = {url for _, kind, url, _ in rows if kind != DAILY_SUMMARY}
+        # URL -> bekleme süresi içinde gönderilmiş uyarı türleri
+        recent: Dict[str, Set[str]] = {}
+        if urls:
+            for url, kind in db.query(AlertOutbox.url, AlertOutbox.kind).filter(
+                AlertOutbox.url.in_(urls),
+                AlertOutbox.sent_at >= now - timedelta(seconds=cooldown_seconds)
+            ):
+                recent.setdefault(url, set()).add(kind)
+
+        # URL -> bu turda gönderilecek uyarı türleri; en yeni satır önce seçilir
+        batch: Dict[str, Set[str]] = {}
+        suppressed = []
+        for row_id, kind, url, payload in reversed(rows):
+            if kind == DAILY_SUMMARY:
+                due.summaries.append((row_id, orjson.loads(payload)))
+                continue
+            sent_kinds = recent.get(url)
+            if sent_kinds and not (kind in ESCALATING_KINDS and kind not in sent_kinds):
+                suppressed.append(row_id)
+                alerts_total.inc(kind=kind, outcome="suppressed")
+                continue
+            kept_kinds = batch.setdefault(url, set())
+            if kept_kinds and not (kind in ESCALATING_KINDS and kind not in kept_kinds):
+                due.duplicates.append((row_id, kind))
+                continue
+            kept_kinds.add(kind)
+            due.alerts.append((row_id, PositionAlert.from_dict(orjson.loads(payload))))
+        due.alerts.reverse()
+        due.summaries.reverse()
+
+        if suppressed:
+            db.query(AlertOutbox).filter(AlertOutbox.id.in_(suppressed)).update(
+                {"status": "suppressed"}, synchronize_session=False
+            )
+        if purge:
+            db.query(AlertOutbox).filter(
+                AlertOutbox.status != "pending",
+                AlertOutbox.created_at < now - timedelta(days=ALERT_OUTBOX_RETENTION_DAYS)
+            ).delete(synchronize_session=False)
+        db.commit()
+        return due
+    finally:
+        db.close()
+
+
+def _mark(site_id: str, ids: Sequence[int], outcome: str, error: Optional[str] = None):
+    """Satırların gönderim sonucunu kaydeder; başarısızları tekrar denemeye planlar"""
+    if not ids:
+        return
+    now = datetime.utcnow()
+    db = get_session_maker(site_id)()
+    try:
+        if outcome != "error":
+            db.query(AlertOutbox).filter(AlertOutbox.id.in_(ids)).update(
+                {"status": outcome, "sent_at": now if outcome == "sent" else None}, synchronize_session=False
+            )
+        else:
+            for row in db.query(AlertOutbox).filter(AlertOutbox.id.in_(ids)):
+                row.attempts = (row.attempts or 0) + 1
+                row.last_error = error
+                if row.attempts >= ALERT_MAX_ATTEMPTS:
+                    row.status = "failed"
+                else:
+                    row.next_attempt_at = now + timedelta(seconds=retry_delay(row.attempts))
+        db.commit()
+    finally:
+        db.close()
+
+
+class AlertDispatcher:
+    """Outbox'ı boşaltan, kendi event loop'u olan arka plan göndericisi"""
+
+    def __init__(self, window_seconds: float = ALERT_DIGEST_WINDOW_SECONDS, cooldown_seconds: float = ALERT_COOLDOWN_MINUTES * 60):
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._sites: Set[str] = set()
+        # Aşağıdakiler sadece loop thread'inde kullanılır
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._purged_at: Dict[str, float] = {}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=self._run_loop, args=(loop,), name="alert-dispatcher", daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def _run_loop(self, loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._serve())
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def start(self, site_ids: Iterable[str]):
+        """Göndericiyi başlatır; önceki process'ten kalan bekleyen satırlar da gönderilir"""
+        self._sites.update(site_ids)
+        self._ensure_loop()
+
+    def notify(self, site_id: str):
+        """Siteye yeni outbox satırı eklendiğini bildirir (commit sonrası, herhangi bir thread'den)"""
+        self._sites.add(site_id)
+        self._ensure_loop().call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        self._wakeup.set()
+
+    async def _serve(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), ALERT_OUTBOX_POLL_SECONDS)
+                # Pencere içinde biten diğer çalıştırmaların uyarıları da aynı özete girsin
+                await asyncio.sleep(self.window_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                if await self._drain():
+                    self._wakeup.set()
+            except Exception as e:
+                logger.error(f"Bildirim outbox'ı işlenemedi: {e}", exc_info=True)
+
+    async def _drain(self) -> bool:
+        """Tüm sitelerin zamanı gelmiş satırlarını gönderir; sırada satır kaldıysa True döner"""
+        now = time.monotonic()
+        batches: List[_DueRows] = []
+        for site_id in sorted(self._sites):
+            purge = now - self._purged_at.get(site_id, 0.0) >= _PURGE_INTERVAL_SECONDS
+            batches.append(await asyncio.to_thread(_load_due, site_id, self.cooldown_seconds, purge))
+            if purge:
+                self._purged_at[site_id] = now
+
+        alerts = [alert for due in batches for _, alert in due.alerts]
+        if not email_service.enabled or not email_service.recipients:
+            for due in batches:
+                await asyncio.to_thread(
+                    _mark, due.site_id,
+                    [row_id for row_id, _ in due.alerts + due.duplicates + due.summaries], "skipped"
+                )
+                for _, kind in due.duplicates:
+                    alerts_total.inc(kind=kind, outcome="skipped")
+            for alert in alerts:
+                alerts_total.inc(kind=alert.kind, outcome="skipped")
+            return any(due.full for due in batches)
+
+        if alerts:
+            error = None
+            try:
+                sent = await email_service.send_alert_digest(alerts)
+            except Exception as e:
+                logger.error(f"Uyarı özeti gönderilemedi: {e}", exc_info=True)
+                sent, error = False, str(e)
+            alert_digests_total.inc(outcome="sent" if sent else "failed")
+            for alert in alerts:
+                alerts_total.inc(kind=alert.kind, outcome="sent" if sent else "retry")
+            for due in batches:
+                if sent:
+                    await asyncio.to_thread(_mark, due.site_id, [row_id for row_id, _ in due.alerts], "sent")
+                    await asyncio.to_thread(_mark, due.site_id, [row_id for row_id, _ in due.duplicates], "suppressed")
+                    for _, kind in due.duplicates:
+                        alerts_total.inc(kind=kind, outcome="suppressed")
+                else:
+                    # Tekrarlar da özetle birlikte yeniden denenir
+                    await asyncio.to_thread(
+                        _mark, due.site_id, [row_id for row_id, _ in due.alerts + due.duplicates],
+                        "error", error or "SMTP gönderimi başarısız"
+                    )
+            logger.info(f"Uyarı özeti: {len(alerts)} uyarı, gönderildi={sent}")
+
+        for due in batches:
+            for row_id, summary in due.summaries:
+                error = None
+                try:
+                    sent = await email_service.send_daily_summary(**summary)
+                except Exception as e:
+                    logger.error(f"Günlük özet gönderilemedi: {e}", exc_info=True)
+                    sent, error = False, str(e)
+                alerts_total.inc(kind=DAILY_SUMMARY, outcome="sent" if sent else "retry")
+                await asyncio.to_thread(
+                    _mark, due.site_id, [row_id], "sent" if sent else "error", error or "SMTP gönderimi başarısız"
+                )
+        return any(due.full for due in batches)
+
+    async def _close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await email_service.close()
+
+    def shutdown(self, timeout: float = 10.0):
+        """Göndericiyi durdurur ve SMTP bağlantısını kapatır (bekleyen satırlar outbox'ta kalır)"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(), loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"Uyarı dispatcher'ı kapatılırken hata: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+
+# Global dispatcher
+alert_dispatcher = AlertDispatcher()
+
+
+def shutdown_alerts():
+    alert_dispatcher.shutdown()
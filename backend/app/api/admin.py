@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+import logging
+import time
+from app.dependencies import require_admin
+from app.profiler import (
+    profile_for, get_profile, ProfilerBusy, Profile, PROFILE_MAX_SECONDS, PROFILE_DEFAULT_INTERVAL_MS
+)
+from app.responses import FastJSONResponse
+
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["admin"],
+    default_response_class=FastJSONResponse,
+    dependencies=[Depends(require_admin)]
+)
+logger = logging.getLogger(__name__)
+
+
+def profile_response(profile: Profile, format: str, filename: str):
+    """Profili istenen formatta indirilebilir dosya olarak döndürür"""
+    if format == "speedscope":
+        return FastJSONResponse(
+            profile.to_speedscope(),
+            headers={"Content-Disposition": f"attachment; filename={filename}.speedscope.json"}
+        )
+    return PlainTextResponse(
+        profile.to_collapsed(),
+        headers={"Content-Disposition": f"attachment; filename={filename}.collapsed.txt"}
+    )
+
+
+@router.get("/profile")
+def profile_process(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS, description="Profil süresi (saniye)"),
+    interval_ms: float = Query(PROFILE_DEFAULT_INTERVAL_MS, ge=1, le=1000, description="Örnekleme aralığı"),
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope)$"),
+    include_idle: bool = Query(False, description="Boşta bekleyen thread stack'lerini de dahil et")
+):
+    """Tüm process'i (API ve scheduler thread'leri) belirtilen süre boyunca örnekler"""
+    try:
+        profile = profile_for(seconds, interval_ms, skip_idle=not include_idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    logger.info(f"Profil alındı: {seconds}s, {sum(profile.samples.values())} örnek")
+    return profile_response(profile, format, f"profile-{int(time.time())}")
+
+
+@router.get("/profile/{profile_id}")
+def get_request_profile(
+    profile_id: str,
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope)$")
+):
+    """`X-Profile` başlığıyla profillenen bir isteğin sonucunu döndürür"""
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profil bulunamadı")
+    return profile_response(profile, format, f"request-{profile_id}")
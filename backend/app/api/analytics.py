@@ -3,16 +3,21 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, distinct, and_, or_
 from datetime import datetime, timedelta
 from typing import List, Optional
+import numpy as np
 from app.database import get_db, SearchResult, SearchLink, SearchSettings, init_db
 from app.models import LinkStatsResponse
+from app.rank_matrix import rank_matrix_store
+from app.share_of_voice import market_share, share_timeseries
+from app.responses import FastJSONResponse, rows_response
 
-router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+router = APIRouter(prefix="/api/analytics", tags=["analytics"], default_response_class=FastJSONResponse)
 
 
 @router.get("/position-trend")
 def get_position_trend(
     url: Optional[str] = Query(None, description="Belirli bir URL için trend"),
     days: int = Query(30, description="Kaç günlük veri"),
+    format: str = Query("daily", description="daily (tarihe göre gruplu) veya columnar (URL sözlüğü + tarih ekseni + pozisyon matrisi)"),
     site_id: str = Query("default", description="Site ID"),
     db: Session = Depends(get_db)
 ):
@@ -44,27 +49,65 @@ def get_position_trend(
         func.date(SearchResult.search_date).asc()
     ).all()
     
+    if format == "columnar":
+        return FastJSONResponse(_columnar_trend(results))
+    
     # Günlere göre grupla
     daily_data = {}
-    for row in results:
-        date_str = row.date.isoformat() if hasattr(row.date, 'isoformat') else str(row.date)
-        if date_str not in daily_data:
-            daily_data[date_str] = []
-        daily_data[date_str].append({
-            "url": row.url,
-            "domain": row.domain or "",
-            "avg_position": float(row.avg_position),
-            "min_position": row.min_position,
-            "max_position": row.max_position,
-            "count": row.count
+    for date, row_url, domain, avg_position, min_position, max_position, count in results:
+        date_str = date.isoformat() if hasattr(date, 'isoformat') else str(date)
+        day_rows = daily_data.get(date_str)
+        if day_rows is None:
+            day_rows = daily_data[date_str] = []
+        day_rows.append({
+            "url": row_url,
+            "domain": domain or "",
+            "avg_position": float(avg_position),
+            "min_position": min_position,
+            "max_position": max_position,
+            "count": count
         })
     
-    return {
+    return FastJSONResponse({
         "daily_data": daily_data,
         "summary": {
             "total_days": len(daily_data),
             "total_records": sum(len(v) for v in daily_data.values())
         }
+    })
+
+
+def _columnar_trend(rows) -> dict:
+    """Gruplu sorgu satırlarını URL × tarih yoğun pozisyon matrisine çevirir (eksik günler null)"""
+    if not rows:
+        return {
+            "format": "columnar",
+            "dates": [],
+            "urls": [],
+            "domains": [],
+            "positions": [],
+            "summary": {"total_days": 0, "total_urls": 0, "total_records": 0}
+        }
+    
+    dates, urls, domains, avg_positions = list(zip(*rows))[:4]
+    date_axis, date_idx = np.unique(np.array([str(d) for d in dates], dtype=object), return_inverse=True)
+    url_axis, first_idx, url_idx = np.unique(np.array(urls, dtype=object), return_index=True, return_inverse=True)
+    
+    matrix = np.full((len(url_axis), len(date_axis)), np.nan)
+    matrix[url_idx, date_idx] = np.round(np.array(avg_positions, dtype=np.float64), 2)
+    positions = np.where(np.isnan(matrix), None, matrix).tolist()
+    
+    return {
+        "format": "columnar",
+        "dates": date_axis.tolist(),
+        "urls": url_axis.tolist(),
+        "domains": [d or "" for d in np.array(domains, dtype=object)[first_idx].tolist()],
+        "positions": positions,
+        "summary": {
+            "total_days": len(date_axis),
+            "total_urls": len(url_axis),
+            "total_records": len(rows)
+        }
     }
 
 
@@ -77,35 +120,8 @@ def get_domain_distribution(
 ):
     """Domain dağılımını getirir"""
     since_date = datetime.utcnow() - timedelta(days=days)
-    
-    results = db.query(
-        SearchLink.domain,
-        func.count(SearchLink.id).label("total_links"),
-        func.count(distinct(SearchLink.url)).label("unique_urls"),
-        func.avg(SearchLink.position).label("avg_position"),
-        func.min(SearchLink.position).label("best_position")
-    ).join(
-        SearchResult, SearchLink.search_result_id == SearchResult.id
-    ).filter(
-        SearchResult.search_date >= since_date,
-        SearchLink.domain.isnot(None),
-        SearchLink.domain != ""
-    ).group_by(
-        SearchLink.domain
-    ).order_by(
-        func.count(SearchLink.id).desc()
-    ).limit(limit).all()
-    
-    return [
-        {
-            "domain": row.domain,
-            "total_links": row.total_links,
-            "unique_urls": row.unique_urls,
-            "avg_position": float(row.avg_position) if row.avg_position else 0.0,
-            "best_position": row.best_position
-        }
-        for row in results
-    ]
+    matrix = rank_matrix_store.get(site_id, db)
+    return matrix.domain_distribution(since_date, limit)
 
 
 @router.get("/top-movers")
@@ -113,74 +129,27 @@ def get_top_movers(
     days: int = Query(7, description="Kaç günlük veri"),
     limit: int = Query(10, description="Kaç sonuç"),
     direction: str = Query("both", description="up, down, veya both"),
+    site_id: str = Query("default", description="Site ID"),
     db: Session = Depends(get_db)
 ):
-    """En çok yükselen/düşen linkleri getirir"""
+    """En çok yükselen/düşen linkleri getirir (ilk ve son görünme pozisyonuna göre)"""
     since_date = datetime.utcnow() - timedelta(days=days)
-    
-    # İlk ve son pozisyonları bul
-    first_positions = db.query(
-        SearchLink.url,
-        SearchLink.domain,
-        SearchLink.title,
-        func.min(SearchResult.search_date).label("first_date"),
-        func.min(SearchLink.position).label("first_position")
-    ).join(
-        SearchResult, SearchLink.search_result_id == SearchResult.id
-    ).filter(
-        SearchResult.search_date >= since_date
-    ).group_by(
-        SearchLink.url, SearchLink.domain, SearchLink.title
-    ).subquery()
-    
-    last_positions = db.query(
-        SearchLink.url,
-        func.max(SearchResult.search_date).label("last_date"),
-        func.min(SearchLink.position).label("last_position")
-    ).join(
-        SearchResult, SearchLink.search_result_id == SearchResult.id
-    ).filter(
-        SearchResult.search_date >= since_date
-    ).group_by(
-        SearchLink.url
-    ).subquery()
-    
-    # İlk ve son pozisyonları birleştir
-    query = db.query(
-        first_positions.c.url,
-        first_positions.c.domain,
-        first_positions.c.title,
-        first_positions.c.first_position,
-        last_positions.c.last_position,
-        (first_positions.c.first_position - last_positions.c.last_position).label("change")
-    ).join(
-        last_positions, first_positions.c.url == last_positions.c.url
-    ).filter(
-        # En az 1 pozisyon değişikliği olanları göster
-        first_positions.c.first_position != last_positions.c.last_position
-    )
-    
-    if direction == "up":
-        query = query.filter(first_positions.c.first_position > last_positions.c.last_position)
-    elif direction == "down":
-        query = query.filter(first_positions.c.first_position < last_positions.c.last_position)
-    
-    results = query.order_by(
-        func.abs((first_positions.c.first_position - last_positions.c.last_position)).desc()
-    ).limit(limit).all()
-    
-    return [
-        {
-            "url": row.url,
-            "domain": row.domain or "",
-            "title": row.title or "",
-            "first_position": row.first_position,
-            "last_position": row.last_position,
-            "change": row.change,
-            "direction": "up" if row.change > 0 else "down" if row.change < 0 else "stable"
-        }
-        for row in results
-    ]
+    matrix = rank_matrix_store.get(site_id, db)
+    return matrix.top_movers(since_date, limit, direction)
+
+
+@router.get("/volatility")
+def get_volatility(
+    days: int = Query(30, description="Kaç günlük veri"),
+    limit: int = Query(20, description="Kaç sonuç"),
+    min_appearances: int = Query(2, description="Minimum görünme sayısı"),
+    site_id: str = Query("default", description="Site ID"),
+    db: Session = Depends(get_db)
+):
+    """Pozisyonu en çok dalgalanan linkleri getirir"""
+    since_date = datetime.utcnow() - timedelta(days=days)
+    matrix = rank_matrix_store.get(site_id, db)
+    return matrix.volatility(since_date, limit, min_appearances)
 
 
 @router.get("/competitor-analysis")
@@ -189,40 +158,35 @@ def get_competitor_analysis(
     site_id: str = Query("default", description="Site ID"),
     db: Session = Depends(get_db)
 ):
-    """Rakip analizi - hangi domainler en çok görünüyor"""
+    """Rakip analizi - hangi domainler en çok görünüyor (CTR ağırlıklı pazar payı ile)"""
     since_date = datetime.utcnow() - timedelta(days=days)
     
-    results = db.query(
-        SearchLink.domain,
-        func.count(distinct(SearchResult.id)).label("appearances"),
-        func.avg(SearchLink.position).label("avg_position"),
-        func.min(SearchLink.position).label("best_position"),
-        func.max(SearchLink.position).label("worst_position"),
-        func.count(distinct(SearchLink.url)).label("unique_urls")
-    ).join(
-        SearchResult, SearchLink.search_result_id == SearchResult.id
-    ).filter(
-        SearchResult.search_date >= since_date,
-        SearchLink.domain.isnot(None),
-        SearchLink.domain != ""
-    ).group_by(
-        SearchLink.domain
-    ).order_by(
-        func.count(distinct(SearchResult.id)).desc()
-    ).limit(20).all()
+    competitors = market_share(db, since_date.strftime("%Y-%m-%d"), limit=20)
     
-    return [
-        {
-            "domain": row.domain,
-            "appearances": row.appearances,
-            "avg_position": float(row.avg_position) if row.avg_position else 0.0,
-            "best_position": row.best_position,
-            "worst_position": row.worst_position,
-            "unique_urls": row.unique_urls,
-            "market_share": 0.0  # Hesaplanacak
-        }
-        for row in results
-    ]
+    # Benzersiz URL sayısı günlük rollup'tan toplanamaz, rank matrisinden alınır
+    matrix = rank_matrix_store.get(site_id, db)
+    unique_urls = matrix.unique_urls_by_domain(since_date, [c["domain"] for c in competitors])
+    for competitor in competitors:
+        competitor["unique_urls"] = unique_urls.get(competitor["domain"], 0)
+    
+    return competitors
+
+
+@router.get("/share-of-voice")
+def get_share_of_voice(
+    days: int = Query(30, description="Kaç günlük veri"),
+    top: int = Query(5, description="Kaç domain gösterilecek"),
+    domains: Optional[str] = Query(None, description="Virgülle ayrılmış domain listesi (opsiyonel)"),
+    site_id: str = Query("default", description="Site ID"),
+    db: Session = Depends(get_db)
+):
+    """Domain bazında günlük görünürlük payı (%) zaman serisi"""
+    since_date = datetime.utcnow() - timedelta(days=days)
+    domain_list = [d.strip() for d in domains.split(",") if d.strip()] if domains else None
+    return share_timeseries(db, since_date.strftime("%Y-%m-%d"), top=top, domains=domain_list)
+
+
+FILTER_LINK_COLUMNS = ("id", "url", "domain", "title", "position", "snippet", "search_date", "total_results")
 
 
 @router.get("/filter-links")
@@ -240,9 +204,21 @@ def filter_links(
     """Linkleri filtrele"""
     since_date = datetime.utcnow() - timedelta(days=days)
     
-    query = db.query(SearchLink, SearchResult)\
-        .join(SearchResult, SearchLink.search_result_id == SearchResult.id)\
-        .filter(SearchResult.search_date >= since_date)
+    # ORM nesneleri yerine kolonlar seçilir, satırlar doğrudan serialize edilir
+    query = db.query(
+        SearchLink.id,
+        SearchLink.url,
+        func.coalesce(SearchLink.domain, ""),
+        func.coalesce(SearchLink.title, ""),
+        SearchLink.position,
+        func.coalesce(SearchLink.snippet, ""),
+        SearchResult.search_date,
+        SearchResult.total_results
+    ).join(
+        SearchResult, SearchLink.search_result_id == SearchResult.id
+    ).filter(
+        SearchResult.search_date >= since_date
+    )
     
     if domain:
         query = query.filter(SearchLink.domain.contains(domain))
@@ -273,20 +249,4 @@ def filter_links(
     
     results = query.order_by(SearchResult.search_date.desc()).limit(limit).all()
     
-    return [
-        {
-            "id": link.id,
-            "url": link.url,
-            "domain": link.domain or "",
-            "title": link.title or "",
-            "position": link.position,
-            "snippet": link.snippet or "",
-            "search_date": result.search_date.isoformat(),
-            "total_results": result.total_results
-        }
-        for link, result in results
-    ]
-
-
-
-
+    return rows_response(FILTER_LINK_COLUMNS, results)
@@ -1,21 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, distinct
+import os
 from datetime import datetime, timedelta
-from io import BytesIO
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.utils import get_column_letter
-from app.database import get_db, SearchResult, SearchLink, init_db
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.pdfgen import canvas
+from app.database import get_db, init_db
+from app.export_archive import ARCHIVE_FORMATS, ARCHIVE_KINDS, existing_sites, parse_choices, stream_archive
+from app.export_columnar import ColumnarUnavailable, history_schema
+from app.export_formats import EXPORT_FORMATS
+from app.export_jobs import ExportQueueFull, get_job, list_jobs, submit_export
+from app.export_rows import (
+    DAILY_FIELDS, POSITION_HISTORY_FIELDS, SUMMARY_FIELDS,
+    daily_records, has_position_history, position_history_records,
+    session_records, summary_records
+)
+from app.export_writers import rows_stream_response, spooled_response
+from app.models import ExportJobRequest
+from app.responses import FastJSONResponse
+from app.scheduler import VALID_SITE_IDS
 
-router = APIRouter(prefix="/api/export", tags=["export"])
+router = APIRouter(prefix="/api/export", tags=["export"], default_response_class=FastJSONResponse)
+
+
+def file_export_response(kind: str, db: Session, since: datetime, url: str = None, **options):
+    """Export'u geçici dosyaya üretip indirme olarak döndürür"""
+    export_format = EXPORT_FORMATS[kind]
+    return spooled_response(
+        lambda fileobj: export_format.render(db, fileobj, since, url, **options),
+        export_format.media_type,
+        export_format.filename()
+    )
 
 
 @router.get("/excel/daily")
@@ -26,71 +39,7 @@ def export_daily_excel(
 ):
     """Günlük link pozisyonlarını Excel olarak export eder"""
     since_date = datetime.utcnow() - timedelta(days=days)
-    
-    # Tüm arama sonuçlarını ve linklerini al
-    results = db.query(SearchResult)\
-        .filter(SearchResult.search_date >= since_date)\
-        .order_by(SearchResult.search_date.asc())\
-        .all()
-    
-    # Excel workbook oluştur
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Günlük Pozisyonlar"
-    
-    # Header stilleri
-    header_fill = PatternFill(start_color="667eea", end_color="667eea", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    center_align = Alignment(horizontal="center", vertical="center")
-    
-    # Header satırı
-    headers = ["Tarih", "Saat", "URL", "Domain", "Başlık", "Pozisyon", "Snippet"]
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = center_align
-    
-    # Veri satırları
-    row = 2
-    for result in results:
-        links = db.query(SearchLink)\
-            .filter(SearchLink.search_result_id == result.id)\
-            .order_by(SearchLink.position.asc())\
-            .all()
-        
-        for link in links:
-            search_date = result.search_date
-            ws.cell(row=row, column=1, value=search_date.strftime("%Y-%m-%d"))
-            ws.cell(row=row, column=2, value=search_date.strftime("%H:%M:%S"))
-            ws.cell(row=row, column=3, value=link.url)
-            ws.cell(row=row, column=4, value=link.domain or "")
-            ws.cell(row=row, column=5, value=link.title or "")
-            ws.cell(row=row, column=6, value=link.position)
-            ws.cell(row=row, column=7, value=link.snippet or "")
-            row += 1
-    
-    # Kolon genişliklerini ayarla
-    ws.column_dimensions['A'].width = 12
-    ws.column_dimensions['B'].width = 10
-    ws.column_dimensions['C'].width = 50
-    ws.column_dimensions['D'].width = 25
-    ws.column_dimensions['E'].width = 40
-    ws.column_dimensions['F'].width = 10
-    ws.column_dimensions['G'].width = 60
-    
-    # Excel dosyasını memory'de oluştur
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f"google_search_bot_daily_{datetime.now().strftime('%Y%m%d')}.xlsx"
-    
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    return file_export_response("excel_daily", db, since_date)
 
 
 @router.get("/excel/position-history")
@@ -102,90 +51,11 @@ def export_position_history(
 ):
     """Belirli bir URL'in pozisyon geçmişini Excel olarak export eder"""
     since_date = datetime.utcnow() - timedelta(days=days)
-    
-    query = db.query(SearchLink, SearchResult)\
-        .join(SearchResult, SearchLink.search_result_id == SearchResult.id)\
-        .filter(SearchResult.search_date >= since_date)
-    
-    if url:
-        query = query.filter(SearchLink.url == url)
-    
-    results = query.order_by(SearchResult.search_date.asc()).all()
-    
-    if not results:
+
+    if not has_position_history(db, since_date, url):
         raise HTTPException(status_code=404, detail="Veri bulunamadı")
-    
-    # Excel workbook oluştur
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Pozisyon Geçmişi"
-    
-    # Header stilleri
-    header_fill = PatternFill(start_color="667eea", end_color="667eea", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    center_align = Alignment(horizontal="center", vertical="center")
-    
-    # Header satırı
-    headers = ["Tarih", "Saat", "URL", "Domain", "Başlık", "Pozisyon", "Değişim"]
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = center_align
-    
-    # Veri satırları
-    row = 2
-    prev_position = None
-    for link, result in results:
-        search_date = result.search_date
-        change = ""
-        if prev_position is not None:
-            diff = prev_position - link.position
-            if diff > 0:
-                change = f"↑ {diff}"
-            elif diff < 0:
-                change = f"↓ {abs(diff)}"
-            else:
-                change = "→"
-        
-        ws.cell(row=row, column=1, value=search_date.strftime("%Y-%m-%d"))
-        ws.cell(row=row, column=2, value=search_date.strftime("%H:%M:%S"))
-        ws.cell(row=row, column=3, value=link.url)
-        ws.cell(row=row, column=4, value=link.domain or "")
-        ws.cell(row=row, column=5, value=link.title or "")
-        ws.cell(row=row, column=6, value=link.position)
-        ws.cell(row=row, column=7, value=change)
-        
-        # Pozisyon değişimine göre renklendir
-        if change.startswith("↑"):
-            ws.cell(row=row, column=7).fill = PatternFill(start_color="c8e6c9", end_color="c8e6c9", fill_type="solid")
-        elif change.startswith("↓"):
-            ws.cell(row=row, column=7).fill = PatternFill(start_color="ffcdd2", end_color="ffcdd2", fill_type="solid")
-        
-        prev_position = link.position
-        row += 1
-    
-    # Kolon genişliklerini ayarla
-    ws.column_dimensions['A'].width = 12
-    ws.column_dimensions['B'].width = 10
-    ws.column_dimensions['C'].width = 50
-    ws.column_dimensions['D'].width = 25
-    ws.column_dimensions['E'].width = 40
-    ws.column_dimensions['F'].width = 10
-    ws.column_dimensions['G'].width = 12
-    
-    # Excel dosyasını memory'de oluştur
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f"position_history_{datetime.now().strftime('%Y%m%d')}.xlsx"
-    
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+
+    return file_export_response("excel_position_history", db, since_date, url)
 
 
 @router.get("/excel/summary")
@@ -196,183 +66,22 @@ def export_summary_excel(
 ):
     """Özet istatistikleri Excel olarak export eder"""
     since_date = datetime.utcnow() - timedelta(days=days)
-    
-    # Link istatistiklerini hesapla
-    stats = db.query(
-        SearchLink.url,
-        SearchLink.domain,
-        SearchLink.title,
-        func.count(SearchLink.id).label("total_appearances"),
-        func.min(SearchLink.created_at).label("first_seen"),
-        func.max(SearchLink.created_at).label("last_seen"),
-        func.avg(SearchLink.position).label("avg_position"),
-        func.min(SearchLink.position).label("best_position"),
-        func.max(SearchLink.position).label("worst_position")
-    ).join(
-        SearchResult, SearchLink.search_result_id == SearchResult.id
-    ).filter(
-        SearchResult.search_date >= since_date
-    ).group_by(
-        SearchLink.url, SearchLink.domain, SearchLink.title
-    ).order_by(
-        func.count(SearchLink.id).desc()
-    ).all()
-    
-    # Excel workbook oluştur
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Özet İstatistikler"
-    
-    # Header stilleri
-    header_fill = PatternFill(start_color="667eea", end_color="667eea", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    center_align = Alignment(horizontal="center", vertical="center")
-    
-    # Header satırı
-    headers = ["URL", "Domain", "Başlık", "Toplam Görünme", "İlk Görünme", "Son Görünme", 
-               "Ort. Pozisyon", "En İyi", "En Kötü", "Aktif Gün"]
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = center_align
-    
-    # Veri satırları
-    row = 2
-    for stat in stats:
-        days_active = (stat.last_seen - stat.first_seen).days + 1
-        
-        ws.cell(row=row, column=1, value=stat.url)
-        ws.cell(row=row, column=2, value=stat.domain or "")
-        ws.cell(row=row, column=3, value=stat.title or "")
-        ws.cell(row=row, column=4, value=stat.total_appearances)
-        ws.cell(row=row, column=5, value=stat.first_seen.strftime("%Y-%m-%d %H:%M"))
-        ws.cell(row=row, column=6, value=stat.last_seen.strftime("%Y-%m-%d %H:%M"))
-        ws.cell(row=row, column=7, value=round(float(stat.avg_position), 2))
-        ws.cell(row=row, column=8, value=stat.best_position)
-        ws.cell(row=row, column=9, value=stat.worst_position)
-        ws.cell(row=row, column=10, value=days_active)
-        row += 1
-    
-    # Kolon genişliklerini ayarla
-    ws.column_dimensions['A'].width = 50
-    ws.column_dimensions['B'].width = 25
-    ws.column_dimensions['C'].width = 40
-    ws.column_dimensions['D'].width = 15
-    ws.column_dimensions['E'].width = 18
-    ws.column_dimensions['F'].width = 18
-    ws.column_dimensions['G'].width = 15
-    ws.column_dimensions['H'].width = 10
-    ws.column_dimensions['I'].width = 10
-    ws.column_dimensions['J'].width = 12
-    
-    # Excel dosyasını memory'de oluştur
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f"summary_{datetime.now().strftime('%Y%m%d')}.xlsx"
-    
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    return file_export_response("excel_summary", db, since_date)
 
 
 @router.get("/pdf/daily")
 def export_daily_pdf(
     days: int = 30,
+    layout: str = Query("detail", pattern="^(detail|summary)$", description="detail: her link, summary: gün başına URL başına tek satır"),
+    max_rows: int = Query(None, ge=1, description="Tablodaki en fazla satır sayısı"),
     site_id: str = Query("default", description="Site ID"),
     db: Session = Depends(get_db)
 ):
     """Günlük link pozisyonlarını PDF olarak export eder"""
     init_db(site_id)
     since_date = datetime.utcnow() - timedelta(days=days)
-    
-    # Tüm arama sonuçlarını ve linklerini al
-    results = db.query(SearchResult)\
-        .filter(SearchResult.search_date >= since_date)\
-        .order_by(SearchResult.search_date.asc())\
-        .all()
-    
-    # PDF oluştur
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    
-    # Stil tanımlamaları
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor=colors.HexColor('#667eea'),
-        spaceAfter=30,
-        alignment=1  # Center
-    )
-    
-    # Başlık
-    elements.append(Paragraph("Google Search Bot - Günlük Rapor", title_style))
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Tarih aralığı
-    date_range = Paragraph(
-        f"<b>Tarih Aralığı:</b> {(datetime.utcnow() - timedelta(days=days)).strftime('%d.%m.%Y')} - {datetime.utcnow().strftime('%d.%m.%Y')}",
-        styles['Normal']
-    )
-    elements.append(date_range)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Veri tablosu
-    data = [["Tarih", "Saat", "URL", "Domain", "Pozisyon"]]
-    
-    for result in results:
-        links = db.query(SearchLink)\
-            .filter(SearchLink.search_result_id == result.id)\
-            .order_by(SearchLink.position.asc())\
-            .all()
-        
-        for link in links:
-            search_date = result.search_date
-            # URL'yi kısalt (çok uzunsa)
-            url_display = link.url[:60] + "..." if len(link.url) > 60 else link.url
-            data.append([
-                search_date.strftime("%Y-%m-%d"),
-                search_date.strftime("%H:%M"),
-                url_display,
-                link.domain or "",
-                str(link.position)
-            ])
-    
-    # Tablo oluştur
-    table = Table(data, colWidths=[1*inch, 0.8*inch, 3*inch, 1.2*inch, 0.8*inch])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-    ]))
-    
-    elements.append(table)
-    
-    # PDF'i oluştur
-    doc.build(elements)
-    buffer.seek(0)
-    
-    filename = f"google_search_bot_daily_{datetime.now().strftime('%Y%m%d')}.pdf"
-    
-    return StreamingResponse(
-        buffer,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    kind = "pdf_daily_summary" if layout == "summary" else "pdf_daily"
+    return file_export_response(kind, db, since_date, max_rows=max_rows)
 
 
 @router.get("/pdf/summary")
@@ -384,99 +93,166 @@ def export_summary_pdf(
     """Özet istatistikleri PDF olarak export eder"""
     init_db(site_id)
     since_date = datetime.utcnow() - timedelta(days=days)
-    
-    # Link istatistiklerini hesapla
-    stats = db.query(
-        SearchLink.url,
-        SearchLink.domain,
-        SearchLink.title,
-        func.count(SearchLink.id).label("total_appearances"),
-        func.min(SearchLink.created_at).label("first_seen"),
-        func.max(SearchLink.created_at).label("last_seen"),
-        func.avg(SearchLink.position).label("avg_position"),
-        func.min(SearchLink.position).label("best_position"),
-        func.max(SearchLink.position).label("worst_position")
-    ).join(
-        SearchResult, SearchLink.search_result_id == SearchResult.id
-    ).filter(
-        SearchResult.search_date >= since_date
-    ).group_by(
-        SearchLink.url, SearchLink.domain, SearchLink.title
-    ).order_by(
-        func.count(SearchLink.id).desc()
-    ).limit(50).all()
-    
-    # PDF oluştur
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    
-    # Stil tanımlamaları
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor=colors.HexColor('#667eea'),
-        spaceAfter=30,
-        alignment=1
-    )
-    
-    # Başlık
-    elements.append(Paragraph("Google Search Bot - Özet Rapor", title_style))
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Tarih aralığı
-    date_range = Paragraph(
-        f"<b>Tarih Aralığı:</b> {(datetime.utcnow() - timedelta(days=days)).strftime('%d.%m.%Y')} - {datetime.utcnow().strftime('%d.%m.%Y')}",
-        styles['Normal']
-    )
-    elements.append(date_range)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Veri tablosu
-    data = [["URL", "Domain", "Görünme", "Ort. Pozisyon", "En İyi", "En Kötü"]]
-    
-    for stat in stats:
-        url_display = stat.url[:40] + "..." if len(stat.url) > 40 else stat.url
-        data.append([
-            url_display,
-            stat.domain or "",
-            str(stat.total_appearances),
-            f"{float(stat.avg_position):.1f}",
-            str(stat.best_position),
-            str(stat.worst_position)
-        ])
-    
-    # Tablo oluştur
-    table = Table(data, colWidths=[2.5*inch, 1.5*inch, 0.8*inch, 1*inch, 0.7*inch, 0.7*inch])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-    ]))
-    
-    elements.append(table)
-    
-    # PDF'i oluştur
-    doc.build(elements)
-    buffer.seek(0)
-    
-    filename = f"google_search_bot_summary_{datetime.now().strftime('%Y%m%d')}.pdf"
-    
+    return file_export_response("pdf_summary", db, since_date)
+
+
+@router.get("/{fmt}/history")
+def export_history_columnar(
+    fmt: str = Path(..., pattern="^(parquet|arrow)$", description="parquet veya arrow"),
+    days: int = 30,
+    site_id: str = Query("default", description="Site ID"),
+    db: Session = Depends(get_db)
+):
+    """Arama sonuçlarını linkleriyle birlikte Parquet ya da Arrow (Feather) dosyası olarak export eder"""
+    try:
+        history_schema()
+    except ColumnarUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    since_date = datetime.utcnow() - timedelta(days=days)
+    return file_export_response(f"{fmt}_history", db, since_date)
+
+
+@router.get("/archive")
+def export_archive(
+    days: int = 30,
+    sites: str = Query(None, description="Virgülle ayrılmış site ID'leri (varsayılan: tüm siteler)"),
+    kinds: str = Query("daily,summary", description="daily, position-history, summary"),
+    formats: str = Query("csv,xlsx", description="csv, xlsx")
+):
+    """Tüm sitelerin export'larını tek bir ZIP arşivi olarak stream eder"""
+    try:
+        site_ids = existing_sites(parse_choices(sites, VALID_SITE_IDS))
+        kind_list = parse_choices(kinds, ARCHIVE_KINDS)
+        format_list = parse_choices(formats, ARCHIVE_FORMATS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not site_ids:
+        raise HTTPException(status_code=404, detail="Veri bulunamadı")
+
+    since_date = datetime.utcnow() - timedelta(days=days)
+    filename = f"google_search_bot_export_{datetime.now().strftime('%Y%m%d')}.zip"
+
     return StreamingResponse(
-        buffer,
-        media_type="application/pdf",
+        stream_archive(site_ids, kind_list, format_list, since_date),
+        media_type="application/zip",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 
+def job_response(job) -> dict:
+    data = job.to_dict()
+    data["download_url"] = f"/api/export/jobs/{job.id}/download" if job.status == "done" else None
+    return data
+
 
+@router.post("/jobs", status_code=202)
+def create_export_job(
+    request: ExportJobRequest,
+    site_id: str = Query("default", description="Site ID")
+):
+    """Export'u arka planda üretmek için job oluşturur (önbellekte varsa hemen tamamlanmış döner)"""
+    try:
+        job = submit_export(request.kind, site_id, request.days, request.url, request.max_rows)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{e}. Geçerli türler: {', '.join(sorted(EXPORT_FORMATS))}"
+        )
+    except ExportQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return job_response(job)
+
+
+@router.get("/jobs")
+def get_export_jobs(site_id: str = Query(None, description="Site ID")):
+    """Son export job'larını listeler"""
+    return [job_response(job) for job in list_jobs(site_id)]
+
+
+@router.get("/jobs/{job_id}")
+def get_export_job(job_id: str):
+    """Export job'ının durumunu ve ilerlemesini döndürür"""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job bulunamadı")
+    return job_response(job)
+
+
+@router.get("/jobs/{job_id}/download")
+def download_export_job(job_id: str):
+    """Tamamlanan export job'ının dosyasını indirir"""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job bulunamadı")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Export job henüz tamamlanmadı ({job.status})")
+    if not os.path.exists(job.path):
+        raise HTTPException(status_code=410, detail="Export dosyası temizlenmiş, job'ı tekrar gönderin")
+    export_format = EXPORT_FORMATS[job.kind]
+    return FileResponse(job.path, media_type=export_format.media_type, filename=export_format.filename())
+
+
+# CSV / NDJSON route'ları "/{fmt}/..." kalıbıyla eşleştiği için excel ve pdf
+# route'larından sonra tanımlanmalı
+STREAM_FORMAT_PATTERN = "^(csv|ndjson)$"
+
+
+@router.get("/{fmt}/daily")
+def export_daily_stream(
+    fmt: str = Path(..., pattern=STREAM_FORMAT_PATTERN, description="csv veya ndjson"),
+    days: int = 30,
+    gzip: bool = Query(False, description="Dosyayı .gz olarak indir"),
+    site_id: str = Query("default", description="Site ID")
+):
+    """Günlük link pozisyonlarını ham satırlar olarak stream eder"""
+    since_date = datetime.utcnow() - timedelta(days=days)
+    filename = f"google_search_bot_daily_{datetime.now().strftime('%Y%m%d')}"
+
+    return rows_stream_response(
+        fmt, filename, DAILY_FIELDS,
+        session_records(site_id, daily_records, since_date),
+        gzip=gzip
+    )
+
+
+@router.get("/{fmt}/position-history")
+def export_position_history_stream(
+    fmt: str = Path(..., pattern=STREAM_FORMAT_PATTERN, description="csv veya ndjson"),
+    url: str = None,
+    days: int = 30,
+    gzip: bool = Query(False, description="Dosyayı .gz olarak indir"),
+    site_id: str = Query("default", description="Site ID"),
+    db: Session = Depends(get_db)
+):
+    """Pozisyon geçmişini ham satırlar olarak stream eder"""
+    since_date = datetime.utcnow() - timedelta(days=days)
+
+    if not has_position_history(db, since_date, url):
+        raise HTTPException(status_code=404, detail="Veri bulunamadı")
+
+    filename = f"position_history_{datetime.now().strftime('%Y%m%d')}"
+
+    return rows_stream_response(
+        fmt, filename, POSITION_HISTORY_FIELDS,
+        session_records(site_id, position_history_records, since_date, url),
+        gzip=gzip
+    )
+
+
+@router.get("/{fmt}/summary")
+def export_summary_stream(
+    fmt: str = Path(..., pattern=STREAM_FORMAT_PATTERN, description="csv veya ndjson"),
+    days: int = 30,
+    gzip: bool = Query(False, description="Dosyayı .gz olarak indir"),
+    site_id: str = Query("default", description="Site ID")
+):
+    """Özet istatistikleri ham satırlar olarak stream eder"""
+    since_date = datetime.utcnow() - timedelta(days=days)
+    filename = f"summary_{datetime.now().strftime('%Y%m%d')}"
+
+    return rows_stream_response(
+        fmt, filename, SUMMARY_FIELDS,
+        session_records(site_id, summary_records, since_date),
+        gzip=gzip
+    )
 
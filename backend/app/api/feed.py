@@ -0,0 +1,143 @@
+"""
+Artımlı değişiklik akışı (change feed)
+
+Dış sistemler tüm geçmişi yeniden export etmek yerine son okudukları
+imleçten (cursor) sonra kaydedilen aramaları çeker. İmleç `search_results.id`
+değeridir: bir arama linkleriyle birlikte tek transaction'da kaydedilir,
+SQLite aynı anda tek yazıcıya izin verir ve arama kayıtları silinmez; bu
+yüzden id'ler commit sırasıyla artar ve imleçten küçük bir kayıt sonradan
+görünmez.
+
+Yanıt NDJSON'dur: her satır linkleriyle birlikte bir aramadır
+(`"type": "result"`), son satır bir sonraki istekte kullanılacak imleci
+taşır (`"type": "cursor"`). Aynı değerler `X-Next-Cursor` / `X-Has-More`
+başlıklarında da gönderilir. Arama satırındaki `changes` ingest sırasında
+kaydedilen çalıştırma farkının (`run_diffs`) özetidir; ayrıntısı
+`/api/search/diff` ile alınır. Sorgular id aralığı ve
+`search_links.search_result_id` index'i üzerinden çalıştığı için maliyet
+sadece yeni kayıt sayısıyla orantılıdır.
+
+    GET /api/feed/changes?site_id=default&cursor=0&limit=500
+"""
+import itertools
+import os
+from typing import Iterator, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.database import get_db, init_db, RunDiff, SearchResult, SearchLink
+from app.export_rows import EXPORT_BATCH_SIZE, session_records
+from app.export_writers import NDJSON_MEDIA_TYPE, iter_json_lines
+from app.responses import FastJSONResponse
+
+FEED_MAX_LIMIT = int(os.getenv("FEED_MAX_LIMIT", "5000"))
+
+router = APIRouter(prefix="/api/feed", tags=["feed"], default_response_class=FastJSONResponse)
+
+
+def _feed_records(db: Session, cursor: int, next_cursor: int) -> Iterator[Tuple]:
+    """(cursor, next_cursor] aralığındaki linkleri arama ve pozisyon sırasıyla üretir"""
+    query = db.query(
+        SearchResult.id,
+        SearchResult.settings_id,
+        SearchResult.search_query,
+        SearchResult.search_date,
+        SearchResult.total_results,
+        RunDiff.previous_result_id,
+        RunDiff.entered,
+        RunDiff.exited,
+        RunDiff.moved,
+        SearchLink.id,
+        SearchLink.position,
+        SearchLink.url,
+        SearchLink.domain,
+        SearchLink.title,
+        SearchLink.snippet,
+        SearchLink.created_at
+    ).outerjoin(
+        RunDiff, RunDiff.search_result_id == SearchResult.id
+    ).outerjoin(
+        SearchLink, SearchLink.search_result_id == SearchResult.id
+    ).filter(
+        SearchResult.id > cursor,
+        SearchResult.id <= next_cursor
+    ).order_by(
+        SearchResult.id.asc(), SearchLink.position.asc()
+    ).yield_per(EXPORT_BATCH_SIZE)
+
+    for row in query:
+        yield tuple(row)
+
+
+def _feed_objects(records: Iterator[Tuple], next_cursor: int, has_more: bool) -> Iterator[dict]:
+    """Link satırlarını arama başına tek nesnede toplar; sonda imleç satırını ekler"""
+    for result_id, rows in itertools.groupby(records, key=lambda record: record[0]):
+        first = next(rows)
+        _, settings_id, search_query, search_date, total_results = first[:5]
+        previous_result_id, entered, exited, moved = first[5:9]
+        links = [
+            {
+                "id": link_id,
+                "position": position,
+                "url": url,
+                "domain": domain,
+                "title": title,
+                "snippet": snippet,
+                "created_at": created_at,
+            }
+            for link_id, position, url, domain, title, snippet, created_at
+            in (row[9:] for row in itertools.chain([first], rows))
+            # Linksiz arama (outer join) tek bir boş satır döndürür
+            if link_id is not None
+        ]
+        yield {
+            "type": "result",
+            "id": result_id,
+            "settings_id": settings_id,
+            "search_query": search_query,
+            "search_date": search_date,
+            "total_results": total_results,
+            # Aynı kelimenin önceki çalıştırmasına göre fark özeti (ilk çalıştırmada None)
+            "changes": None if previous_result_id is None else {
+                "previous_result_id": previous_result_id,
+                "entered": entered,
+                "exited": exited,
+                "moved": moved,
+            },
+            "links": links,
+        }
+    yield {"type": "cursor", "next_cursor": next_cursor, "has_more": has_more}
+
+
+@router.get("/changes")
+def get_changes(
+    cursor: int = Query(0, ge=0, description="Son okunan arama id'si (ilk senkronizasyon için 0)"),
+    limit: int = Query(500, ge=1, le=FEED_MAX_LIMIT, description="En fazla arama sayısı"),
+    site_id: str = Query("default", description="Site ID"),
+    db: Session = Depends(get_db)
+):
+    """İmleçten sonra kaydedilen aramaları linkleriyle birlikte NDJSON olarak stream eder"""
+    init_db(site_id)
+
+    # Sayfanın son id'si yanıt başlamadan belirlenir; gövde bu aralığı okur
+    ids = [
+        result_id for (result_id,) in db.query(SearchResult.id).filter(
+            SearchResult.id > cursor
+        ).order_by(SearchResult.id.asc()).limit(limit + 1)
+    ]
+    has_more = len(ids) > limit
+    next_cursor = ids[:limit][-1] if ids else cursor
+
+    if not ids and cursor > (db.query(func.max(SearchResult.id)).scalar() or 0):
+        # Veritabanı geri yüklenmiş/yeniden oluşturulmuş olabilir
+        raise HTTPException(status_code=409, detail="İmleç son kayıttan ileride; senkronizasyonu 0'dan başlatın")
+
+    records = session_records(site_id, _feed_records, cursor, next_cursor) if ids else iter(())
+    return StreamingResponse(
+        iter_json_lines(_feed_objects(records, next_cursor, has_more)),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"X-Next-Cursor": str(next_cursor), "X-Has-More": str(has_more).lower()}
+    )
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, distinct
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Optional
 import logging
 from app.database import get_db, SearchSettings, SearchResult, SearchLink, init_db
 from app.models import (
@@ -11,9 +11,12 @@ from app.models import (
 )
 from app.serpapi_client import SerpApiClient
 from app.scheduler import perform_search
+from app.run_ledger import new_batch_id
+from app.run_diff import get_diff, latest_run, previous_run_id
+from app.responses import FastJSONResponse
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/api/search", tags=["search"])
+router = APIRouter(prefix="/api/search", tags=["search"], default_response_class=FastJSONResponse)
 
 
 @router.post("/run")
@@ -33,6 +36,8 @@ def run_search_now(
     # Çoklu arama kelimesi desteği
     queries = [q.strip() for q in settings.search_query.split(',') if q.strip()]
     results = []
+    batch_id = new_batch_id()
+    queued_at = datetime.utcnow()
     
     for query in queries:
         temp_settings = SearchSettings(
@@ -43,7 +48,7 @@ def run_search_now(
             interval_hours=settings.interval_hours
         )
         try:
-            perform_search(db, temp_settings)
+            perform_search(db, temp_settings, site_id, "manual", batch_id, queued_at)
             # Commit'in başarılı olduğundan emin ol
             db.commit()
             results.append({"query": query, "status": "success"})
@@ -59,6 +64,9 @@ def run_search_now(
     }
 
 
+SEARCH_LINK_COLUMNS = ("id", "url", "title", "snippet", "position", "domain", "created_at")
+
+
 @router.get("/results", response_model=List[SearchResultResponse])
 def get_search_results(
     limit: int = 50,
@@ -67,13 +75,41 @@ def get_search_results(
     db: Session = Depends(get_db)
 ):
     """Arama sonuçlarını listeler"""
-    results = db.query(SearchResult)\
+    # Lazy `links` yüklemesi yerine iki sorgu; Pydantic doğrulaması atlanır
+    results = db.query(SearchResult.id, SearchResult.search_query, SearchResult.search_date, SearchResult.total_results)\
         .order_by(SearchResult.search_date.desc())\
         .offset(offset)\
         .limit(limit)\
         .all()
     
-    return results
+    links_by_result = {result_id: [] for result_id, *_ in results}
+    if links_by_result:
+        links = db.query(
+            SearchLink.search_result_id,
+            SearchLink.id,
+            SearchLink.url,
+            SearchLink.title,
+            SearchLink.snippet,
+            SearchLink.position,
+            func.coalesce(SearchLink.domain, ""),
+            SearchLink.created_at
+        ).filter(
+            SearchLink.search_result_id.in_(list(links_by_result))
+        ).order_by(SearchLink.id.asc()).all()
+        
+        for result_id, *link in links:
+            links_by_result[result_id].append(dict(zip(SEARCH_LINK_COLUMNS, link)))
+    
+    return FastJSONResponse([
+        {
+            "id": result_id,
+            "search_query": search_query,
+            "search_date": search_date,
+            "total_results": total_results,
+            "links": links_by_result[result_id]
+        }
+        for result_id, search_query, search_date, total_results in results
+    ])
 
 
 @router.get("/results/{result_id}", response_model=SearchResultResponse)
@@ -91,6 +127,30 @@ def get_search_result(
     return result
 
 
+@router.get("/diff")
+def get_run_diff(
+    from_run: Optional[int] = Query(None, description="Eski çalıştırma id'si (varsayılan: aynı kelimenin bir önceki çalıştırması)"),
+    to_run: Optional[int] = Query(None, description="Yeni çalıştırma id'si (varsayılan: son çalıştırma)"),
+    keyword: Optional[str] = Query(None, description="to_run verilmezse bu kelimenin son çalıştırması kullanılır"),
+    site_id: str = Query("default", description="Site ID"),
+    db: Session = Depends(get_db)
+):
+    """İki çalıştırma arasında giren, çıkan ve yer değiştiren URL'leri döndürür"""
+    init_db(site_id)
+
+    current = db.get(SearchResult, to_run) if to_run is not None else latest_run(db, keyword)
+    if current is None:
+        raise HTTPException(status_code=404, detail="Çalıştırma bulunamadı")
+
+    if from_run is None:
+        from_run = previous_run_id(db, current)
+    previous = db.get(SearchResult, from_run) if from_run is not None else None
+    if previous is None:
+        raise HTTPException(status_code=404, detail="Karşılaştırılacak önceki çalıştırma bulunamadı")
+
+    return get_diff(db, previous, current)
+
+
 @router.get("/links/stats", response_model=List[LinkStatsResponse])
 def get_link_stats(
     days: int = 30,
@@ -120,30 +180,31 @@ def get_link_stats(
     
     results = links_query.all()
     
-    stats = []
-    for row in results:
-        # Bu linkin tüm pozisyonlarını al
-        positions = db.query(SearchLink.position)\
-            .filter(SearchLink.url == row.url)\
+    # Tüm linklerin pozisyonlarını tek sorguda al
+    positions_by_url = {row.url: [] for row in results}
+    if positions_by_url:
+        positions = db.query(SearchLink.url, SearchLink.position)\
+            .filter(SearchLink.url.in_(list(positions_by_url)))\
             .filter(SearchLink.created_at >= since_date)\
+            .order_by(SearchLink.id.asc())\
             .all()
-        
-        # Gün sayısını hesapla
-        days_active = (row.last_seen - row.first_seen).days + 1
-        
-        stats.append(LinkStatsResponse(
-            url=row.url,
-            domain=row.domain or "",
-            title=row.title,
-            total_appearances=row.total_appearances,
-            days_active=days_active,
-            first_seen=row.first_seen,
-            last_seen=row.last_seen,
-            average_position=float(row.average_position) if row.average_position else 0.0,
-            positions=[p.position for p in positions]
-        ))
-    
-    return stats
+        for url, position in positions:
+            positions_by_url[url].append(position)
+    
+    return FastJSONResponse([
+        {
+            "url": row.url,
+            "domain": row.domain or "",
+            "title": row.title,
+            "total_appearances": row.total_appearances,
+            "days_active": (row.last_seen - row.first_seen).days + 1,
+            "first_seen": row.first_seen,
+            "last_seen": row.last_seen,
+            "average_position": float(row.average_position) if row.average_position else 0.0,
+            "positions": positions_by_url[row.url]
+        }
+        for row in results
+    ])
 
 
 @router.get("/stats")
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 from app.database import get_db, SearchSettings, SearchResult, init_db
 from app.models import (
@@ -9,8 +9,12 @@ from app.models import (
     SchedulerStatusResponse
 )
 from app.scheduler import update_scheduler_interval, start_scheduler, stop_scheduler, scheduler, run_scheduled_searches
+from app.responses import FastJSONResponse, rows_response
+from app.run_ledger import LEDGER_COLUMNS, last_run, recent_runs, ledger_stats
 
-router = APIRouter(prefix="/api/settings", tags=["settings"])
+LEDGER_STATS_DAYS = 7
+
+router = APIRouter(prefix="/api/settings", tags=["settings"], default_response_class=FastJSONResponse)
 logger = logging.getLogger(__name__)
 
 
@@ -112,9 +116,10 @@ def create_settings(
 @router.get("/scheduler-status", response_model=SchedulerStatusResponse)
 def get_scheduler_status(
     site_id: str = Query("default", description="Site ID"),
+    days: int = Query(LEDGER_STATS_DAYS, ge=1, le=365, description="Hata oranı ve gecikme için geriye dönük gün"),
     db: Session = Depends(get_db)
 ):
-    """Scheduler durumunu getirir"""
+    """Scheduler durumunu run ledger kayıtlarından getirir"""
     settings = db.query(SearchSettings).first()
     
     if not settings:
@@ -134,62 +139,42 @@ def get_scheduler_status(
             is_running = False
     
     # Son arama zamanı
-    last_result = db.query(SearchResult).order_by(SearchResult.search_date.desc()).first()
-    last_search_date = last_result.search_date if last_result else None
+    last_search_date = db.query(func.max(SearchResult.search_date)).scalar()
     
-    # Bir sonraki çalışma zamanı
+    # Bir sonraki çalışma zamanı doğrudan job'dan
     next_run_time = None
-    last_run_time = None
     if is_running:
-        try:
-            job_id = f"search_job_{site_id}"
-            job = scheduler.get_job(job_id)
-            if job:
-                next_run_time = job.next_run_time
-                # Son çalışma zamanını hesapla (next_run_time'dan interval çıkar)
-                if next_run_time and settings.interval_hours:
-                    from datetime import timedelta
-                    last_run_time = next_run_time - timedelta(hours=settings.interval_hours)
-                    
-                    # Eğer hesaplanan last_run_time, gerçek last_search_date'den farklıysa
-                    # next_run_time'ı last_search_date'den hesapla
-                    if last_search_date:
-                        # Son aramadan itibaren interval kadar sonra olmalı
-                        expected_next = last_search_date + timedelta(hours=settings.interval_hours)
-                        # Eğer beklenen zaman geçmişteyse, şimdiden itibaren hesapla
-                        if expected_next < datetime.utcnow():
-                            expected_next = datetime.utcnow() + timedelta(hours=settings.interval_hours)
-                        # Eğer job'un next_run_time'ı beklenenden çok farklıysa, düzelt
-                        if abs((next_run_time - expected_next).total_seconds()) > 300:  # 5 dakikadan fazla fark
-                            next_run_time = expected_next
-                            last_run_time = last_search_date
-        except Exception as e:
-            # Hata durumunda, last_search_date'den hesapla
-            if last_search_date and settings.interval_hours:
-                from datetime import timedelta
-                next_run_time = last_search_date + timedelta(hours=settings.interval_hours)
-                if next_run_time < datetime.utcnow():
-                    next_run_time = datetime.utcnow() + timedelta(hours=settings.interval_hours)
-                last_run_time = last_search_date
-    
-    # Toplam zamanlanmış çalışma sayısı (tahmini)
-    total_runs = 0
-    if last_search_date and settings.interval_hours:
-        # İlk aramadan bu yana geçen süre / interval
-        time_diff = datetime.utcnow() - last_search_date
-        total_runs = int(time_diff.total_seconds() / 3600 / settings.interval_hours) + 1
+        job = scheduler.get_job(f"search_job_{site_id}")
+        if job:
+            next_run_time = job.next_run_time
+    
+    # Son çalışma ve istatistikler - gerçekte ne çalıştığı ledger'dan okunur
+    last = last_run(db)
+    stats = ledger_stats(db, datetime.utcnow() - timedelta(days=days))
     
     return SchedulerStatusResponse(
         is_running=is_running,
         is_enabled=settings.enabled,
         interval_hours=settings.interval_hours,
-        last_run_time=last_run_time,
+        last_run_time=last.started_at if last else None,
         next_run_time=next_run_time,
         last_search_date=last_search_date,
-        total_scheduled_runs=total_runs
+        last_run_status=last.status if last else None,
+        last_error=last.error if last else None,
+        **stats
     )
 
 
+@router.get("/run-ledger")
+def get_run_ledger(
+    site_id: str = Query("default", description="Site ID"),
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Son çalıştırmaların kayıtları (en yeniden eskiye)"""
+    return rows_response(LEDGER_COLUMNS, recent_runs(db, limit))
+
+
 @router.post("/scheduler/restart")
 def restart_scheduler():
     """Scheduler'ı yeniden başlatır"""
@@ -217,7 +202,9 @@ def run_search_now_manual(
     """Manuel olarak hemen arama yapar"""
     try:
         import threading
-        threading.Thread(target=run_scheduled_searches, args=(site_id,), daemon=True).start()
+        threading.Thread(
+            target=run_scheduled_searches, args=(site_id, "manual", datetime.utcnow()), daemon=True
+        ).start()
         return {
             "success": True,
             "message": f"Arama başlatıldı (site: {site_id})"
@@ -0,0 +1,185 @@
+"""
+Response sıkıştırma middleware'i (brotli / gzip)
+
+Belirli bir boyutun üzerindeki sıkıştırılabilir response'lar (JSON, CSV,
+NDJSON, HTML, JS, CSS...) istemcinin `Accept-Encoding` başlığına göre brotli
+veya gzip ile sıkıştırılır. Zaten `Content-Encoding` taşıyan response'lara
+(ör. önceden sıkıştırılmış statik dosyalar) ve Excel/PDF gibi ikili
+formatlara dokunulmaz. Streaming response'lar parça parça sıkıştırılıp her
+parçada flush edilir, böylece ilk byte gecikmesi artmaz.
+"""
+import os
+import zlib
+from typing import Optional, Set
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli kurulu değilse sadece gzip kullanılır
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+
+def _is_compressible(content_type: str) -> bool:
+    return any(content_type.startswith(t) for t in COMPRESSIBLE_TYPES)
+
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    """Accept-Encoding başlığındaki kodlama isimlerini döndürür"""
+    return {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Accept-Encoding başlığından desteklenen en iyi kodlamayı seçer"""
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    """gzip ve brotli için ortak artımlı sıkıştırma arayüzü"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31 -> gzip header/trailer
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + self._brotli.flush() if flush else out
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """Büyük ve sıkıştırılabilir response'ları brotli/gzip ile sıkıştırır"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MIN_BYTES,
+        gzip_level: int = 6,
+        brotli_quality: int = 4
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(
+            self.app, _Compressor(encoding, self.gzip_level, self.brotli_quality), self.minimum_size
+        )
+        await responder(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, compressor: _Compressor, minimum_size: int):
+        self.app = app
+        self.compressor = compressor
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.start_message: Optional[Message] = None
+        self.started = False
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message: Message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Başlıkları ilk body parçasını görene kadar beklet
+            self.start_message = message
+            return
+
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            skip = (
+                "content-encoding" in headers
+                or not _is_compressible(headers.get("content-type", ""))
+                or (not more_body and len(body) < self.minimum_size)
+            )
+            if skip:
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+
+            headers["Content-Encoding"] = self.compressor.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body:
+                # Tek parça response - tamamını sıkıştır
+                compressed = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(compressed))
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+
+            # Streaming response - uzunluk bilinmiyor
+            del headers["Content-Length"]
+            await self.send(self.start_message)
+            await self.send({
+                "type": "http.response.body",
+                "body": self.compressor.compress(body, flush=True),
+                "more_body": True
+            })
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        if more_body:
+            await self.send({
+                "type": "http.response.body",
+                "body": self.compressor.compress(body, flush=True),
+                "more_body": True
+            })
+        else:
+            await self.send({
+                "type": "http.response.body",
+                "body": self.compressor.compress(body) + self.compressor.finish()
+            })
@@ -0,0 +1,195 @@
+"""
+Tüm siteler için günlük özet
+
+Her sitenin özeti ayrı bir worker thread'de kendi session'ıyla, ORM nesnesi
+yüklemeden aggregate sorgularla üretilir: arama ve kelime sayısı, benzersiz
+link sayısı ve en çok görünen linkler gün aralığındaki aramalar üzerinden
+(`search_date` index'i), domain görünürlüğü `domain_daily_rollup`'tan,
+giren/çıkan/yer değiştiren URL sayıları `run_diffs`'ten okunur. Site
+özetleri tek bir bildirimde birleştirilir ve bildirim outbox'ına eklenir
+(`app.alerts`); email her site için ayrı bir bölüm içerir.
+
+Belirli bir günün özeti gönderilmeden görüntülenebilir:
+
+    python -m app.daily_digest --date 2024-01-15
+    python -m app.daily_digest --sites default,gala
+
+Ayarlar:
+    DAILY_DIGEST_WORKERS  Paralel özetlenen site sayısı (varsayılan 4)
+"""
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import orjson
+from sqlalchemy import distinct, func
+
+from app.alerts import alert_dispatcher, enqueue_daily_summary
+from app.database import DomainDailyRollup, RunDiff, SearchLink, SearchResult, get_session_maker
+from app.export_archive import existing_sites
+
+logger = logging.getLogger(__name__)
+
+DAILY_DIGEST_WORKERS = int(os.getenv("DAILY_DIGEST_WORKERS", "4"))
+TOP_LIMIT = 10
+
+# Birleşik özetin yazıldığı outbox (gönderici tüm sitelerin outbox'larını boşaltır)
+DIGEST_SITE_ID = "default"
+
+
+def site_summary(site_id: str, day: datetime) -> Optional[Dict]:
+    """Bir sitenin gün özeti; o gün arama yapılmadıysa None"""
+    start = day.replace(hour=0, minute=0, second=0, microsecond=0)
+    end = start + timedelta(days=1)
+    date = start.strftime("%Y-%m-%d")
+    db = get_session_maker(site_id)()
+    try:
+        total_searches, keywords = db.query(
+            func.count(SearchResult.id),
+            func.count(distinct(SearchResult.search_query))
+        ).filter(
+            SearchResult.search_date >= start,
+            SearchResult.search_date < end
+        ).one()
+        if not total_searches:
+            return None
+
+        in_day = (SearchResult.search_date >= start, SearchResult.search_date < end)
+        unique_links = db.query(func.count(distinct(SearchLink.url))).join(
+            SearchResult, SearchLink.search_result_id == SearchResult.id
+        ).filter(*in_day).scalar()
+
+        top_links = [
+            {
+                "url": url,
+                "domain": domain,
+                "total_appearances": appearances,
+                "average_position": round(average_position or 0, 1),
+            }
+            for url, domain, appearances, average_position in db.query(
+                SearchLink.url,
+                func.max(SearchLink.domain),
+                func.count(SearchLink.id),
+                func.avg(SearchLink.position)
+            ).join(
+                SearchResult, SearchLink.search_result_id == SearchResult.id
+            ).filter(*in_day).group_by(
+                SearchLink.url
+            ).order_by(
+                func.count(SearchLink.id).desc(), func.avg(SearchLink.position)
+            ).limit(TOP_LIMIT)
+        ]
+
+        total_weight = db.query(func.sum(DomainDailyRollup.sov_weight)).filter(
+            DomainDailyRollup.day == date
+        ).scalar() or 0.0
+        top_domains = [
+            {
+                "domain": domain,
+                "appearances": appearances,
+                "average_position": round(position_sum / links, 1) if links else None,
+                "share_of_voice": round(weight / total_weight * 100, 1) if total_weight else 0.0,
+            }
+            for domain, appearances, position_sum, links, weight in db.query(
+                DomainDailyRollup.domain,
+                DomainDailyRollup.appearances,
+                DomainDailyRollup.position_sum,
+                DomainDailyRollup.links,
+                DomainDailyRollup.sov_weight
+            ).filter(
+                DomainDailyRollup.day == date
+            ).order_by(
+                DomainDailyRollup.sov_weight.desc()
+            ).limit(TOP_LIMIT)
+        ]
+
+        entered, exited, moved = db.query(
+            func.coalesce(func.sum(RunDiff.entered), 0),
+            func.coalesce(func.sum(RunDiff.exited), 0),
+            func.coalesce(func.sum(RunDiff.moved), 0)
+        ).join(
+            SearchResult, RunDiff.search_result_id == SearchResult.id
+        ).filter(*in_day).one()
+
+        return {
+            "site_id": site_id,
+            "total_searches": total_searches,
+            "keywords": keywords,
+            "unique_links": unique_links,
+            "entered": entered,
+            "exited": exited,
+            "moved": moved,
+            "top_links": top_links,
+            "top_domains": top_domains,
+        }
+    finally:
+        db.close()
+
+
+def build_daily_digest(site_ids: Sequence[str], day: datetime) -> Dict:
+    """Sitelerin gün özetlerini paralel üretip tek özette birleştirir (site sırası korunur)"""
+    site_ids = existing_sites(site_ids)
+    sites: List[Dict] = []
+    if site_ids:
+        with ThreadPoolExecutor(
+            max_workers=min(DAILY_DIGEST_WORKERS, len(site_ids)), thread_name_prefix="daily-digest"
+        ) as pool:
+            futures = [(site_id, pool.submit(site_summary, site_id, day)) for site_id in site_ids]
+            for site_id, future in futures:
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    # Bir sitenin hatası diğer sitelerin özetini engellemez
+                    logger.error(f"[{site_id}] Günlük özet oluşturulamadı: {e}", exc_info=True)
+                    continue
+                if summary:
+                    sites.append(summary)
+    return {"date": day.strftime("%Y-%m-%d"), "sites": sites}
+
+
+def queue_daily_digest(site_ids: Sequence[str], day: Optional[datetime] = None) -> Optional[Dict]:
+    """Günün (varsayılan: dün) birleşik özetini bildirim outbox'ına ekler; hiç arama yoksa eklenmez"""
+    if day is None:
+        day = datetime.utcnow() - timedelta(days=1)
+    digest = build_daily_digest(site_ids, day)
+    if not digest["sites"]:
+        logger.info(f"Günlük özet: {digest['date']} için arama yok")
+        return None
+
+    db = get_session_maker(DIGEST_SITE_ID)()
+    try:
+        enqueue_daily_summary(db, digest["date"], digest)
+        db.commit()
+    finally:
+        db.close()
+    alert_dispatcher.notify(DIGEST_SITE_ID)
+    return digest
+
+
+def main(argv=None) -> int:
+    from app.export_archive import parse_choices
+    from app.scheduler import VALID_SITE_IDS
+
+    parser = argparse.ArgumentParser(description="Tüm siteler için günlük özeti gösterir")
+    parser.add_argument("--date", help="Gün (YYYY-MM-DD, varsayılan: dün)")
+    parser.add_argument("--sites", help="Virgülle ayrılmış site ID'leri (varsayılan: tüm siteler)")
+    args = parser.parse_args(argv)
+
+    try:
+        site_ids = parse_choices(args.sites, VALID_SITE_IDS)
+        day = datetime.strptime(args.date, "%Y-%m-%d") if args.date else datetime.utcnow() - timedelta(days=1)
+    except ValueError as e:
+        parser.error(str(e))
+
+    logging.basicConfig(level=logging.INFO)
+    digest = build_daily_digest(site_ids, day)
+    sys.stdout.write(orjson.dumps(digest, option=orjson.OPT_INDENT_2).decode() + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
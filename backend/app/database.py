@@ -1,10 +1,13 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import create_engine, inspect, Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Float, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
+import logging
 import os
 from typing import Dict
 
+logger = logging.getLogger(__name__)
+
 # SQLite database - Multi-site desteği
 # Her site için ayrı database dosyası
 # Environment variable'dan data path'i al, yoksa varsayılan kullan
@@ -24,6 +27,7 @@ os.makedirs(data_dir, exist_ok=True)
 # Engine cache - her site için ayrı engine
 _engines: Dict[str, any] = {}
 _session_makers: Dict[str, any] = {}
+_migrated_sites = set()
 
 Base = declarative_base()
 
@@ -82,19 +86,25 @@ class SearchResult(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     settings_id = Column(Integer, ForeignKey("search_settings.id"))
+    search_query = Column(String)  # Aranan tek kelime (ayardaki çoklu kelimelerden biri)
     search_date = Column(DateTime, default=datetime.utcnow, index=True)
     total_results = Column(Integer, default=0)
     
     # Relationships
     settings = relationship("SearchSettings", back_populates="search_results")
     links = relationship("SearchLink", back_populates="search_result")
+    
+    __table_args__ = (
+        # Kelimenin son çalıştırmaları (snapshot diff)
+        Index("ix_search_results_query_date", "search_query", "search_date"),
+    )
 
 
 class SearchLink(Base):
     __tablename__ = "search_links"
     
     id = Column(Integer, primary_key=True, index=True)
-    search_result_id = Column(Integer, ForeignKey("search_results.id"))
+    search_result_id = Column(Integer, ForeignKey("search_results.id"), index=True)
     url = Column(String, nullable=False, index=True)
     title = Column(String)
     snippet = Column(Text)
@@ -106,10 +116,139 @@ class SearchLink(Base):
     search_result = relationship("SearchResult", back_populates="links")
 
 
+class DomainDailyRollup(Base):
+    """Domain başına günlük görünürlük özeti (ingest sırasında artımlı güncellenir)"""
+    __tablename__ = "domain_daily_rollup"
+    
+    day = Column(String, primary_key=True)  # YYYY-MM-DD (UTC)
+    domain = Column(String, primary_key=True)
+    appearances = Column(Integer, default=0)  # Domain'in göründüğü arama sayısı
+    links = Column(Integer, default=0)  # Toplam link sayısı
+    position_sum = Column(Integer, default=0)
+    best_position = Column(Integer)
+    worst_position = Column(Integer)
+    sov_weight = Column(Float, default=0.0)  # CTR eğrisiyle ağırlıklandırılmış görünürlük
+
+
+class RunDiff(Base):
+    """Bir çalıştırmanın aynı kelimenin önceki çalıştırmasına göre farkı (ingest sırasında hesaplanır)"""
+    __tablename__ = "run_diffs"
+    
+    search_result_id = Column(Integer, ForeignKey("search_results.id"), primary_key=True)
+    previous_result_id = Column(Integer, ForeignKey("search_results.id"))
+    search_query = Column(String)
+    entered = Column(Integer, default=0)
+    exited = Column(Integer, default=0)
+    moved = Column(Integer, default=0)
+    payload = Column(Text)  # JSON: giren, çıkan ve yer değiştiren URL'ler
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class AlertOutbox(Base):
+    """Gönderilecek bildirimler (ingest transaction'ında yazılır, `app.alerts` göndericisi boşaltır)"""
+    __tablename__ = "alert_outbox"
+    
+    id = Column(Integer, primary_key=True)
+    dedupe_key = Column(String, nullable=False, unique=True)  # tür:çalıştırma:url (günlük özet: daily_summary:tarih)
+    kind = Column(String, nullable=False)  # change, critical, daily_summary
+    url = Column(String)  # Pozisyon uyarılarında URL bekleme süresi kontrolü için
+    search_result_id = Column(Integer)
+    payload = Column(Text, nullable=False)  # JSON
+    status = Column(String, nullable=False, default="pending")  # pending, sent, suppressed, skipped, failed
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index("ix_alert_outbox_due", "status", "next_attempt_at"),
+        Index("ix_alert_outbox_url_sent", "url", "sent_at"),
+    )
+
+
+class RunLedger(Base):
+    """Her arama çalıştırmasının (kelime başına) zamanlama ve sonuç kaydı"""
+    __tablename__ = "run_ledger"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(String, index=True)  # Aynı tetiklemedeki kelimeler aynı batch'i paylaşır
+    site_id = Column(String, nullable=False)
+    keyword = Column(String, nullable=False)
+    trigger = Column(String, nullable=False)  # scheduled, manual, catchup (kaçırılan interval için hemen çalıştırma)
+    status = Column(String, nullable=False, default="running")  # running, success, error
+    queued_at = Column(DateTime, index=True)  # Planlanan / istenen zaman
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    serpapi_latency_ms = Column(Float)
+    rows_inserted = Column(Integer, default=0)
+    retries = Column(Integer, default=0)
+    error = Column(Text)
+    search_result_id = Column(Integer)
+
+
+# Sonradan eklenen kolonlar için eski satırları dolduran SQL'ler
+_COLUMN_BACKFILLS = {
+    ("search_results", "search_query"): (
+        # Kelime run ledger'da kayıtlı
+        "UPDATE search_results SET search_query = run_ledger.keyword FROM run_ledger "
+        "WHERE run_ledger.search_result_id = search_results.id AND search_results.search_query IS NULL",
+        # Ledger öncesi kayıtlar: ayar tek kelimeyse o kelime
+        "UPDATE search_results SET search_query = search_settings.search_query FROM search_settings "
+        "WHERE search_settings.id = search_results.settings_id AND search_results.search_query IS NULL "
+        "AND instr(search_settings.search_query, ',') = 0",
+    ),
+}
+
+
+def _backfill_domain_rollup(engine):
+    from app.share_of_voice import rebuild_domain_rollup
+    db = sessionmaker(bind=engine)()
+    try:
+        rebuild_domain_rollup(db)
+    finally:
+        db.close()
+
+
+# Sonradan eklenen rollup tabloları: tablo boşken ham veri varsa mevcut veriden bir kere doldurulur.
+# Ingest'ten (ilk catch-up çalıştırması dahil) önce, init_db içinde çalışır.
+_TABLE_BACKFILLS = {
+    "domain_daily_rollup": ("search_links", _backfill_domain_rollup),
+}
+
+
+def _migrate(engine):
+    """create_all'un mevcut tablolara eklemediği kolon ve index'leri oluşturur, yeni rollup'ları doldurur"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+                for statement in _COLUMN_BACKFILLS.get((table.name, column.name), ()):
+                    conn.exec_driver_sql(statement)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    for table_name, (source, backfill) in _TABLE_BACKFILLS.items():
+        with engine.connect() as conn:
+            empty = conn.exec_driver_sql(f"SELECT 1 FROM {table_name} LIMIT 1").first() is None
+            has_source = conn.exec_driver_sql(f"SELECT 1 FROM {source} LIMIT 1").first() is not None
+        if empty and has_source:
+            logger.info(f"{table_name} mevcut verilerden oluşturuluyor...")
+            backfill(engine)
+
+
 def init_db(site_id: str = "default"):
     """Initialize database tables for a specific site"""
     engine = get_engine(site_id)
     Base.metadata.create_all(bind=engine)
+    if site_id not in _migrated_sites:
+        _migrate(engine)
+        _migrated_sites.add(site_id)
 
 
 def get_db(site_id: str = "default"):
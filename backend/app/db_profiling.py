@@ -0,0 +1,184 @@
+"""
+SQL sorgu profil hook'ları
+
+SQLAlchemy `before/after_cursor_execute` event'leri ile her SQL ifadesinin
+süresi ölçülür:
+- Tüm ifadeler `db_query_seconds` metriğine site etiketiyle yazılır.
+- Eşiği aşan ifadeler `EXPLAIN QUERY PLAN` çıktısıyla birlikte loglanır.
+- Bir HTTP isteği içinde çalışan ifadeler istek bazında toplanır (sayı,
+  toplam süre, aynı ifade kalıbının tekrar sayısı). Aynı kalıp eşik kadar
+  tekrarlanırsa olası N+1 olarak loglanır.
+
+İstek bazlı toplama bir ContextVar üzerinden yapılır; scheduler
+thread'lerinde istek bağlamı olmadığı için sadece metrik ve yavaş sorgu
+logu çalışır.
+
+Ortam değişkenleri:
+    DB_SLOW_QUERY_MS         Yavaş sorgu eşiği (varsayılan: 200)
+    DB_REPEAT_THRESHOLD      Aynı kalıbın kaç tekrarı N+1 sayılır (varsayılan: 10)
+    DB_PROFILE_HEADERS       true ise X-DB-* response başlıkları eklenir (varsayılan: false)
+"""
+import logging
+import os
+import re
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.metrics import (
+    db_query_seconds, db_slow_queries_total, http_db_seconds, http_db_queries,
+    db_repeated_statements_total
+)
+
+logger = logging.getLogger(__name__)
+
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+DB_REPEAT_THRESHOLD = int(os.getenv("DB_REPEAT_THRESHOLD", "10"))
+DB_PROFILE_HEADERS = os.getenv("DB_PROFILE_HEADERS", "false").lower() in ("1", "true", "yes")
+
+_WHITESPACE = re.compile(r"\s+")
+# "IN (?, ?, ?)" listeleri uzunluğa göre farklı kalıp üretmesin
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+class RequestDBStats:
+    """Tek bir istek sırasında çalışan SQL ifadelerinin özeti"""
+
+    __slots__ = ("query_count", "total_seconds", "shapes")
+
+    def __init__(self):
+        self.query_count = 0
+        self.total_seconds = 0.0
+        self.shapes: Dict[str, int] = {}
+
+    def repeated(self, threshold: int = DB_REPEAT_THRESHOLD) -> List[Tuple[str, int]]:
+        """Eşik kadar veya daha fazla tekrarlanan ifade kalıpları (çoktan aza)"""
+        return sorted(
+            ((shape, count) for shape, count in self.shapes.items() if count >= threshold),
+            key=lambda item: item[1],
+            reverse=True
+        )
+
+    def max_repeat(self) -> int:
+        return max(self.shapes.values(), default=0)
+
+
+_request_stats: ContextVar[Optional[RequestDBStats]] = ContextVar("request_db_stats", default=None)
+
+# Engine -> site_id (veritabanı dosyasının bulunduğu dizin adı)
+_engine_sites: Dict[int, str] = {}
+
+_installed = False
+
+
+def _site_of(engine: Engine) -> str:
+    site = _engine_sites.get(id(engine))
+    if site is None:
+        database = engine.url.database or ""
+        site = os.path.basename(os.path.dirname(database)) or "default"
+        _engine_sites[id(engine)] = site
+    return site
+
+
+def statement_shape(statement: str) -> str:
+    """Parametre sayısından bağımsız, normalize edilmiş ifade kalıbı"""
+    return _IN_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    """Ham DBAPI bağlantısı üzerinden EXPLAIN QUERY PLAN çıktısını döndürür"""
+    if conn.dialect.name != "sqlite" or not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    try:
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+            return "; ".join(str(row[-1]) for row in cursor.fetchall())
+        finally:
+            cursor.close()
+    except Exception as e:
+        return f"explain başarısız: {e}"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start_time")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    site = _site_of(conn.engine)
+    db_query_seconds.observe(elapsed, site=site)
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.query_count += 1
+        stats.total_seconds += elapsed
+        shape = statement_shape(statement)
+        stats.shapes[shape] = stats.shapes.get(shape, 0) + 1
+
+    if elapsed * 1000 >= DB_SLOW_QUERY_MS:
+        db_slow_queries_total.inc(site=site)
+        plan = None if executemany else _explain(conn, statement, parameters)
+        logger.warning("slow query", extra={"fields": {
+            "site_id": site,
+            "duration_ms": round(elapsed * 1000, 2),
+            "statement": statement_shape(statement)[:2000],
+            "plan": plan,
+        }})
+
+
+def install_query_profiling():
+    """Tüm engine'ler için profil hook'larını kaydeder (idempotent)"""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
+
+
+def begin_request():
+    """İstek için yeni bir toplama nesnesi başlatır; `finish_request`'e verilecek token döner"""
+    stats = RequestDBStats()
+    return stats, _request_stats.set(stats)
+
+
+def finish_request(token):
+    """İstek bağlamını kapatır (`begin_request`'in çağrıldığı context'te çağrılmalı)"""
+    _request_stats.reset(token)
+
+
+def add_db_headers(stats: RequestDBStats, headers):
+    """`DB_PROFILE_HEADERS` açıksa response başlıklarına o ana kadarki özeti ekler
+
+    Başlıklar gövdeden önce gönderildiği için streaming gövdenin sorguları
+    başlıklarda değil, sadece metrik ve loglarda görünür.
+    """
+    if DB_PROFILE_HEADERS and stats.query_count:
+        headers["X-DB-Query-Count"] = str(stats.query_count)
+        headers["X-DB-Time-Ms"] = f"{stats.total_seconds * 1000:.2f}"
+        headers["X-DB-Max-Repeat"] = str(stats.max_repeat())
+
+
+def end_request(stats: RequestDBStats, method: str, route: str):
+    """İstek özetini (streaming gövde dahil) metriklere yazar ve olası N+1'leri loglar"""
+    if stats.query_count == 0:
+        return
+
+    http_db_seconds.observe(stats.total_seconds, method=method, route=route)
+    http_db_queries.observe(stats.query_count, method=method, route=route)
+
+    for shape, count in stats.repeated():
+        db_repeated_statements_total.inc(method=method, route=route)
+        logger.warning("repeated statement (possible N+1)", extra={"fields": {
+            "method": method,
+            "route": route,
+            "count": count,
+            "statement": shape[:2000],
+        }})
@@ -1,6 +1,12 @@
-from fastapi import Query
+import os
+import secrets
+from typing import Optional
+from fastapi import Header, HTTPException, Query
 from app.database import get_db as _get_db
 
+# Admin endpoint'leri (profiler vb.) için token; tanımlı değilse bu endpoint'ler kapalıdır
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
 def get_site_id(site_id: str = Query("default", description="Site ID")) -> str:
     """Site ID'yi query parametresinden alır"""
     return site_id
@@ -10,3 +16,14 @@ def get_db(site_id: str = Query("default", description="Site ID")):
     for db in _get_db(site_id):
         yield db
 
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Verilen token ADMIN_TOKEN ile eşleşiyor mu (token tanımlı değilse her zaman False)"""
+    return bool(ADMIN_TOKEN) and token is not None and secrets.compare_digest(token, ADMIN_TOKEN)
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """X-Admin-Token başlığını doğrular"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoint'leri devre dışı")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Geçersiz admin token")
@@ -1,16 +1,38 @@
+"""
+Email bildirimleri
+
+Gönderimler `app.alerts` dispatcher'ının event loop'unda yapılır ve tek bir
+kimliği doğrulanmış SMTP bağlantısını paylaşır: bağlantı ilk gönderimde
+açılır, sonraki mesajlar aynı bağlantı üzerinden gider. Sunucu boştaki
+bağlantıyı kapatmış olabileceği için `SMTP_IDLE_SECONDS`'tan uzun süre
+kullanılmayan bağlantı yeniden açılır; gönderim sırasında bağlantı koparsa
+bir kez yeniden bağlanılıp tekrar denenir.
+
+465 portunda doğrudan TLS (SMTPS), diğer portlarda (587) STARTTLS kullanılır;
+`SMTP_USE_TLS` ile değiştirilebilir.
+"""
+import asyncio
+import html
+import logging
 import os
+import time
 import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 # Email ayarları (environment variables'dan alınacak)
 SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USER = os.getenv("SMTP_USER", "")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
 SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USER)
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true" if SMTP_PORT == 465 else "false").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "60"))
 EMAIL_ENABLED = os.getenv("EMAIL_ENABLED", "false").lower() == "true"
 NOTIFICATION_EMAILS = os.getenv("NOTIFICATION_EMAILS", "").split(",") if os.getenv("NOTIFICATION_EMAILS") else []
 
@@ -19,6 +41,60 @@ class EmailService:
     def __init__(self):
         self.enabled = EMAIL_ENABLED and SMTP_USER and SMTP_PASSWORD
         self.recipients = [email.strip() for email in NOTIFICATION_EMAILS if email.strip()]
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._last_used = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    async def _connection(self) -> aiosmtplib.SMTP:
+        """Açık SMTP bağlantısını döndürür; yoksa, kopmuşsa ya da uzun süre boşta kaldıysa yeniden bağlanır"""
+        if self._smtp is not None and (
+            not self._smtp.is_connected or time.monotonic() - self._last_used > SMTP_IDLE_SECONDS
+        ):
+            await self.close()
+        if self._smtp is None:
+            smtp = aiosmtplib.SMTP(
+                hostname=SMTP_HOST,
+                port=SMTP_PORT,
+                username=SMTP_USER,
+                password=SMTP_PASSWORD,
+                use_tls=SMTP_USE_TLS,
+                timeout=SMTP_TIMEOUT
+            )
+            await smtp.connect()
+            self._smtp = smtp
+            logger.info(f"SMTP bağlantısı açıldı: {SMTP_HOST}:{SMTP_PORT}")
+        return self._smtp
+    
+    async def close(self):
+        """Havuzdaki SMTP bağlantısını kapatır"""
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+    
+    async def _deliver(self, message: MIMEMultipart):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Bağlantı ve kilit başka (kapatılmış) bir loop'a ait; bu loop'ta yeniden oluştur
+            self._smtp = None
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        async with self._lock:
+            for attempt in (1, 2):
+                smtp = await self._connection()
+                try:
+                    await smtp.send_message(message)
+                    self._last_used = time.monotonic()
+                    return
+                except aiosmtplib.SMTPServerDisconnected:
+                    # Sunucu bağlantıyı kapatmış; bir kez yeniden bağlanıp dene
+                    await self.close()
+                    if attempt == 2:
+                        raise
     
     async def send_email(
         self,
@@ -27,142 +103,156 @@ class EmailService:
         recipients: Optional[List[str]] = None,
         html: bool = False
     ) -> bool:
-        """Email gönder"""
+        """Email gönder; email kapalıysa ya da alıcı yoksa False döner
+
+        SMTP hataları çağırana iletilir (outbox satırına gerçek hata yazılsın).
+        """
         if not self.enabled:
-            print(f"Email gönderilemedi (devre dışı): {subject}")
+            logger.info(f"Email gönderilemedi (devre dışı): {subject}")
             return False
         
         if not recipients:
             recipients = self.recipients
         
         if not recipients:
-            print("Email alıcısı belirtilmedi")
+            logger.warning("Email alıcısı belirtilmedi")
             return False
         
-        try:
-            message = MIMEMultipart("alternative")
-            message["Subject"] = subject
-            message["From"] = SMTP_FROM
-            message["To"] = ", ".join(recipients)
-            
-            if html:
-                message.attach(MIMEText(body, "html"))
-            else:
-                message.attach(MIMEText(body, "plain"))
-            
-            await aiosmtplib.send(
-                message,
-                hostname=SMTP_HOST,
-                port=SMTP_PORT,
-                username=SMTP_USER,
-                password=SMTP_PASSWORD,
-                use_tls=True
-            )
-            
-            print(f"Email gönderildi: {subject} -> {recipients}")
-            return True
-        except Exception as e:
-            print(f"Email gönderme hatası: {str(e)}")
-            return False
+        message = MIMEMultipart("alternative")
+        message["Subject"] = subject
+        message["From"] = SMTP_FROM
+        message["To"] = ", ".join(recipients)
+        
+        if html:
+            message.attach(MIMEText(body, "html"))
+        else:
+            message.attach(MIMEText(body, "plain"))
+        
+        await self._deliver(message)
+        
+        logger.info(f"Email gönderildi: {subject} -> {recipients}")
+        return True
     
-    async def send_position_change_alert(
-        self,
-        url: str,
-        domain: str,
-        old_position: int,
-        new_position: int,
-        change: int
-    ):
-        """Pozisyon değişikliği bildirimi"""
-        direction = "yükseldi" if change < 0 else "düştü"
-        emoji = "📈" if change < 0 else "📉"
+    async def send_alert_digest(self, alerts: Sequence, recipients: Optional[List[str]] = None) -> bool:
+        """Bir dönemde biriken pozisyon uyarılarını tek email olarak gönderir (`app.alerts.PositionAlert`)"""
+        critical = [alert for alert in alerts if alert.severe]
+        if critical:
+            subject = f"⚠️ KRİTİK: {len(critical)} URL'de kritik değişiklik ({len(alerts)} değişiklik)"
+        else:
+            subject = f"📊 Pozisyon Değişiklikleri: {len(alerts)} URL"
         
-        subject = f"{emoji} Pozisyon Değişikliği: {domain}"
+        rows_html = ""
+        for alert in sorted(alerts, key=lambda alert: (not alert.severe, -abs(alert.change or 0))):
+            if alert.kind == "entered":
+                change = "🆕 ilk sıralara girdi"
+            elif alert.kind == "exited":
+                change = "❌ sonuçlardan çıktı"
+            else:
+                direction = "📈 yükseldi" if alert.change < 0 else "📉 düştü"
+                change = f"{abs(alert.change)} pozisyon {direction}"
+            style = ' style="color: red; font-weight: bold;"' if alert.severe else ""
+            rows_html += f"""
+            <tr{style}>
+                <td>{html.escape(alert.site_id)}</td>
+                <td>{html.escape(alert.keyword or "")}</td>
+                <td>{html.escape(alert.domain or "")}</td>
+                <td><a href="{html.escape(alert.url)}">{html.escape(alert.url)}</a></td>
+                <td>{f"#{alert.old_position}" if alert.old_position is not None else "-"}</td>
+                <td>{f"#{alert.new_position}" if alert.new_position is not None else "-"}</td>
+                <td>{change}</td>
+            </tr>
+            """
         
         body = f"""
         <html>
         <body>
             <h2>Pozisyon Değişikliği Bildirimi</h2>
-            <p><strong>Domain:</strong> {domain}</p>
-            <p><strong>URL:</strong> {url}</p>
-            <p><strong>Eski Pozisyon:</strong> #{old_position}</p>
-            <p><strong>Yeni Pozisyon:</strong> #{new_position}</p>
-            <p><strong>Değişim:</strong> {abs(change)} pozisyon {direction}</p>
             <p><strong>Tarih:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+            {'<p style="color: red; font-weight: bold;">Kritik düşüşleri lütfen inceleyin!</p>' if critical else ''}
+            <table border="1" cellpadding="8" style="border-collapse: collapse;">
+                <tr>
+                    <th>Site</th>
+                    <th>Kelime</th>
+                    <th>Domain</th>
+                    <th>URL</th>
+                    <th>Eski</th>
+                    <th>Yeni</th>
+                    <th>Değişim</th>
+                </tr>
+                {rows_html}
+            </table>
         </body>
         </html>
         """
         
-        return await self.send_email(subject, body, html=True)
+        return await self.send_email(subject, body, recipients, html=True)
     
-    async def send_daily_summary(
-        self,
-        total_searches: int,
-        unique_links: int,
-        top_links: List[Dict],
-        date: str
-    ):
-        """Günlük özet email"""
-        subject = f"📊 Google Search Bot - Günlük Özet ({date})"
+    async def send_daily_summary(self, date: str, sites: List[Dict]) -> bool:
+        """Tüm sitelerin günlük özeti; her site için ayrı bölüm (`app.daily_digest`)"""
+        total_searches = sum(site["total_searches"] for site in sites)
+        subject = f"📊 Google Search Bot - Günlük Özet ({date}) - {len(sites)} site, {total_searches} arama"
         
-        top_links_html = ""
-        for i, link in enumerate(top_links[:10], 1):
-            top_links_html += f"""
-            <tr>
-                <td>{i}</td>
-                <td>{link.get('domain', 'N/A')}</td>
-                <td>#{link.get('average_position', 0).toFixed(1)}</td>
-                <td>{link.get('total_appearances', 0)}</td>
-            </tr>
-            """
-        
-        body = f"""
-        <html>
-        <body>
-            <h2>Günlük Arama Özeti - {date}</h2>
-            <div style="margin: 20px 0;">
-                <p><strong>Toplam Arama:</strong> {total_searches}</p>
-                <p><strong>Benzersiz Link:</strong> {unique_links}</p>
+        sections_html = ""
+        for site in sites:
+            top_links_html = ""
+            for i, link in enumerate(site["top_links"], 1):
+                top_links_html += f"""
+                <tr>
+                    <td>{i}</td>
+                    <td>{html.escape(link.get('domain') or 'N/A')}</td>
+                    <td><a href="{html.escape(link['url'])}">{html.escape(link['url'])}</a></td>
+                    <td>#{link.get('average_position') or 0:.1f}</td>
+                    <td>{link.get('total_appearances', 0)}</td>
+                </tr>
+                """
+            
+            top_domains_html = ""
+            for domain in site["top_domains"]:
+                average_position = domain.get("average_position")
+                top_domains_html += f"""
+                <tr>
+                    <td>{html.escape(domain['domain'])}</td>
+                    <td>%{domain.get('share_of_voice') or 0:.1f}</td>
+                    <td>{f"#{average_position:.1f}" if average_position is not None else "-"}</td>
+                    <td>{domain.get('appearances', 0)}</td>
+                </tr>
+                """
+            
+            sections_html += f"""
+            <h3>{html.escape(site['site_id'])}</h3>
+            <div style="margin: 10px 0;">
+                <p><strong>Toplam Arama:</strong> {site['total_searches']} ({site['keywords']} kelime)</p>
+                <p><strong>Benzersiz Link:</strong> {site['unique_links']}</p>
+                <p><strong>Değişiklikler:</strong> {site['entered']} giren, {site['exited']} çıkan, {site['moved']} yer değiştiren</p>
             </div>
-            <h3>En Çok Görünen Linkler</h3>
-            <table border="1" cellpadding="10" style="border-collapse: collapse;">
+            <h4>En Çok Görünen Linkler</h4>
+            <table border="1" cellpadding="8" style="border-collapse: collapse;">
                 <tr>
                     <th>Sıra</th>
                     <th>Domain</th>
+                    <th>URL</th>
                     <th>Ort. Pozisyon</th>
                     <th>Görünme</th>
                 </tr>
                 {top_links_html}
             </table>
-        </body>
-        </html>
-        """
-        
-        return await self.send_email(subject, body, html=True)
-    
-    async def send_critical_drop_alert(
-        self,
-        url: str,
-        domain: str,
-        old_position: int,
-        new_position: int
-    ):
-        """Kritik düşüş uyarısı (5+ pozisyon düşüşü)"""
-        drop = new_position - old_position
-        
-        subject = f"⚠️ KRİTİK: {domain} - {drop} Pozisyon Düştü!"
+            <h4>Domain Görünürlüğü</h4>
+            <table border="1" cellpadding="8" style="border-collapse: collapse;">
+                <tr>
+                    <th>Domain</th>
+                    <th>Görünürlük Payı</th>
+                    <th>Ort. Pozisyon</th>
+                    <th>Görünme</th>
+                </tr>
+                {top_domains_html}
+            </table>
+            """
         
         body = f"""
         <html>
         <body>
-            <h2 style="color: red;">Kritik Pozisyon Düşüşü!</h2>
-            <p><strong>Domain:</strong> {domain}</p>
-            <p><strong>URL:</strong> {url}</p>
-            <p><strong>Eski Pozisyon:</strong> #{old_position}</p>
-            <p><strong>Yeni Pozisyon:</strong> #{new_position}</p>
-            <p><strong>Düşüş:</strong> {drop} pozisyon</p>
-            <p><strong>Tarih:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-            <p style="color: red; font-weight: bold;">Lütfen bu durumu inceleyin!</p>
+            <h2>Günlük Arama Özeti - {date}</h2>
+            {sections_html}
         </body>
         </html>
         """
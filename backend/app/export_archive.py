@@ -0,0 +1,204 @@
+"""
+Tüm sitelerin export'larını tek bir ZIP arşivi olarak stream etme
+
+Her site × export türü × format dosyası ayrı bir worker thread'de kendi
+session'ıyla üretilir (`SpooledTemporaryFile`; büyük dosyalar diske taşar).
+Tek bir birleştirici thread biten dosyaları bitiş sırasıyla arşive ekler.
+ZIP doğrudan response'a yazılır: arşiv seek edilemeyen bir yazıcıya
+(`zipfile` bu durumda data descriptor kullanır) ve oradan sınırlı boyutlu
+bir kuyruğa parça parça aktarılır. İstemci yavaş okursa kuyruk dolar ve
+üretim bekler; bağlantı kesilirse üretim durdurulur. Arşivin tamamı hiçbir
+zaman bellekte tutulmaz.
+
+Ayarlar:
+    EXPORT_ARCHIVE_WORKERS  Paralel üretilen dosya sayısı (varsayılan 3)
+"""
+import logging
+import os
+import queue
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.database import data_dir, get_session_maker
+from app.export_formats import EXPORT_FORMATS
+from app.export_rows import (
+    DAILY_FIELDS, POSITION_HISTORY_FIELDS, SUMMARY_FIELDS,
+    daily_records, position_history_records, summary_records
+)
+from app.export_writers import CHUNK_SIZE, iter_csv, spooled_file
+
+logger = logging.getLogger(__name__)
+
+EXPORT_ARCHIVE_WORKERS = int(os.getenv("EXPORT_ARCHIVE_WORKERS", "3"))
+QUEUE_CHUNKS = 16
+
+ARCHIVE_KINDS = ("daily", "position-history", "summary")
+ARCHIVE_FORMATS = ("csv", "xlsx")
+
+# tür -> (CSV kolonları, satır kaynağı, Excel export türü)
+_KIND_SOURCES = {
+    "daily": (DAILY_FIELDS, daily_records, "excel_daily"),
+    "position-history": (POSITION_HISTORY_FIELDS, position_history_records, "excel_position_history"),
+    "summary": (SUMMARY_FIELDS, summary_records, "excel_summary"),
+}
+
+_DONE = object()
+
+
+class ArchiveCancelled(Exception):
+    """İstemci bağlantıyı kapattı"""
+
+
+class _QueueWriter:
+    """ZIP çıktısını parçalar halinde sınırlı bir kuyruğa aktaran, seek edilemeyen yazıcı"""
+
+    def __init__(self, chunks: "queue.Queue", cancelled: threading.Event):
+        self.chunks = chunks
+        self.cancelled = cancelled
+        self.buffer = bytearray()
+
+    def write(self, data) -> int:
+        self.buffer += data
+        if len(self.buffer) >= CHUNK_SIZE:
+            self.put(bytes(self.buffer))
+            self.buffer.clear()
+        return len(data)
+
+    def flush(self):
+        if self.buffer:
+            self.put(bytes(self.buffer))
+            self.buffer.clear()
+
+    def put(self, item):
+        while True:
+            if self.cancelled.is_set():
+                raise ArchiveCancelled()
+            try:
+                self.chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+
+def existing_sites(site_ids: Sequence[str]) -> List[str]:
+    """Veritabanı dosyası olan siteler (boş veritabanı oluşturmamak için)"""
+    return [site_id for site_id in site_ids if os.path.exists(os.path.join(data_dir, site_id, "searchbot.db"))]
+
+
+def _cancellable(rows: Iterable, cancelled: threading.Event) -> Iterator:
+    """İptal edildiğinde satır okumayı kesen sarmalayıcı"""
+    for row in rows:
+        if cancelled.is_set():
+            raise ArchiveCancelled()
+        yield row
+
+
+def _produce(site_id: str, kind: str, fmt: str, since: datetime, cancelled: threading.Event):
+    """Tek bir arşiv dosyasını geçici dosyaya üretir"""
+    fields, source, excel_kind = _KIND_SOURCES[kind]
+    output = spooled_file()
+    db = get_session_maker(site_id)()
+    try:
+        if fmt == "csv":
+            for chunk in iter_csv(fields, _cancellable(source(db, since), cancelled)):
+                output.write(chunk)
+        else:
+            EXPORT_FORMATS[excel_kind].render(
+                db, output, since, track=lambda rows: _cancellable(rows, cancelled)
+            )
+    except Exception:
+        output.close()
+        raise
+    finally:
+        db.close()
+    return output
+
+
+def _assemble(
+    entries: List[Tuple[str, str, str]],
+    since: datetime,
+    chunks: "queue.Queue",
+    cancelled: threading.Event
+):
+    """Dosyaları paralel üretip bitiş sırasıyla ZIP'e yazar (arka plan thread'i)"""
+    writer = _QueueWriter(chunks, cancelled)
+    try:
+        with ThreadPoolExecutor(max_workers=EXPORT_ARCHIVE_WORKERS, thread_name_prefix="export-archive") as pool:
+            futures = {
+                pool.submit(_produce, site_id, kind, fmt, since, cancelled): f"{site_id}/{kind}.{fmt}"
+                for site_id, kind, fmt in entries
+            }
+            try:
+                with zipfile.ZipFile(writer, "w") as archive:
+                    for future in as_completed(futures):
+                        name = futures[future]
+                        output = future.result()
+                        try:
+                            # xlsx zaten sıkıştırılmış bir ZIP'tir
+                            compression = zipfile.ZIP_STORED if name.endswith(".xlsx") else zipfile.ZIP_DEFLATED
+                            info = zipfile.ZipInfo(name, date_time=datetime.now().timetuple()[:6])
+                            info.compress_type = compression
+                            output.seek(0)
+                            with archive.open(info, "w", force_zip64=True) as entry:
+                                while True:
+                                    data = output.read(CHUNK_SIZE)
+                                    if not data:
+                                        break
+                                    entry.write(data)
+                        finally:
+                            output.close()
+            finally:
+                # Hata/iptal durumunda bekleyen üretimleri başlatma
+                for future in futures:
+                    future.cancel()
+        writer.flush()
+        writer.put(_DONE)
+    except ArchiveCancelled:
+        logger.info("Export arşivi istemci tarafından iptal edildi")
+    except Exception as e:
+        logger.error(f"Export arşivi oluşturulamadı: {e}", exc_info=True)
+        try:
+            writer.put(e)
+        except ArchiveCancelled:
+            pass
+
+
+def stream_archive(
+    site_ids: Sequence[str],
+    kinds: Sequence[str],
+    formats: Sequence[str],
+    since: datetime
+) -> Iterator[bytes]:
+    """ZIP arşivini üretildikçe parça parça döndürür"""
+    entries = [(site_id, kind, fmt) for site_id in site_ids for kind in kinds for fmt in formats]
+    chunks: "queue.Queue" = queue.Queue(maxsize=QUEUE_CHUNKS)
+    cancelled = threading.Event()
+    thread = threading.Thread(
+        target=_assemble, args=(entries, since, chunks, cancelled), name="export-archive-zip", daemon=True
+    )
+    thread.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                # Başlıklar gönderildiği için hata ancak bağlantı kesilerek bildirilebilir
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+
+
+def parse_choices(value: Optional[str], allowed: Sequence[str]) -> List[str]:
+    """Virgülle ayrılmış seçimleri doğrular; boşsa tüm seçenekleri döndürür"""
+    if not value:
+        return list(allowed)
+    choices = [part.strip() for part in value.split(",") if part.strip()]
+    invalid = [choice for choice in choices if choice not in allowed]
+    if invalid:
+        raise ValueError(f"Geçersiz değer: {', '.join(invalid)} (geçerli: {', '.join(allowed)})")
+    return list(dict.fromkeys(choices))
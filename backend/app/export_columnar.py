@@ -0,0 +1,268 @@
+"""
+Pozisyon geçmişinin kolon bazlı (Parquet / Arrow) export'u
+
+`search_results` × `search_links` satırları (`history_records`) veritabanından
+`yield_per` ile okunur ve `COLUMNAR_BATCH_ROWS` satırlık Arrow record
+batch'lerine çevrilerek yazılır; bellekte aynı anda tek bir batch bulunur.
+Parquet'te her batch bir row group olur. Arrow çıktısı IPC dosya formatıdır
+(Feather v2; `pandas.read_feather` ile okunur).
+
+`search_query`, `url` ve `domain` kolonları sözlük (dictionary) kodludur: değerler dosya
+boyunca aynı kodları kullanır, yeni değerler sözlüğün sonuna eklenir
+(Arrow'da delta sözlük). pandas bu kolonları doğrudan `category` olarak
+okur. Sözlük, dosyadaki farklı URL sayısı kadar bellek kullanır.
+
+Tarihe göre bölümlenmiş dizin düzeni (Hive stili, `pandas.read_parquet(dizin)`
+ya da `pyarrow.dataset` ile okunur) CLI ile üretilir:
+
+    python -m app.export_columnar --output exports/history --days 365
+    python -m app.export_columnar --output exports/history --sites default,gala --format arrow --partition day
+
+    exports/history/site=default/month=2024-01/data.parquet
+
+pyarrow kurulu değilse bu export'lar kullanılamaz (`ColumnarUnavailable`).
+
+Ayarlar:
+    COLUMNAR_BATCH_ROWS    Batch (Parquet row group) başına satır (varsayılan 50000)
+    COLUMNAR_COMPRESSION   Sıkıştırma (varsayılan zstd; Arrow'da sadece zstd/lz4)
+"""
+import argparse
+import itertools
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.export_rows import HISTORY_FIELDS, history_records
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow kurulu değilse kolon bazlı export kapalı
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_BATCH_ROWS = int(os.getenv("COLUMNAR_BATCH_ROWS", "50000"))
+COLUMNAR_COMPRESSION = os.getenv("COLUMNAR_COMPRESSION", "zstd")
+
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.file"
+
+# Sözlük kodlu kolonlar
+DICTIONARY_FIELDS = ("search_query", "url", "domain")
+
+# Bölüm adı -> (bölüm değeri formatı, bölümün başlangıcı)
+PARTITIONS = {
+    "month": ("%Y-%m", lambda moment: moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)),
+    "day": ("%Y-%m-%d", lambda moment: moment.replace(hour=0, minute=0, second=0, microsecond=0)),
+}
+
+
+class ColumnarUnavailable(RuntimeError):
+    """pyarrow kurulu değil"""
+
+    def __init__(self):
+        super().__init__("Parquet/Arrow export için pyarrow kurulu olmalı")
+
+
+def history_schema() -> "pa.Schema":
+    if pa is None:
+        raise ColumnarUnavailable()
+    text = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("search_result_id", pa.int64()),
+        ("search_query", text),
+        ("search_date", pa.timestamp("us", tz="UTC")),
+        ("total_results", pa.int64()),
+        ("link_id", pa.int64()),
+        ("position", pa.int16()),
+        ("url", text),
+        ("domain", text),
+        ("title", pa.string()),
+        ("snippet", pa.string()),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+    ])
+
+
+class _DictionaryEncoder:
+    """Batch'ler boyunca aynı kodları kullanan sözlük; yeni değerler sona eklenir"""
+
+    def __init__(self):
+        self.codes = {}
+        self.values: List[str] = []
+        self.dictionary = pa.array([], pa.string())
+
+    def encode(self, values: Sequence[Optional[str]]) -> "pa.DictionaryArray":
+        codes = self.codes
+        indices = []
+        for value in values:
+            if value is None:
+                indices.append(None)
+                continue
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(self.values)
+                self.values.append(value)
+            indices.append(code)
+        if len(self.dictionary) != len(self.values):
+            self.dictionary = pa.array(self.values, pa.string())
+        return pa.DictionaryArray.from_arrays(pa.array(indices, pa.int32()), self.dictionary)
+
+
+class _BatchBuilder:
+    """Satır tuple'larından `HISTORY_FIELDS` sırasıyla record batch üretir"""
+
+    def __init__(self, schema: "pa.Schema"):
+        self.schema = schema
+        self.encoders = {name: _DictionaryEncoder() for name in DICTIONARY_FIELDS}
+
+    def build(self, rows: List[Tuple]) -> "pa.RecordBatch":
+        arrays = []
+        for field, values in zip(self.schema, zip(*rows)):
+            encoder = self.encoders.get(field.name)
+            arrays.append(encoder.encode(values) if encoder else pa.array(values, field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+
+def _batches(records: Iterable[Tuple], size: int) -> Iterator[List[Tuple]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _ParquetSink:
+    extension = "parquet"
+
+    def __init__(self, fileobj: BinaryIO, schema: "pa.Schema"):
+        self.writer = pq.ParquetWriter(fileobj, schema, compression=COLUMNAR_COMPRESSION)
+
+    def write(self, batch: "pa.RecordBatch"):
+        self.writer.write_batch(batch)
+
+    def close(self):
+        self.writer.close()
+
+
+class _ArrowSink:
+    extension = "arrow"
+
+    def __init__(self, fileobj: BinaryIO, schema: "pa.Schema"):
+        # Sözlüğe eklenen değerler delta olarak yazılır (dosya formatı sözlük değiştirmeyi desteklemez);
+        # IPC sadece zstd ve lz4 sıkıştırmayı destekler
+        options = pa.ipc.IpcWriteOptions(
+            compression=COLUMNAR_COMPRESSION if COLUMNAR_COMPRESSION in ("zstd", "lz4") else None,
+            emit_dictionary_deltas=True
+        )
+        self.writer = pa.ipc.new_file(fileobj, schema, options=options)
+
+    def write(self, batch: "pa.RecordBatch"):
+        self.writer.write_batch(batch)
+
+    def close(self):
+        self.writer.close()
+
+
+SINKS = {"parquet": _ParquetSink, "arrow": _ArrowSink}
+
+
+def write_columnar(fileobj: BinaryIO, fmt: str, records: Iterable[Tuple]) -> int:
+    """Satırları tek bir Parquet/Arrow dosyası olarak yazar; satır sayısını döndürür"""
+    schema = history_schema()
+    builder = _BatchBuilder(schema)
+    sink = SINKS[fmt](fileobj, schema)
+    count = 0
+    try:
+        for rows in _batches(records, COLUMNAR_BATCH_ROWS):
+            sink.write(builder.build(rows))
+            count += len(rows)
+    finally:
+        sink.close()
+    return count
+
+
+def write_partitioned(directory: str, fmt: str, records: Iterable[Tuple], partition: str) -> int:
+    """Arama zamanına göre sıralı satırları `<bölüm>=<değer>/data.<uzantı>` dosyalarına yazar
+
+    Satırlar tarih sırasıyla geldiği için aynı anda tek bir dosya açıktır.
+    Dosyalar önce `.part` olarak yazılıp tamamlanınca yerine taşınır.
+    """
+    date_index = HISTORY_FIELDS.index("search_date")
+    date_format, _ = PARTITIONS[partition]
+    extension = SINKS[fmt].extension
+    count = 0
+    for value, rows in itertools.groupby(records, key=lambda record: record[date_index].strftime(date_format)):
+        path = os.path.join(directory, f"{partition}={value}", f"data.{extension}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".part", "wb") as f:
+            count += write_columnar(f, fmt, rows)
+        os.replace(path + ".part", path)
+    return count
+
+
+def export_sites(
+    output: str,
+    site_ids: Sequence[str],
+    since: datetime,
+    fmt: str = "parquet",
+    partition: str = "month"
+) -> int:
+    """Sitelerin pozisyon geçmişini `site=<id>/<bölüm>=<değer>/` düzeninde yazar
+
+    Başlangıç bölüm başına yuvarlanır; böylece yeniden çalıştırmak önceki
+    çalıştırmanın tam bölüm dosyalarını eksik verili dosyalarla ezmez.
+    """
+    from app.database import get_session_maker
+
+    since = PARTITIONS[partition][1](since)
+    total = 0
+    for site_id in site_ids:
+        db: Session = get_session_maker(site_id)()
+        try:
+            count = write_partitioned(
+                os.path.join(output, f"site={site_id}"), fmt, history_records(db, since), partition
+            )
+        finally:
+            db.close()
+        logger.info(f"[{site_id}] {count} satır yazıldı")
+        total += count
+    return total
+
+
+def main(argv=None) -> int:
+    from app.export_archive import existing_sites, parse_choices
+    from app.scheduler import VALID_SITE_IDS
+
+    parser = argparse.ArgumentParser(description="Pozisyon geçmişini Parquet/Arrow olarak export eder")
+    parser.add_argument("--output", required=True, help="Çıktı dizini")
+    parser.add_argument("--sites", help="Virgülle ayrılmış site ID'leri (varsayılan: tüm siteler)")
+    parser.add_argument("--days", type=int, default=365, help="Kaç günlük geçmiş")
+    parser.add_argument("--format", choices=sorted(SINKS), default="parquet")
+    parser.add_argument("--partition", choices=sorted(PARTITIONS), default="month")
+    args = parser.parse_args(argv)
+
+    if pa is None:
+        print(ColumnarUnavailable())
+        return 1
+    try:
+        site_ids = existing_sites(parse_choices(args.sites, VALID_SITE_IDS))
+    except ValueError as e:
+        parser.error(str(e))
+
+    logging.basicConfig(level=logging.INFO)
+    since = datetime.utcnow() - timedelta(days=args.days)
+    total = export_sites(args.output, site_ids, since, args.format, args.partition)
+    print(f"{total} satır yazıldı: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
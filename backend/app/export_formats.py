@@ -0,0 +1,194 @@
+"""
+Dosya tabanlı export formatları (Excel / PDF / Parquet / Arrow)
+
+Senkron export endpoint'leri ve arka plan export job'ları aynı tanımları
+kullanır: her format satır kaynağını (`app.export_rows`) bir yazıcıyla
+(`app.export_writers`) birleştirip verilen dosya nesnesine yazar.
+
+`render(db, fileobj, since, url, track, **options)` yazılan satır sayısını döndürür;
+`track` satır iterator'ını sarmalayarak ilerleme takibi yapılmasını sağlar.
+`count(db, since, url)` tahmini toplam satır sayısıdır (ucuz değilse None).
+
+Günlük PDF'ler `max_rows` seçeneğiyle sınırlanabilir (diğer formatlar
+seçenekleri yok sayar); özet düzeninde
+(`pdf_daily_summary`: gün başına URL başına tek satır) sınır verilmezse
+`PDF_SUMMARY_MAX_ROWS` (varsayılan 5000) uygulanır.
+"""
+import itertools
+import os
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from app.export_columnar import ARROW_MEDIA_TYPE, PARQUET_MEDIA_TYPE, write_columnar
+from app.export_rows import (
+    DAILY_COLUMNS, POSITION_HISTORY_COLUMNS, SUMMARY_COLUMNS,
+    count_daily, count_daily_url_summary, count_position_history, daily_pdf_rows, daily_rows,
+    daily_url_summary_pdf_rows, history_records, position_history_rows, summary_pdf_rows, summary_rows
+)
+from app.export_writers import PDF_MEDIA_TYPE, XLSX_MEDIA_TYPE, change_styler, write_xlsx
+from app.pdf_render import write_pdf_table
+
+SUMMARY_PDF_LIMIT = 50
+PDF_SUMMARY_MAX_ROWS = int(os.getenv("PDF_SUMMARY_MAX_ROWS", "5000"))
+
+Track = Callable[[Iterable], Iterator]
+
+
+def _no_track(rows: Iterable) -> Iterable:
+    return rows
+
+
+class ExportFormat:
+    """Bir export'un dosya uzantısı, içerik tipi ve üretim fonksiyonu"""
+
+    def __init__(
+        self,
+        extension: str,
+        media_type: str,
+        filename_prefix: str,
+        render: Callable[..., int],
+        count: Optional[Callable[..., Optional[int]]] = None
+    ):
+        self.extension = extension
+        self.media_type = media_type
+        self.filename_prefix = filename_prefix
+        self._render = render
+        self._count = count
+
+    def filename(self) -> str:
+        return f"{self.filename_prefix}_{datetime.now().strftime('%Y%m%d')}.{self.extension}"
+
+    def render(
+        self,
+        db: Session,
+        fileobj: BinaryIO,
+        since: datetime,
+        url: Optional[str] = None,
+        track: Track = _no_track,
+        **options
+    ) -> int:
+        return self._render(db, fileobj, since, url, track, **options)
+
+    def count(self, db: Session, since: datetime, url: Optional[str] = None, **options) -> Optional[int]:
+        """Üretilecek satır sayısı; `render` ile aynı seçenekleri (ör. max_rows) alır"""
+        return self._count(db, since, url, **options) if self._count else None
+
+
+def _date_range(since: datetime) -> str:
+    return f"{since.strftime('%d.%m.%Y')} - {datetime.utcnow().strftime('%d.%m.%Y')}"
+
+
+def _render_excel_daily(db, fileobj, since, url, track, **options):
+    return write_xlsx(
+        fileobj, "Günlük Pozisyonlar", DAILY_COLUMNS,
+        [12, 10, 50, 25, 40, 10, 60],
+        track(daily_rows(db, since))
+    )
+
+
+def _render_excel_position_history(db, fileobj, since, url, track, **options):
+    return write_xlsx(
+        fileobj, "Pozisyon Geçmişi", POSITION_HISTORY_COLUMNS,
+        [12, 10, 50, 25, 40, 10, 12],
+        track(position_history_rows(db, since, url)),
+        # Pozisyon değişimine göre renklendir
+        styler=change_styler(6)
+    )
+
+
+def _render_excel_summary(db, fileobj, since, url, track, **options):
+    return write_xlsx(
+        fileobj, "Özet İstatistikler", SUMMARY_COLUMNS,
+        [50, 25, 40, 15, 18, 18, 15, 10, 10, 12],
+        track(summary_rows(db, since))
+    )
+
+
+def _capped_count(total: int, max_rows: Optional[int]) -> int:
+    return min(total, max_rows) if max_rows else total
+
+
+def _capped(rows: Iterable, total: int, max_rows: Optional[int]):
+    """Satırları sınırlar; sınır aşılıyorsa rapora eklenecek notu da döndürür"""
+    if not max_rows or total <= max_rows:
+        return rows, None
+    note = f"Toplam {total} satırın ilk {max_rows} satırı gösteriliyor."
+    return itertools.islice(rows, max_rows), note
+
+
+def _render_pdf_daily(db, fileobj, since, url, track, max_rows=None):
+    total = count_daily(db, since) if max_rows else 0
+    rows, note = _capped(daily_pdf_rows(db, since), total, max_rows)
+    return write_pdf_table(
+        fileobj, "Google Search Bot - Günlük Rapor", _date_range(since),
+        ["Tarih", "Saat", "URL", "Domain", "Pozisyon"],
+        [1, 0.8, 3, 1.2, 0.8],
+        track(rows),
+        note=note
+    )
+
+
+def _render_pdf_daily_summary(db, fileobj, since, url, track, max_rows=None):
+    max_rows = max_rows or PDF_SUMMARY_MAX_ROWS
+    rows, note = _capped(daily_url_summary_pdf_rows(db, since), count_daily_url_summary(db, since), max_rows)
+    return write_pdf_table(
+        fileobj, "Google Search Bot - Günlük Özet Rapor", _date_range(since),
+        ["Tarih", "URL", "Domain", "Görünme", "Ort. Pozisyon", "En İyi", "En Kötü"],
+        [0.9, 2.6, 1.3, 0.7, 0.9, 0.6, 0.6],
+        track(rows),
+        note=note
+    )
+
+
+def _render_pdf_summary(db, fileobj, since, url, track, **options):
+    return write_pdf_table(
+        fileobj, "Google Search Bot - Özet Rapor", _date_range(since),
+        ["URL", "Domain", "Görünme", "Ort. Pozisyon", "En İyi", "En Kötü"],
+        [2.5, 1.5, 0.8, 1, 0.7, 0.7],
+        track(summary_pdf_rows(db, since, SUMMARY_PDF_LIMIT))
+    )
+
+
+def _render_parquet_history(db, fileobj, since, url, track, **options):
+    return write_columnar(fileobj, "parquet", track(history_records(db, since)))
+
+
+def _render_arrow_history(db, fileobj, since, url, track, **options):
+    return write_columnar(fileobj, "arrow", track(history_records(db, since)))
+
+
+EXPORT_FORMATS: Dict[str, ExportFormat] = {
+    "excel_daily": ExportFormat(
+        "xlsx", XLSX_MEDIA_TYPE, "google_search_bot_daily", _render_excel_daily,
+        lambda db, since, url, **options: count_daily(db, since)
+    ),
+    "excel_position_history": ExportFormat(
+        "xlsx", XLSX_MEDIA_TYPE, "position_history", _render_excel_position_history,
+        lambda db, since, url, **options: count_position_history(db, since, url)
+    ),
+    "excel_summary": ExportFormat("xlsx", XLSX_MEDIA_TYPE, "summary", _render_excel_summary),
+    "pdf_daily": ExportFormat(
+        "pdf", PDF_MEDIA_TYPE, "google_search_bot_daily", _render_pdf_daily,
+        lambda db, since, url, max_rows=None: _capped_count(count_daily(db, since), max_rows)
+    ),
+    "pdf_daily_summary": ExportFormat(
+        "pdf", PDF_MEDIA_TYPE, "google_search_bot_daily_summary", _render_pdf_daily_summary,
+        lambda db, since, url, max_rows=None: _capped_count(
+            count_daily_url_summary(db, since), max_rows or PDF_SUMMARY_MAX_ROWS
+        )
+    ),
+    "pdf_summary": ExportFormat(
+        "pdf", PDF_MEDIA_TYPE, "google_search_bot_summary", _render_pdf_summary,
+        lambda db, since, url, **options: SUMMARY_PDF_LIMIT
+    ),
+    "parquet_history": ExportFormat(
+        "parquet", PARQUET_MEDIA_TYPE, "search_history", _render_parquet_history,
+        lambda db, since, url, **options: count_daily(db, since)
+    ),
+    "arrow_history": ExportFormat(
+        "arrow", ARROW_MEDIA_TYPE, "search_history", _render_arrow_history,
+        lambda db, since, url, **options: count_daily(db, since)
+    ),
+}
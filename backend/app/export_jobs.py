@@ -0,0 +1,330 @@
+"""
+Arka plan export job'ları ve önbelleklenmiş export dosyaları
+
+Büyük Excel/PDF export'ları istek içinde değil, sınırlı sayıda thread'li bir
+havuzda üretilir: istemci job'ı gönderir, ilerlemesini sorgular ve bitince
+dosyayı indirir. Üretilen dosyalar `DATA_DIR/_exports/<site>/` altında
+saklanır ve (site, export türü, parametreler, ingest nesli) ile anahtarlanır;
+ingest nesli sitenin en büyük `search_results.id` değeridir, yani yeni bir
+arama kaydedilene kadar aynı istek mevcut dosyayı anında döndürür. Gün
+penceresi "şimdi"ye göre kaydığından anahtara UTC tarihi de dahildir.
+
+Eski dosyalar her job sonunda temizlenir: `EXPORT_ARTIFACT_MAX_AGE_HOURS`
+saatten eskiler silinir, toplam boyut `EXPORT_ARTIFACT_MAX_MB`'ı aşarsa en
+uzun süredir kullanılmayanlardan başlanarak silinir.
+
+Ayarlar:
+    EXPORT_JOB_WORKERS             Paralel üretilen job sayısı (varsayılan 2)
+    EXPORT_JOB_MAX_PENDING         Kuyrukta bekleyebilecek job sayısı (varsayılan 20)
+    EXPORT_ARTIFACT_MAX_AGE_HOURS  Dosya saklama süresi (varsayılan 24)
+    EXPORT_ARTIFACT_MAX_MB         Toplam dosya boyutu üst sınırı (varsayılan 1024)
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import func
+
+from app.database import data_dir, get_session_maker, init_db, SearchResult
+from app.export_formats import EXPORT_FORMATS
+from app.metrics import export_artifact_requests_total, export_job_seconds
+
+logger = logging.getLogger(__name__)
+
+EXPORT_JOB_WORKERS = int(os.getenv("EXPORT_JOB_WORKERS", "2"))
+EXPORT_JOB_MAX_PENDING = int(os.getenv("EXPORT_JOB_MAX_PENDING", "20"))
+EXPORT_ARTIFACT_MAX_AGE_HOURS = float(os.getenv("EXPORT_ARTIFACT_MAX_AGE_HOURS", "24"))
+EXPORT_ARTIFACT_MAX_MB = float(os.getenv("EXPORT_ARTIFACT_MAX_MB", "1024"))
+EXPORT_JOBS_KEEP = 200
+
+ARTIFACT_DIR = os.path.join(data_dir, "_exports")
+PARTIAL_SUFFIX = ".part"
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class ExportQueueFull(Exception):
+    """Kuyrukta bekleyen job sayısı sınıra ulaştı"""
+
+
+class ExportJob:
+    """Tek bir export isteğinin durumu"""
+
+    def __init__(
+        self,
+        kind: str,
+        site_id: str,
+        days: int,
+        url: Optional[str],
+        max_rows: Optional[int],
+        key: str,
+        path: str
+    ):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.site_id = site_id
+        self.days = days
+        self.url = url
+        self.max_rows = max_rows
+        self.key = key
+        self.path = path
+        self.status = "queued"
+        self.cached = False
+        self.rows_done = 0
+        self.rows_total: Optional[int] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def progress(self) -> Optional[float]:
+        if self.status == "done":
+            return 1.0
+        if not self.rows_total:
+            return None
+        return round(min(self.rows_done / self.rows_total, 0.99), 3)
+
+    def track(self, rows: Iterable) -> Iterator:
+        """Yazılan satırları sayan iterator sarmalayıcısı"""
+        for row in rows:
+            self.rows_done += 1
+            yield row
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "site_id": self.site_id,
+            "days": self.days,
+            "url": self.url,
+            "max_rows": self.max_rows,
+            "status": self.status,
+            "cached": self.cached,
+            "progress": self.progress,
+            "rows_done": self.rows_done,
+            "rows_total": self.rows_total,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "filename": EXPORT_FORMATS[self.kind].filename() if self.status == "done" else None,
+        }
+
+
+_jobs: "OrderedDict[str, ExportJob]" = OrderedDict()
+_jobs_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=EXPORT_JOB_WORKERS, thread_name_prefix="export-job")
+    return _executor
+
+
+def _safe_site_id(site_id: str) -> str:
+    return "".join(c for c in site_id if c.isalnum() or c in ('-', '_')) or "default"
+
+
+def ingest_generation(site_id: str) -> int:
+    """Sitenin ingest nesli: en son kaydedilen aramanın id'si"""
+    db = get_session_maker(site_id)()
+    try:
+        return db.query(func.max(SearchResult.id)).scalar() or 0
+    finally:
+        db.close()
+
+
+def artifact_key(
+    kind: str,
+    site_id: str,
+    days: int,
+    url: Optional[str],
+    max_rows: Optional[int],
+    generation: int
+) -> str:
+    payload = json.dumps({
+        "kind": kind,
+        "site": site_id,
+        "days": days,
+        "url": url,
+        "max_rows": max_rows,
+        "generation": generation,
+        "window_day": datetime.utcnow().strftime("%Y-%m-%d"),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _prune_jobs():
+    """Bellekteki job kayıtlarını sınırlar (aktif job'lar silinmez); kilit altında çağrılır"""
+    if len(_jobs) <= EXPORT_JOBS_KEEP:
+        return
+    for job_id in list(_jobs):
+        if len(_jobs) <= EXPORT_JOBS_KEEP:
+            break
+        if _jobs[job_id].status not in ACTIVE_STATUSES:
+            del _jobs[job_id]
+
+
+def submit_export(
+    kind: str,
+    site_id: str = "default",
+    days: int = 30,
+    url: Optional[str] = None,
+    max_rows: Optional[int] = None
+) -> ExportJob:
+    """Export job'ı oluşturur; aynı anahtarlı dosya varsa job anında tamamlanmış döner"""
+    if kind not in EXPORT_FORMATS:
+        raise ValueError(f"Bilinmeyen export türü: {kind}")
+    site_id = _safe_site_id(site_id)
+    init_db(site_id)
+
+    export_format = EXPORT_FORMATS[kind]
+    key = artifact_key(kind, site_id, days, url, max_rows, ingest_generation(site_id))
+    path = os.path.join(ARTIFACT_DIR, site_id, f"{key}.{export_format.extension}")
+
+    with _jobs_lock:
+        # Aynı dosyayı üreten aktif bir job varsa onu paylaş
+        for job in _jobs.values():
+            if job.key == key and job.status in ACTIVE_STATUSES:
+                export_artifact_requests_total.inc(kind=kind, result="pending")
+                return job
+
+        job = ExportJob(kind, site_id, days, url, max_rows, key, path)
+        if os.path.exists(path):
+            # LRU temizliği için son kullanım zamanını güncelle
+            os.utime(path)
+            job.status = "done"
+            job.cached = True
+            job.started_at = job.finished_at = job.created_at
+            _jobs[job.id] = job
+            _prune_jobs()
+            export_artifact_requests_total.inc(kind=kind, result="hit")
+            return job
+
+        pending = sum(1 for existing in _jobs.values() if existing.status in ACTIVE_STATUSES)
+        if pending >= EXPORT_JOB_MAX_PENDING:
+            raise ExportQueueFull(f"Kuyrukta {pending} export job'ı bekliyor, daha sonra tekrar deneyin")
+
+        _jobs[job.id] = job
+        _prune_jobs()
+        export_artifact_requests_total.inc(kind=kind, result="miss")
+
+    _get_executor().submit(_run_job, job)
+    return job
+
+
+def _run_job(job: ExportJob):
+    export_format = EXPORT_FORMATS[job.kind]
+    job.status = "running"
+    job.started_at = datetime.utcnow()
+    started = time.perf_counter()
+    partial_path = f"{job.path}.{job.id}{PARTIAL_SUFFIX}"
+    outcome = "success"
+
+    db = get_session_maker(job.site_id)()
+    try:
+        since = job.created_at - timedelta(days=job.days)
+        job.rows_total = export_format.count(db, since, job.url, max_rows=job.max_rows)
+        os.makedirs(os.path.dirname(job.path), exist_ok=True)
+        with open(partial_path, "wb") as f:
+            export_format.render(db, f, since, job.url, track=job.track, max_rows=job.max_rows)
+        os.replace(partial_path, job.path)
+        job.status = "done"
+        logger.info(
+            f"Export job tamamlandı: {job.kind} site={job.site_id} satır={job.rows_done} "
+            f"süre={time.perf_counter() - started:.1f}s"
+        )
+    except Exception as e:
+        outcome = "error"
+        job.status = "error"
+        job.error = str(e)
+        logger.error(f"Export job hatası ({job.kind}, site={job.site_id}): {e}", exc_info=True)
+        try:
+            os.remove(partial_path)
+        except OSError:
+            pass
+    finally:
+        db.close()
+        job.finished_at = datetime.utcnow()
+        export_job_seconds.observe(time.perf_counter() - started, kind=job.kind, outcome=outcome)
+        try:
+            cleanup_artifacts()
+        except Exception as e:
+            logger.warning(f"Export dosyaları temizlenemedi: {e}")
+
+
+def get_job(job_id: str) -> Optional[ExportJob]:
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def list_jobs(site_id: Optional[str] = None) -> List[ExportJob]:
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    if site_id:
+        jobs = [job for job in jobs if job.site_id == _safe_site_id(site_id)]
+    return list(reversed(jobs))
+
+
+def cleanup_artifacts(
+    max_age_hours: float = EXPORT_ARTIFACT_MAX_AGE_HOURS,
+    max_total_mb: float = EXPORT_ARTIFACT_MAX_MB
+) -> int:
+    """Eski dosyaları ve boyut sınırını aşan en az kullanılan dosyaları siler; silinen sayıyı döndürür"""
+    if not os.path.isdir(ARTIFACT_DIR):
+        return 0
+    now = time.time()
+    max_age = max_age_hours * 3600
+    files = []
+    removed = 0
+    for root, _, names in os.walk(ARTIFACT_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if now - stat.st_mtime > max_age:
+                # Yarım kalmış (.part) dosyalar da yaşa göre temizlenir
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+            elif not name.endswith(PARTIAL_SUFFIX):
+                files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    limit = max_total_mb * 1024 * 1024
+    for _, size, path in sorted(files):
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+            total -= size
+        except OSError:
+            pass
+
+    if removed:
+        logger.info(f"{removed} export dosyası temizlendi")
+    return removed
+
+
+def shutdown_export_jobs():
+    """Bekleyen job'ları iptal eder ve çalışanların bitmesini beklemeden havuzu kapatır"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,323 @@
+"""
+Export satır kaynakları
+
+Export formatları (Excel, PDF, CSV, NDJSON) aynı satırları üretir; bu modül
+her export için tek bir join'li sorgu çalıştırır ve sonucu `yield_per` ile
+parça parça okuyarak satır tuple'ları üretir. Böylece ne sonuç başına ayrı
+link sorgusu yapılır ne de tüm veri belleğe alınır.
+
+`*_records` fonksiyonları ham değerleri (datetime, sayı) `*_FIELDS` kolon
+sırasıyla, `*_rows` fonksiyonları ise Excel/PDF için biçimlenmiş değerleri
+`*_COLUMNS` başlıklarıyla üretir. `history_records` kolon bazlı
+(Parquet/Arrow) export için sonuç ve link kolonlarını birlikte üretir.
+
+Parça boyutu `EXPORT_BATCH_SIZE` ile ayarlanabilir (varsayılan 2000).
+"""
+import os
+from datetime import datetime
+from typing import Callable, Iterator, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.database import get_session_maker, SearchResult, SearchLink
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
+DAILY_COLUMNS = ("Tarih", "Saat", "URL", "Domain", "Başlık", "Pozisyon", "Snippet")
+POSITION_HISTORY_COLUMNS = ("Tarih", "Saat", "URL", "Domain", "Başlık", "Pozisyon", "Değişim")
+SUMMARY_COLUMNS = (
+    "URL", "Domain", "Başlık", "Toplam Görünme", "İlk Görünme", "Son Görünme",
+    "Ort. Pozisyon", "En İyi", "En Kötü", "Aktif Gün"
+)
+
+DAILY_FIELDS = ("search_date", "url", "domain", "title", "position", "snippet")
+POSITION_HISTORY_FIELDS = ("search_date", "url", "domain", "title", "position", "change")
+SUMMARY_FIELDS = (
+    "url", "domain", "title", "total_appearances", "first_seen", "last_seen",
+    "avg_position", "best_position", "worst_position", "days_active"
+)
+HISTORY_FIELDS = (
+    "search_result_id", "search_query", "search_date", "total_results",
+    "link_id", "position", "url", "domain", "title", "snippet", "created_at"
+)
+
+
+def session_records(site_id: str, source: Callable[..., Iterator[Tuple]], *args) -> Iterator[Tuple]:
+    """Kendi session'ını açıp kapatan satır üreticisi (streaming response'lar için)
+
+    Response gövdesi endpoint döndükten sonra üretildiği için isteğin
+    `get_db` session'ına güvenilmez; session üretici bitince ya da
+    istemci bağlantıyı kesince kapanır.
+    """
+    db = get_session_maker(site_id)()
+    try:
+        yield from source(db, *args)
+    finally:
+        db.close()
+
+
+def daily_records(db: Session, since: datetime) -> Iterator[Tuple]:
+    """Penceredeki her linki arama zamanı ve pozisyon sırasıyla üretir"""
+    query = db.query(
+        SearchResult.search_date,
+        SearchLink.url,
+        SearchLink.domain,
+        SearchLink.title,
+        SearchLink.position,
+        SearchLink.snippet
+    ).join(
+        SearchResult, SearchLink.search_result_id == SearchResult.id
+    ).filter(
+        SearchResult.search_date >= since
+    ).order_by(
+        SearchResult.search_date.asc(), SearchResult.id.asc(), SearchLink.position.asc()
+    ).yield_per(EXPORT_BATCH_SIZE)
+
+    for row in query:
+        yield tuple(row)
+
+
+def history_records(db: Session, since: datetime) -> Iterator[Tuple]:
+    """search_results × search_links satırlarını arama zamanı sırasıyla üretir"""
+    query = db.query(
+        SearchResult.id,
+        SearchResult.search_query,
+        SearchResult.search_date,
+        SearchResult.total_results,
+        SearchLink.id,
+        SearchLink.position,
+        SearchLink.url,
+        SearchLink.domain,
+        SearchLink.title,
+        SearchLink.snippet,
+        SearchLink.created_at
+    ).join(
+        SearchResult, SearchLink.search_result_id == SearchResult.id
+    ).filter(
+        SearchResult.search_date >= since
+    ).order_by(
+        SearchResult.search_date.asc(), SearchResult.id.asc(), SearchLink.position.asc()
+    ).yield_per(EXPORT_BATCH_SIZE)
+
+    for row in query:
+        yield tuple(row)
+
+
+def count_daily(db: Session, since: datetime) -> int:
+    """Günlük export'un satır sayısı"""
+    return db.query(func.count(SearchLink.id)).join(
+        SearchResult, SearchLink.search_result_id == SearchResult.id
+    ).filter(
+        SearchResult.search_date >= since
+    ).scalar() or 0
+
+
+def daily_rows(db: Session, since: datetime) -> Iterator[Tuple]:
+    """Günlük export satırları (Excel/PDF biçiminde)"""
+    for search_date, url, domain, title, position, snippet in daily_records(db, since):
+        yield (
+            search_date.strftime("%Y-%m-%d"),
+            search_date.strftime("%H:%M:%S"),
+            url,
+            domain or "",
+            title or "",
+            position,
+            snippet or ""
+        )
+
+
+def daily_pdf_rows(db: Session, since: datetime) -> Iterator[Tuple]:
+    """Günlük PDF tablosu satırları (uzun URL'ler kısaltılır)"""
+    for search_date, url, domain, title, position, snippet in daily_records(db, since):
+        yield (
+            search_date.strftime("%Y-%m-%d"),
+            search_date.strftime("%H:%M"),
+            url[:60] + "..." if len(url) > 60 else url,
+            domain or "",
+            str(position)
+        )
+
+
+def _daily_url_summary_query(db: Session, since: datetime):
+    day = func.date(SearchResult.search_date)
+    return db.query(
+        day.label("day"),
+        SearchLink.url,
+        SearchLink.domain,
+        func.count(SearchLink.id).label("appearances"),
+        func.avg(SearchLink.position).label("avg_position"),
+        func.min(SearchLink.position).label("best_position"),
+        func.max(SearchLink.position).label("worst_position")
+    ).join(
+        SearchResult, SearchLink.search_result_id == SearchResult.id
+    ).filter(
+        SearchResult.search_date >= since
+    ).group_by(
+        day, SearchLink.url, SearchLink.domain
+    )
+
+
+def count_daily_url_summary(db: Session, since: datetime) -> int:
+    """Gün × URL özetinin satır sayısı"""
+    return db.query(func.count()).select_from(
+        _daily_url_summary_query(db, since).subquery()
+    ).scalar() or 0
+
+
+def daily_url_summary_pdf_rows(db: Session, since: datetime) -> Iterator[Tuple]:
+    """Her gün için URL başına tek satır (görünme sayısı ve pozisyon aralığı)"""
+    query = _daily_url_summary_query(db, since).order_by(
+        "day", func.min(SearchLink.position).asc(), SearchLink.url
+    ).yield_per(EXPORT_BATCH_SIZE)
+    for stat in query:
+        yield (
+            stat.day,
+            stat.url[:60] + "..." if len(stat.url) > 60 else stat.url,
+            stat.domain or "",
+            str(stat.appearances),
+            f"{float(stat.avg_position):.1f}",
+            str(stat.best_position),
+            str(stat.worst_position)
+        )
+
+
+def format_change(diff: Optional[int]) -> str:
+    """Pozisyon değişimini ok işaretiyle gösterir (pozitif: yükseliş)"""
+    if diff is None:
+        return ""
+    if diff > 0:
+        return f"↑ {diff}"
+    if diff < 0:
+        return f"↓ {abs(diff)}"
+    return "→"
+
+
+def _position_history_query(db: Session, since: datetime, url: Optional[str]):
+    query = db.query(
+        SearchResult.search_date,
+        SearchLink.url,
+        SearchLink.domain,
+        SearchLink.title,
+        SearchLink.position
+    ).join(
+        SearchResult, SearchLink.search_result_id == SearchResult.id
+    ).filter(
+        SearchResult.search_date >= since
+    )
+    if url:
+        query = query.filter(SearchLink.url == url)
+    return query
+
+
+def has_position_history(db: Session, since: datetime, url: Optional[str] = None) -> bool:
+    """Pozisyon geçmişi export'u için en az bir satır olup olmadığını kontrol eder"""
+    return _position_history_query(db, since, url).first() is not None
+
+
+def count_position_history(db: Session, since: datetime, url: Optional[str] = None) -> int:
+    """Pozisyon geçmişi export'unun satır sayısı"""
+    return _position_history_query(db, since, url).with_entities(func.count(SearchLink.id)).scalar() or 0
+
+
+def position_history_records(db: Session, since: datetime, url: Optional[str] = None) -> Iterator[Tuple]:
+    """Pozisyon geçmişi satırlarını bir önceki satıra göre değişimle birlikte üretir"""
+    query = _position_history_query(db, since, url).order_by(
+        SearchResult.search_date.asc(), SearchLink.position.asc()
+    ).yield_per(EXPORT_BATCH_SIZE)
+
+    prev_position = None
+    for search_date, link_url, domain, title, position in query:
+        change = None
+        if prev_position is not None and position is not None:
+            change = prev_position - position
+        yield (search_date, link_url, domain, title, position, change)
+        prev_position = position
+
+
+def position_history_rows(db: Session, since: datetime, url: Optional[str] = None) -> Iterator[Tuple]:
+    """Pozisyon geçmişi export satırları (Excel/PDF biçiminde)"""
+    for search_date, link_url, domain, title, position, change in position_history_records(db, since, url):
+        yield (
+            search_date.strftime("%Y-%m-%d"),
+            search_date.strftime("%H:%M:%S"),
+            link_url,
+            domain or "",
+            title or "",
+            position,
+            format_change(change)
+        )
+
+
+def summary_query(db: Session, since: datetime, limit: Optional[int] = None):
+    """URL bazında görünme istatistikleri (en çok görünenden aza)"""
+    query = db.query(
+        SearchLink.url,
+        SearchLink.domain,
+        SearchLink.title,
+        func.count(SearchLink.id).label("total_appearances"),
+        func.min(SearchLink.created_at).label("first_seen"),
+        func.max(SearchLink.created_at).label("last_seen"),
+        func.avg(SearchLink.position).label("avg_position"),
+        func.min(SearchLink.position).label("best_position"),
+        func.max(SearchLink.position).label("worst_position")
+    ).join(
+        SearchResult, SearchLink.search_result_id == SearchResult.id
+    ).filter(
+        SearchResult.search_date >= since
+    ).group_by(
+        SearchLink.url, SearchLink.domain, SearchLink.title
+    ).order_by(
+        func.count(SearchLink.id).desc()
+    )
+    if limit:
+        query = query.limit(limit)
+    return query
+
+
+def summary_pdf_rows(db: Session, since: datetime, limit: int) -> Iterator[Tuple]:
+    """Özet PDF tablosu satırları (en çok görünen `limit` URL)"""
+    for stat in summary_query(db, since, limit):
+        yield (
+            stat.url[:40] + "..." if len(stat.url) > 40 else stat.url,
+            stat.domain or "",
+            str(stat.total_appearances),
+            f"{float(stat.avg_position):.1f}",
+            str(stat.best_position),
+            str(stat.worst_position)
+        )
+
+
+def summary_records(db: Session, since: datetime) -> Iterator[Tuple]:
+    """Özet istatistik satırlarını üretir"""
+    for stat in summary_query(db, since).yield_per(EXPORT_BATCH_SIZE):
+        yield (
+            stat.url,
+            stat.domain,
+            stat.title,
+            stat.total_appearances,
+            stat.first_seen,
+            stat.last_seen,
+            round(float(stat.avg_position), 2),
+            stat.best_position,
+            stat.worst_position,
+            (stat.last_seen - stat.first_seen).days + 1
+        )
+
+
+def summary_rows(db: Session, since: datetime) -> Iterator[Tuple]:
+    """Özet export satırları (Excel/PDF biçiminde)"""
+    for (url, domain, title, total, first_seen, last_seen,
+         avg_position, best, worst, days_active) in summary_records(db, since):
+        yield (
+            url,
+            domain or "",
+            title or "",
+            total,
+            first_seen.strftime("%Y-%m-%d %H:%M"),
+            last_seen.strftime("%Y-%m-%d %H:%M"),
+            avg_position,
+            best,
+            worst,
+            days_active
+        )
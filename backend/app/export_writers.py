@@ -0,0 +1,232 @@
+"""
+Export dosyası yazıcıları
+
+Excel dosyaları openpyxl'in write-only modunda üretilir: satırlar hücre
+nesnesi tutulmadan doğrudan worksheet'in geçici XML dosyasına yazılır.
+Çıktı `SpooledTemporaryFile` üzerine kaydedilir; küçük dosyalar bellekte
+kalır, `EXPORT_SPOOL_MAX_MB` (varsayılan 16) aşılınca diske taşınır. Response
+dosyayı parça parça okuyarak gönderir, böylece bellek kullanımı satır
+sayısından bağımsız kalır.
+
+CSV ve NDJSON çıktıları dosyaya yazılmadan, satırlar veritabanından okundukça
+~64 KB'lık parçalar halinde chunked response olarak gönderilir. Transfer
+sıkıştırması CompressionMiddleware'e bırakılır; `gzip=true` ile indirilen
+dosyanın kendisi `.gz` olarak üretilir.
+"""
+import csv
+import io
+import os
+import zlib
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional, Sequence
+
+import orjson
+from fastapi.responses import StreamingResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PDF_MEDIA_TYPE = "application/pdf"
+CSV_MEDIA_TYPE = "text/csv"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+GZIP_MEDIA_TYPE = "application/gzip"
+
+SPOOL_MAX_BYTES = int(float(os.getenv("EXPORT_SPOOL_MAX_MB", "16")) * 1024 * 1024)
+CHUNK_SIZE = 64 * 1024
+
+HEADER_FILL = PatternFill(start_color="667eea", end_color="667eea", fill_type="solid")
+HEADER_FONT = Font(bold=True, color="FFFFFF", size=12)
+CENTER_ALIGN = Alignment(horizontal="center", vertical="center")
+UP_FILL = PatternFill(start_color="c8e6c9", end_color="c8e6c9", fill_type="solid")
+DOWN_FILL = PatternFill(start_color="ffcdd2", end_color="ffcdd2", fill_type="solid")
+
+# (worksheet, satır tuple'ı) -> yazılacak satır; stil gereken hücreler için WriteOnlyCell döner
+RowStyler = Callable[[object, Sequence], Sequence]
+
+
+def change_styler(column_index: int) -> RowStyler:
+    """Pozisyon değişimi kolonunu yükselişte yeşil, düşüşte kırmızı boyar"""
+    def style(ws, row: Sequence) -> Sequence:
+        change = row[column_index]
+        if not change or change[0] not in ("↑", "↓"):
+            return row
+        cell = WriteOnlyCell(ws, value=change)
+        cell.fill = UP_FILL if change[0] == "↑" else DOWN_FILL
+        styled = list(row)
+        styled[column_index] = cell
+        return styled
+    return style
+
+
+def write_xlsx(
+    fileobj: BinaryIO,
+    title: str,
+    headers: Sequence[str],
+    widths: Sequence[float],
+    rows: Iterable[Sequence],
+    styler: Optional[RowStyler] = None
+) -> int:
+    """Satırları write-only bir workbook olarak dosyaya yazar; yazılan satır sayısını döndürür"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+
+    # Kolon genişlikleri ilk satırdan önce ayarlanmalı
+    for index, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.fill = HEADER_FILL
+        cell.font = HEADER_FONT
+        cell.alignment = CENTER_ALIGN
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    count = 0
+    try:
+        for row in rows:
+            ws.append(styler(ws, row) if styler else row)
+            count += 1
+    except BaseException:
+        # Yarıda kalan sayfanın geçici XML dosyası openpyxl tarafından ancak
+        # process kapanırken silinir; uzun yaşayan sunucuda hemen temizle
+        ws.close()
+        ws._writer.cleanup()
+        raise
+
+    wb.save(fileobj)
+    return count
+
+
+def spooled_file() -> SpooledTemporaryFile:
+    """Belirli boyuttan sonra diske taşan geçici çıktı dosyası"""
+    return SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode="w+b")
+
+
+def iter_file(fileobj: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Dosyayı baştan sona parça parça okur ve bitince kapatır"""
+    try:
+        fileobj.seek(0)
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def file_response(fileobj: BinaryIO, media_type: str, filename: str) -> StreamingResponse:
+    """Hazırlanmış geçici dosyayı indirme olarak gönderir"""
+    size = fileobj.seek(0, os.SEEK_END)
+    return StreamingResponse(
+        iter_file(fileobj),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Content-Length": str(size)
+        }
+    )
+
+
+def spooled_response(write: Callable[[BinaryIO], object], media_type: str, filename: str) -> StreamingResponse:
+    """`write(fileobj)` ile geçici dosyaya üretilen çıktıyı parça parça gönderen response"""
+    output = spooled_file()
+    try:
+        write(output)
+    except Exception:
+        output.close()
+        raise
+    return file_response(output, media_type, filename)
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return value
+
+
+def iter_csv(fields: Sequence[str], records: Iterable[Sequence], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Satırları CSV olarak parça parça üretir (başlık satırı hemen gönderilir)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(fields)
+    yield buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+
+    for record in records:
+        writer.writerow([_csv_value(value) for value in record])
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_json_lines(objects: Iterable, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Nesneleri her satırda bir JSON olacak şekilde ~`chunk_size` byte'lık parçalar halinde üretir"""
+    lines = []
+    size = 0
+    for obj in objects:
+        line = orjson.dumps(obj)
+        lines.append(line)
+        size += len(line) + 1
+        if size >= chunk_size:
+            lines.append(b"")
+            yield b"\n".join(lines)
+            lines, size = [], 0
+    if lines:
+        lines.append(b"")
+        yield b"\n".join(lines)
+
+
+def iter_ndjson(fields: Sequence[str], records: Iterable[Sequence], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Satırları her satırda bir JSON nesnesi olacak şekilde parça parça üretir"""
+    return iter_json_lines((dict(zip(fields, record)) for record in records), chunk_size)
+
+
+def iter_gzip(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Parçaları tek bir gzip akışı olarak sıkıştırır"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+STREAM_FORMATS = {
+    "csv": (iter_csv, CSV_MEDIA_TYPE, "csv"),
+    "ndjson": (iter_ndjson, NDJSON_MEDIA_TYPE, "ndjson"),
+}
+
+
+def rows_stream_response(
+    fmt: str,
+    filename: str,
+    fields: Sequence[str],
+    records: Iterable[Sequence],
+    gzip: bool = False
+) -> StreamingResponse:
+    """Satırları CSV/NDJSON olarak (isteğe bağlı gzip dosyası) stream eden response
+
+    `filename` uzantısız verilir; formata göre uzantı eklenir.
+    """
+    encode, media_type, extension = STREAM_FORMATS[fmt]
+    chunks = encode(fields, records)
+    filename = f"{filename}.{extension}"
+    if gzip:
+        chunks = iter_gzip(chunks)
+        media_type = GZIP_MEDIA_TYPE
+        filename += ".gz"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
@@ -0,0 +1,152 @@
+"""
+Kuyruk tabanlı, yapılandırılmış (JSON) loglama
+
+Uygulama thread'leri log kayıtlarını sadece bir kuyruğa bırakır; stdout'a
+yazma işi arka plandaki tek bir `QueueListener` thread'inde yapılır. Kuyruk
+dolarsa kayıt beklemeden düşürülür, böylece istek işleme hiçbir zaman
+stdout'u beklemez.
+
+Ortam değişkenleri:
+    LOG_LEVEL            Kök log seviyesi (varsayılan: INFO)
+    LOG_FORMAT           json veya text (varsayılan: json)
+    LOG_QUEUE_SIZE       Kuyruk kapasitesi (varsayılan: 10000)
+    LOG_SAMPLE_SUCCESS   Başarılı isteklerin loglanma oranı 0-1 (varsayılan: 1.0)
+    LOG_SAMPLE_HEALTH    /api/health isteklerinin loglanma oranı 0-1 (varsayılan: 0.0)
+    LOG_SLOW_REQUEST_MS  Bu süreyi aşan istekler örneklemeden bağımsız loglanır (varsayılan: 1000)
+"""
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+import orjson
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_SUCCESS = float(os.getenv("LOG_SAMPLE_SUCCESS", "1.0"))
+LOG_SAMPLE_HEALTH = float(os.getenv("LOG_SAMPLE_HEALTH", "0.0"))
+LOG_SLOW_REQUEST_MS = float(os.getenv("LOG_SLOW_REQUEST_MS", "1000"))
+
+HEALTH_PATHS = ("/api/health",)
+
+access_logger = logging.getLogger("app.access")
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Her kaydı tek satırlık JSON olarak yazar; `extra={"fields": {...}}` alanları eklenir"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            payload.update(fields)
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return orjson.dumps(payload, default=str).decode()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Kuyruk doluysa beklemek yerine kaydı düşüren QueueHandler"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Aynı process içindeki kuyruk - sadece mesajı sabitle; traceback
+        # formatlama gibi pahalı işler listener thread'inde yapılır
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging():
+    """Kök logger'ı kuyruk + arka plan listener yapısına geçirir (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(NonBlockingQueueHandler(log_queue))
+    root.setLevel(LOG_LEVEL)
+
+    # Uvicorn logları da kuyruktan geçsin; erişim logunu request middleware'i yazar
+    for name in ("uvicorn", "uvicorn.error"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+    uvicorn_access = logging.getLogger("uvicorn.access")
+    uvicorn_access.handlers = []
+    uvicorn_access.propagate = False
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Kuyruktaki kayıtları yazıp listener thread'ini durdurur"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def should_log_request(path: str, status_code: int, duration_ms: float) -> bool:
+    """Hata ve yavaş istekler her zaman, diğerleri örnekleme oranına göre loglanır"""
+    if status_code >= 400 or duration_ms >= LOG_SLOW_REQUEST_MS:
+        return True
+    rate = LOG_SAMPLE_HEALTH if path in HEALTH_PATHS else LOG_SAMPLE_SUCCESS
+    if rate >= 1.0:
+        return True
+    return rate > 0.0 and random.random() < rate
+
+
+def log_request(
+    method: str,
+    path: str,
+    status_code: int,
+    duration_ms: float,
+    site_id: Optional[str],
+    db_queries: int = 0,
+    db_ms: float = 0.0
+):
+    """Tek bir yapılandırılmış erişim kaydı yazar"""
+    if not should_log_request(path, status_code, duration_ms):
+        return
+    level = logging.ERROR if status_code >= 500 else logging.WARNING if status_code >= 400 else logging.INFO
+    access_logger.log(level, "request", extra={"fields": {
+        "method": method,
+        "path": path,
+        "status": status_code,
+        "duration_ms": round(duration_ms, 2),
+        "site_id": site_id,
+        "db_queries": db_queries,
+        "db_ms": round(db_ms, 2),
+    }})
@@ -1,18 +1,26 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, HTMLResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 import os
 import logging
 from app.database import init_db
-from app.api import search, settings, export, analytics
+from app.api import search, settings, export, analytics, admin, feed
 from app.scheduler import start_scheduler
+from app.compression import CompressionMiddleware
+from app.static_assets import PrecompressedStaticFiles
+from app.logging_config import setup_logging, shutdown_logging
+from app.metrics import render_metrics
+from app.db_profiling import install_query_profiling
+from app.request_logging import RequestLoggingMiddleware
 
-# Logging ayarları
-logging.basicConfig(level=logging.INFO)
+# Logging ayarları - kuyruk + arka plan listener, JSON çıktı
+setup_logging()
 logger = logging.getLogger(__name__)
 
+# SQL sorgu süresi / sayısı hook'ları (yavaş sorgu logu, N+1 tespiti, metrikler)
+install_query_profiling()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -48,11 +56,19 @@ async def lifespan(app: FastAPI):
     try:
         logger.info("🛑 Shutdown event başladı...")
         from app.scheduler import stop_scheduler
+        from app.export_jobs import shutdown_export_jobs
+        from app.pdf_render import shutdown_pdf_pool
+        from app.alerts import shutdown_alerts
         stop_scheduler()
+        shutdown_export_jobs()
+        shutdown_pdf_pool()
+        shutdown_alerts()
         logger.info("🛑 Google Search Bot durduruldu!")
         print("🛑 Google Search Bot durduruldu!")
     except Exception as e:
         logger.error(f"❌ Shutdown event hatası: {e}", exc_info=True)
+    finally:
+        shutdown_logging()
 
 
 app = FastAPI(
@@ -71,51 +87,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Request logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    logger.info(f"📥 {request.method} {request.url.path}")
-    response = await call_next(request)
-    logger.info(f"📤 {request.method} {request.url.path} -> {response.status_code}")
-    return response
+# Eşik üzerindeki JSON/CSV/HTML response'ları brotli/gzip ile sıkıştır
+app.add_middleware(CompressionMiddleware)
+
+# Request logging middleware - istek başına tek yapılandırılmış kayıt (örneklemeli),
+# route bazlı latency ve veritabanı metrikleri (streaming gövde bitince kaydedilir)
+app.add_middleware(RequestLoggingMiddleware)
 
 # Frontend path'i belirle
 frontend_path = os.path.join(os.path.dirname(__file__), "../../frontend/dist")
 if not os.path.exists(frontend_path):
     frontend_path = "/app/frontend/dist"
 
+# Frontend dosyaları çalışma sırasında değişmez - kontroller başlangıçta bir kere yapılır
+frontend_exists = os.path.exists(frontend_path)
+index_path = os.path.join(frontend_path, "index.html")
+index_html = None
+if frontend_exists and os.path.exists(index_path):
+    with open(index_path, "rb") as f:
+        index_html = f.read()
+
+# index.html her deploy'da değişebilir, cache'lenmemeli
+INDEX_HEADERS = {"Cache-Control": "no-cache"}
+
 # Health check endpoint - EN ÖNCE tanımlanmalı (API route'larından önce)
 @app.get("/api/health")
 def health_check():
     """Health check endpoint"""
-    logger.info("🔍 /api/health endpoint called")
-    frontend_check = os.path.exists(frontend_path)
-    index_check = os.path.exists(os.path.join(frontend_path, "index.html")) if frontend_check else False
-    
-    logger.info(f"📁 Frontend path: {frontend_path}")
-    logger.info(f"📁 Frontend exists: {frontend_check}")
-    logger.info(f"📄 Index exists: {index_check}")
-    
     return {
         "status": "ok",
         "message": "Google Search Bot is running",
         "frontend_path": frontend_path,
-        "frontend_exists": frontend_check,
-        "index_exists": index_check
+        "frontend_exists": frontend_exists,
+        "index_exists": index_html is not None
     }
 
+# Prometheus metrikleri - SPA catch-all route'larından ÖNCE tanımlanmalı
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metin formatında uygulama metrikleri"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # API routes - Health'den SONRA, frontend'den ÖNCE
 app.include_router(search.router)
 app.include_router(settings.router)
 app.include_router(export.router)
 app.include_router(analytics.router)
+app.include_router(admin.router)
+app.include_router(feed.router)
 
 # Frontend static files - API route'larından SONRA mount et
-if os.path.exists(frontend_path):
-    # Assets klasörü (JS, CSS dosyaları)
+if frontend_exists:
+    # Assets klasörü (JS, CSS dosyaları) - hash'li isimler, immutable cache + .br/.gz kopyaları
     assets_path = os.path.join(frontend_path, "assets")
     if os.path.exists(assets_path):
-        app.mount("/assets", StaticFiles(directory=assets_path), name="assets")
+        app.mount("/assets", PrecompressedStaticFiles(directory=assets_path), name="assets")
     
     # Logo ve diğer public dosyalar için özel route
     logo_path = os.path.join(frontend_path, "logo.png")
@@ -125,16 +151,14 @@ if os.path.exists(frontend_path):
             return FileResponse(logo_path)
 
 # Root route ve Frontend SPA routing - EN SON eklenmeli
-if os.path.exists(frontend_path):
-    index_path = os.path.join(frontend_path, "index.html")
-    
+if frontend_exists:
     # Geçerli site ID'leri tanımla
     VALID_SITE_IDS = ['default', 'gala', 'hit', 'office', 'pipo', 'padisah']
     
     @app.get("/")
     async def read_root():
-        if os.path.exists(index_path):
-            return FileResponse(index_path)
+        if index_html is not None:
+            return HTMLResponse(index_html, headers=INDEX_HEADERS)
         return {
             "message": "Google Search Bot API",
             "docs": "/docs",
@@ -154,8 +178,8 @@ if os.path.exists(frontend_path):
                 content={"error": "Site not found", "path": site_id, "valid_sites": VALID_SITE_IDS}
             )
         
-        if os.path.exists(index_path):
-            return FileResponse(index_path)
+        if index_html is not None:
+            return HTMLResponse(index_html, headers=INDEX_HEADERS)
         
         return JSONResponse(
             status_code=404,
@@ -192,8 +216,8 @@ if os.path.exists(frontend_path):
         
         # Sadece geçerli site ID'leri için frontend serve et
         if site_id in VALID_SITE_IDS:
-            if os.path.exists(index_path):
-                return FileResponse(index_path)
+            if index_html is not None:
+                return HTMLResponse(index_html, headers=INDEX_HEADERS)
         
         # Geçersiz path için 404
         return JSONResponse(
@@ -0,0 +1,197 @@
+"""
+Prometheus metin formatında in-process metrikler
+
+Harici bir kütüphane kullanmadan, thread-safe ve düşük maliyetli sayaç ve
+histogramlar. Scheduler thread'leri ile API thread'leri aynı metrikleri
+güvenle güncelleyebilir; her metrik kendi kilidini kullanır ve kilit
+altında sadece birkaç aritmetik işlem yapılır. `/metrics` endpoint'i
+`render_metrics()` çıktısını döndürür.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+LAG_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    """Sadece artan sayaç"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Sabit kovalı histogram (kümülatif kovalar render sırasında hesaplanır)"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [kova sayaçları..., +Inf sayacı], toplam
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Blok süresini saniye olarak gözlemler"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+_registry: List = []
+
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def render_metrics() -> str:
+    """Tüm metrikleri Prometheus metin formatında döndürür"""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# SerpApi
+serpapi_request_seconds = _register(Histogram(
+    "serpapi_request_seconds", "SerpApi arama isteği süresi", ("site", "outcome"), SLOW_BUCKETS
+))
+
+# Ingest (perform_search)
+ingest_duration_seconds = _register(Histogram(
+    "ingest_duration_seconds", "perform_search toplam süresi (fetch + yazma)", ("site", "outcome"), SLOW_BUCKETS
+))
+ingest_rows_total = _register(Counter(
+    "ingest_rows_total", "Veritabanına yazılan link satırı sayısı", ("site",)
+))
+
+# Scheduler (run_scheduled_searches)
+scheduler_run_seconds = _register(Histogram(
+    "scheduler_run_seconds", "Bir sitenin tüm kelimeleri için zamanlanmış çalıştırma süresi", ("site",), SLOW_BUCKETS
+))
+scheduler_runs_total = _register(Counter(
+    "scheduler_runs_total", "Zamanlanmış çalıştırma sayısı", ("site", "outcome")
+))
+scheduler_lag_seconds = _register(Histogram(
+    "scheduler_lag_seconds", "Planlanan ve gerçek çalışma zamanı arasındaki fark", ("site",), LAG_BUCKETS
+))
+
+# HTTP
+http_request_seconds = _register(Histogram(
+    "http_request_seconds", "API isteği süresi", ("method", "route", "site")
+))
+http_requests_total = _register(Counter(
+    "http_requests_total", "API istek sayısı", ("method", "route", "status")
+))
+
+# Veritabanı (SQL profil hook'ları - app.db_profiling)
+db_query_seconds = _register(Histogram(
+    "db_query_seconds", "Tek bir SQL ifadesinin süresi", ("site",)
+))
+db_slow_queries_total = _register(Counter(
+    "db_slow_queries_total", "Eşik süresini aşan SQL ifadesi sayısı", ("site",)
+))
+http_db_seconds = _register(Histogram(
+    "http_db_seconds", "İstek başına toplam veritabanı süresi", ("method", "route")
+))
+http_db_queries = _register(Histogram(
+    "http_db_queries", "İstek başına SQL ifadesi sayısı", ("method", "route"), COUNT_BUCKETS
+))
+db_repeated_statements_total = _register(Counter(
+    "db_repeated_statements_total", "Aynı istekte tekrarlanan SQL kalıbı (olası N+1) sayısı", ("method", "route")
+))
+
+# Export job'ları (app.export_jobs)
+export_job_seconds = _register(Histogram(
+    "export_job_seconds", "Arka plan export job'ının üretim süresi", ("kind", "outcome"), SLOW_BUCKETS
+))
+export_artifact_requests_total = _register(Counter(
+    "export_artifact_requests_total", "Export job isteklerinin önbellek sonucu", ("kind", "result")
+))
+
+# Bildirim outbox'ı (app.alerts)
+alerts_total = _register(Counter(
+    "alerts_total", "Outbox bildirimlerinin gönderim sonucu (sent, retry, suppressed, skipped)", ("kind", "outcome")
+))
+alert_digests_total = _register(Counter(
+    "alert_digests_total", "Gönderilen uyarı özeti email'leri", ("outcome",)
+))
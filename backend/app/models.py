@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from datetime import datetime
 
 
@@ -46,6 +46,7 @@ class SearchLinkResponse(BaseModel):
 
 class SearchResultResponse(BaseModel):
     id: int
+    search_query: Optional[str] = None
     search_date: datetime
     total_results: int
     links: List[SearchLinkResponse]
@@ -106,5 +107,26 @@ class SchedulerStatusResponse(BaseModel):
     next_run_time: Optional[datetime] = None
     last_search_date: Optional[datetime] = None
     total_scheduled_runs: int = 0
-
-
+    last_run_status: Optional[str] = None
+    last_error: Optional[str] = None
+    recent_runs: int = 0
+    recent_failures: int = 0
+    failure_rate: Optional[float] = None
+    avg_lag_seconds: Optional[float] = None
+    max_lag_seconds: Optional[float] = None
+
+
+# Export Job Models
+# app.export_formats.EXPORT_FORMATS anahtarları
+ExportKind = Literal[
+    "excel_daily", "excel_position_history", "excel_summary",
+    "pdf_daily", "pdf_daily_summary", "pdf_summary",
+    "parquet_history", "arrow_history",
+]
+
+
+class ExportJobRequest(BaseModel):
+    kind: ExportKind
+    days: int = Field(30, ge=1)
+    url: Optional[str] = None
+    max_rows: Optional[int] = Field(None, ge=1)  # Sadece günlük PDF'ler
@@ -0,0 +1,290 @@
+"""
+Büyük tablolu PDF raporları
+
+ReportLab tek bir büyük `Table`'ı sayfalara bölerken kalan kısmı her sayfada
+yeniden ölçer; maliyet satır sayısıyla karesel büyür. Bu modül satırları
+sayfa boyunda tablolara böler (her tablo başlık satırını tekrarlar) ve tüm
+tablolarda aynı, bir kez oluşturulmuş `TableStyle` ve paragraf stillerini
+kullanır.
+
+Satır sayısı `PDF_SECTION_ROWS`'u geçerse ve pypdf kuruluysa, satırlar
+bölümlere ayrılır; her bölüm ayrı bir PDF olarak üretilir ve nesneleri
+sırayla çıktıya yazılır (`_SectionWriter`). Birleşik dosyadan bellekte
+sadece sayfa referansları ve nesne konumları tutulur, böylece aynı anda
+sadece birkaç bölümün tabloları bulunur. `PDF_RENDER_WORKERS` 1'den
+büyükse bölümler worker process'lerde paralel üretilir. pypdf yoksa rapor
+tek parça üretilir.
+
+Ayarlar:
+    PDF_ROWS_PER_TABLE  Tablo başına satır (varsayılan 40, A4'te yaklaşık bir sayfa)
+    PDF_SECTION_ROWS    Bölüm başına satır (varsayılan 5000)
+    PDF_RENDER_WORKERS  Worker process sayısı (varsayılan: CPU sayısı, en fazla 4)
+"""
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Sequence
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+try:
+    from pypdf import PdfReader
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject
+except ImportError:  # pypdf kurulu değilse PDF'ler tek process'te üretilir
+    PdfReader = None
+
+PDF_ROWS_PER_TABLE = int(os.getenv("PDF_ROWS_PER_TABLE", "40"))
+PDF_SECTION_ROWS = int(os.getenv("PDF_SECTION_ROWS", "5000"))
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", str(min(os.cpu_count() or 1, 4))))
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+])
+
+_styles = getSampleStyleSheet()
+NORMAL_STYLE = _styles['Normal']
+TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_styles['Heading1'],
+    fontSize=18,
+    textColor=colors.HexColor('#667eea'),
+    spaceAfter=30,
+    alignment=1  # Center
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _chunks(rows: Iterable[Sequence], size: int) -> Iterator[List[Sequence]]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _heading(title: str, date_range: str, note: Optional[str]) -> list:
+    elements = [
+        Paragraph(title, TITLE_STYLE),
+        Spacer(1, 0.2*inch),
+        Paragraph(f"<b>Tarih Aralığı:</b> {date_range}", NORMAL_STYLE),
+    ]
+    if note:
+        elements.append(Spacer(1, 0.1*inch))
+        elements.append(Paragraph(note, NORMAL_STYLE))
+    elements.append(Spacer(1, 0.3*inch))
+    return elements
+
+
+def _tables(headers: Sequence[str], col_widths: Sequence[float], rows: List[Sequence]) -> list:
+    widths = [width*inch for width in col_widths]
+    tables = []
+    # Satır yoksa sadece başlık satırından oluşan tablo
+    for chunk in list(_chunks(rows, PDF_ROWS_PER_TABLE)) or [[]]:
+        table = Table([list(headers)] + chunk, colWidths=widths, repeatRows=1)
+        table.setStyle(TABLE_STYLE)
+        tables.append(table)
+    return tables
+
+
+def _build(fileobj: BinaryIO, elements: list):
+    SimpleDocTemplate(fileobj, pagesize=A4).build(elements)
+
+
+def render_section(headers: Sequence[str], col_widths: Sequence[float], rows: List[Sequence],
+                   heading: Optional[tuple] = None) -> bytes:
+    """Bir bölümü ayrı bir PDF olarak üretir (worker process'te çalışır)"""
+    elements = _heading(*heading) if heading else []
+    elements.extend(_tables(headers, col_widths, rows))
+    output = BytesIO()
+    _build(output, elements)
+    return output.getvalue()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # fork, API ve scheduler thread'lerinin tuttuğu kilitleri kopyalayabilir
+        _pool = ProcessPoolExecutor(
+            max_workers=PDF_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def shutdown_pdf_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _render_sections(headers, col_widths, heading: tuple, sections: Iterator[List[Sequence]]) -> Iterator[bytes]:
+    """Bölümleri sırayla bu process'te üretir"""
+    for index, section in enumerate(sections):
+        yield render_section(headers, col_widths, section, heading if index == 0 else None)
+
+
+def _render_sections_parallel(headers, col_widths, heading: tuple,
+                              sections: Iterator[List[Sequence]]) -> Iterator[bytes]:
+    """Bölümleri worker process'lerde üretir; sonuçları sırayla döndürür"""
+    pool = _get_pool()
+    futures = []
+    for index, section in enumerate(sections):
+        futures.append(pool.submit(render_section, headers, col_widths, section, heading if index == 0 else None))
+        # En fazla worker sayısının iki katı bölüm bekletilir
+        while len(futures) > PDF_RENDER_WORKERS * 2:
+            yield futures.pop(0).result()
+    for future in futures:
+        yield future.result()
+
+
+class _SectionWriter:
+    """Bölüm PDF'lerini tek bir PDF olarak sırayla yazar
+
+    Her bölümün sayfaları ve sayfalardan ulaşılan nesneler yeni numaralarla
+    hemen çıktıya yazılır; katalog, sayfa ağacı ve xref tablosu `close`'da
+    eklenir.
+    """
+
+    _CATALOG = 1
+    _PAGES = 2
+
+    def __init__(self, fileobj: BinaryIO):
+        self._fileobj = fileobj
+        self._position = 0
+        self._offsets: List[int] = [0, 0]  # nesne numarası - 1 -> dosyadaki konum
+        self._kids: List[IndirectObject] = []
+        self._pages_ref = IndirectObject(self._PAGES, 0, None)
+        self.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def write(self, data: bytes):
+        self._fileobj.write(data)
+        self._position += len(data)
+
+    def _allocate(self) -> int:
+        self._offsets.append(0)
+        return len(self._offsets)
+
+    def _write_object(self, number: int, obj):
+        self._offsets[number - 1] = self._position
+        self.write(f"{number} 0 obj\n".encode())
+        obj.write_to_stream(self)
+        self.write(b"\nendobj\n")
+
+    def append(self, pdf: bytes):
+        """Bir bölümün sayfalarını çıktıya ekler"""
+        reader = PdfReader(BytesIO(pdf))
+        numbers = {}
+        pending: List[IndirectObject] = []
+
+        def renumber(ref: IndirectObject) -> IndirectObject:
+            key = (ref.idnum, ref.generation)
+            if key not in numbers:
+                numbers[key] = self._allocate()
+                pending.append(ref)
+            return IndirectObject(numbers[key], 0, None)
+
+        for page in reader.pages:
+            self._kids.append(renumber(page.indirect_reference))
+        while pending:
+            ref = pending.pop()
+            obj = ref.get_object()
+            is_page = isinstance(obj, DictionaryObject) and obj.get("/Type") == "/Page"
+            if is_page:
+                # Bölümün kendi sayfa ağacına inilmez, sayfa birleşik ağaca bağlanır
+                del obj["/Parent"]
+            self._rewrite_references(obj, renumber)
+            if is_page:
+                obj[NameObject("/Parent")] = self._pages_ref
+            self._write_object(numbers[(ref.idnum, ref.generation)], obj)
+
+    @staticmethod
+    def _rewrite_references(obj, renumber):
+        # DictionaryObject/ArrayObject erişimi referansları çözdüğü için temel tip metotları kullanılır
+        stack = [obj]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, DictionaryObject):
+                entries, setter = list(dict.items(item)), dict.__setitem__
+            elif isinstance(item, ArrayObject):
+                entries, setter = list(enumerate(list.__iter__(item))), list.__setitem__
+            else:
+                continue
+            for key, value in entries:
+                if isinstance(value, IndirectObject):
+                    setter(item, key, renumber(value))
+                elif isinstance(value, (DictionaryObject, ArrayObject)):
+                    stack.append(value)
+
+    def close(self):
+        """Sayfa ağacını, kataloğu ve xref tablosunu yazar"""
+        self._write_object(self._PAGES, DictionaryObject({
+            NameObject("/Type"): NameObject("/Pages"),
+            NameObject("/Kids"): ArrayObject(self._kids),
+            NameObject("/Count"): NumberObject(len(self._kids)),
+        }))
+        self._write_object(self._CATALOG, DictionaryObject({
+            NameObject("/Type"): NameObject("/Catalog"),
+            NameObject("/Pages"): self._pages_ref,
+        }))
+        xref = self._position
+        size = len(self._offsets) + 1
+        self.write(f"xref\n0 {size}\n0000000000 65535 f \n".encode())
+        self.write("".join(f"{offset:010d} 00000 n \n" for offset in self._offsets).encode())
+        self.write(f"trailer\n<< /Size {size} /Root {self._CATALOG} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+
+def write_pdf_table(
+    fileobj: BinaryIO,
+    title: str,
+    date_range: str,
+    headers: Sequence[str],
+    col_widths: Sequence[float],
+    rows: Iterable[Sequence],
+    note: Optional[str] = None
+) -> int:
+    """Başlık, tarih aralığı ve sayfa boyu tablolardan oluşan PDF raporu yazar; satır sayısını döndürür"""
+    heading = (title, date_range, note)
+    sections = _chunks(rows, PDF_SECTION_ROWS)
+    first = next(sections, [])
+    second = next(sections, None)
+
+    if second is None or PdfReader is None:
+        # Tek bölüm (ya da pypdf yok) - tek parça üret
+        rows = list(itertools.chain(first, second or [], itertools.chain.from_iterable(sections)))
+        elements = _heading(*heading)
+        elements.extend(_tables(headers, col_widths, rows))
+        _build(fileobj, elements)
+        return len(rows)
+
+    count = 0
+
+    def counted():
+        nonlocal count
+        for section in itertools.chain([first, second], sections):
+            count += len(section)
+            yield section
+
+    render = _render_sections_parallel if PDF_RENDER_WORKERS > 1 else _render_sections
+    writer = _SectionWriter(fileobj)
+    for pdf in render(headers, col_widths, heading, counted()):
+        writer.append(pdf)
+    writer.close()
+    return count
@@ -0,0 +1,210 @@
+"""
+Çalışan process için örnekleme (sampling) profiler'ı
+
+Ayrı bir daemon thread belirli aralıklarla `sys._current_frames()` ile tüm
+thread'lerin (event loop, API worker thread'leri, APScheduler thread'leri)
+stack'ini okur ve aynı stack'leri sayar. Kod enstrümante edilmediği için
+profil sırasında istek işleme yavaşlamaz; maliyet örnekleme aralığıyla
+sınırlıdır. Aynı anda tek bir profil çalışabilir.
+
+Çıktı formatları:
+    collapsed    `thread;frame;frame <sayı>` satırları (flamegraph.pl, speedscope)
+    speedscope   https://www.speedscope.app dosya formatı (thread başına bir profil)
+
+İstek bazlı modda (`X-Profile` başlığı) sadece istek süresince örnek alınır,
+boşta bekleyen thread'ler (lock/selector/queue bekleyenler) çıkarılır ve
+sonuç son profiller arasında saklanır.
+"""
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_DEFAULT_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_KEEP = 20
+
+# Yaprak frame'i bunlardan biri olan stack'ler "boşta bekleme" sayılır
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("base_events.py", "_run_once"),
+    ("thread.py", "_worker"),
+}
+
+Frame = Tuple[str, str, int]  # (dosya, fonksiyon, ilk satır)
+
+
+class ProfilerBusy(Exception):
+    """Başka bir profil zaten çalışıyor"""
+
+
+_profile_lock = threading.Lock()
+_profile_ids = itertools.count(1)
+_recent_profiles: "OrderedDict[str, Profile]" = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+class Profile:
+    """Toplanan stack örnekleri ve formatlayıcılar"""
+
+    def __init__(self, interval: float, name: str):
+        self.interval = interval
+        self.name = name
+        self.samples: Counter = Counter()  # (thread adı, stack) -> sayı
+        self.sample_rounds = 0
+        self.started_at = time.time()
+        self.duration = 0.0
+
+    def to_collapsed(self) -> str:
+        lines = []
+        for (thread_name, stack), count in self.samples.most_common():
+            frames = ";".join(_frame_label(frame) for frame in stack)
+            lines.append(f"{thread_name};{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self) -> Dict:
+        frame_index: Dict[Frame, int] = {}
+        frames: List[Dict] = []
+        by_thread: Dict[str, List[Tuple[List[int], int]]] = {}
+
+        for (thread_name, stack), count in self.samples.items():
+            indexes = []
+            for frame in stack:
+                index = frame_index.get(frame)
+                if index is None:
+                    index = frame_index[frame] = len(frames)
+                    frames.append({"name": frame[1], "file": frame[0], "line": frame[2]})
+                indexes.append(index)
+            by_thread.setdefault(thread_name, []).append((indexes, count))
+
+        profiles = []
+        for thread_name, stacks in sorted(by_thread.items()):
+            weights = [count * self.interval for _, count in stacks]
+            profiles.append({
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": [indexes for indexes, _ in stacks],
+                "weights": weights,
+            })
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+            "name": self.name,
+            "activeProfileIndex": 0,
+            "exporter": "google-search-bot",
+        }
+
+
+def _frame_label(frame: Frame) -> str:
+    filename, function, line = frame
+    return f"{function} ({os.path.basename(filename)}:{line})"
+
+
+def _is_idle(stack: Tuple[Frame, ...]) -> bool:
+    if not stack:
+        return True
+    filename, function, _ = stack[-1]
+    return (os.path.basename(filename), function) in IDLE_LEAVES
+
+
+class SamplingProfiler:
+    """Arka plan thread'inde tüm thread'lerin stack'ini örnekler"""
+
+    def __init__(
+        self,
+        interval_ms: float = PROFILE_DEFAULT_INTERVAL_MS,
+        name: str = "profile",
+        skip_idle: bool = False,
+        exclude_threads: Tuple[int, ...] = ()
+    ):
+        self.profile = Profile(max(interval_ms, 1.0) / 1000.0, name)
+        self.skip_idle = skip_idle
+        self.exclude_threads = set(exclude_threads)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if not _profile_lock.acquire(blocking=False):
+            raise ProfilerBusy("Başka bir profil zaten çalışıyor")
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Profile:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            _profile_lock.release()
+        return self.profile
+
+    def _run(self):
+        excluded = self.exclude_threads | {threading.get_ident()}
+        interval = self.profile.interval
+        samples = self.profile.samples
+        code_cache: Dict[object, Frame] = {}
+        started = time.perf_counter()
+
+        while not self._stop.is_set():
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id in excluded:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    entry = code_cache.get(code)
+                    if entry is None:
+                        entry = code_cache[code] = (code.co_filename, code.co_name, code.co_firstlineno)
+                    stack.append(entry)
+                    frame = frame.f_back
+                stack.reverse()
+                stack = tuple(stack)
+                if self.skip_idle and _is_idle(stack):
+                    continue
+                samples[(names.get(thread_id, str(thread_id)), stack)] += 1
+            self.profile.sample_rounds += 1
+            self._stop.wait(interval)
+
+        self.profile.duration = time.perf_counter() - started
+
+
+def profile_for(seconds: float, interval_ms: float = PROFILE_DEFAULT_INTERVAL_MS, skip_idle: bool = True) -> Profile:
+    """Verilen süre boyunca tüm process'i örnekler (çağıran thread'i bloklar)"""
+    profiler = SamplingProfiler(
+        interval_ms,
+        name=f"process {min(seconds, PROFILE_MAX_SECONDS):g}s",
+        skip_idle=skip_idle,
+        exclude_threads=(threading.get_ident(),)
+    )
+    profiler.start()
+    try:
+        time.sleep(min(seconds, PROFILE_MAX_SECONDS))
+    finally:
+        profile = profiler.stop()
+    return profile
+
+
+def store_profile(profile: Profile) -> str:
+    """İstek bazlı profili saklar ve ID'sini döndürür (son PROFILE_KEEP profil tutulur)"""
+    profile_id = str(next(_profile_ids))
+    with _recent_lock:
+        _recent_profiles[profile_id] = profile
+        while len(_recent_profiles) > PROFILE_KEEP:
+            _recent_profiles.popitem(last=False)
+    return profile_id
+
+
+def get_profile(profile_id: str) -> Optional[Profile]:
+    with _recent_lock:
+        return _recent_profiles.get(profile_id)
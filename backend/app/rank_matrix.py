@@ -0,0 +1,367 @@
+"""
+Site başına bellek içi pozisyon matrisi (url × arama çalıştırması)
+
+Trend, hareket, volatilite ve dağılım hesapları aynı url × run pozisyon
+matrisinin üzerinde çalışır. Matris her site için ilk kullanımda SQLite'tan
+yüklenir, her `perform_search` sonrasında sadece yeni çalıştırmalarla
+genişletilir ve toplam bellek bütçesi aşılınca en eski kullanılan site
+matrisi bellekten atılır.
+
+Pozisyonlar int8 olarak tutulur (0 = o çalıştırmada görünmedi), URL'ler ve
+domain'ler sözlükle (dictionary encoding) tamsayı ID'lere çevrilir.
+"""
+import os
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.database import SearchResult, SearchLink
+
+logger = logging.getLogger(__name__)
+
+# Tüm site matrisleri için toplam bellek bütçesi
+RANK_MATRIX_MAX_BYTES = int(float(os.getenv("RANK_MATRIX_MAX_MB", "256")) * 1024 * 1024)
+
+# int8 sınırı - bu değerin üzerindeki pozisyonlar kırpılır
+MAX_POSITION = 127
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _to_epoch(dt: datetime) -> int:
+    """Naive UTC datetime'ı epoch mikrosaniyesine çevirir"""
+    delta = dt - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+class SiteRankMatrix:
+    """Tek bir site için url × run pozisyon matrisi"""
+
+    def __init__(self, site_id: str):
+        self.site_id = site_id
+        self.lock = threading.Lock()
+
+        # URL sözlüğü
+        self.url_ids: Dict[str, int] = {}
+        self.urls: List[str] = []
+        self.titles: List[str] = []
+        self.url_domain = np.zeros(64, dtype=np.int32)
+
+        # Domain sözlüğü
+        self.domain_ids: Dict[str, int] = {}
+        self.domains: List[str] = []
+
+        # Çalıştırma (SearchResult) ekseni - zamanlar epoch mikrosaniye
+        self.run_result_ids = np.zeros(64, dtype=np.int64)
+        self.run_ts = np.zeros(64, dtype=np.int64)
+
+        self.positions = np.zeros((64, 64), dtype=np.int8)
+        self.n_urls = 0
+        self.n_runs = 0
+        self.last_result_id = 0
+
+    @property
+    def nbytes(self) -> int:
+        """Matrisin yaklaşık bellek kullanımı"""
+        string_bytes = sum(len(u) for u in self.urls) + sum(len(t) for t in self.titles)
+        return (
+            self.positions.nbytes + self.url_domain.nbytes
+            + self.run_result_ids.nbytes + self.run_ts.nbytes + string_bytes
+        )
+
+    def _domain_id(self, domain: str) -> int:
+        domain_id = self.domain_ids.get(domain)
+        if domain_id is None:
+            domain_id = len(self.domains)
+            self.domain_ids[domain] = domain_id
+            self.domains.append(domain)
+        return domain_id
+
+    def _url_id(self, url: str, domain: str, title: str) -> int:
+        url_id = self.url_ids.get(url)
+        if url_id is None:
+            url_id = self.n_urls
+            if url_id >= self.positions.shape[0]:
+                self._grow(urls=url_id + 1)
+            self.url_ids[url] = url_id
+            self.urls.append(url)
+            self.titles.append(title)
+            self.url_domain[url_id] = self._domain_id(domain)
+            self.n_urls += 1
+        elif title:
+            self.titles[url_id] = title
+        return url_id
+
+    def _grow(self, urls: int = 0, runs: int = 0):
+        """Kapasiteyi ikiye katlayarak büyütür (eski view'lar geçerli kalır)"""
+        url_cap, run_cap = self.positions.shape
+        new_url_cap = url_cap
+        while new_url_cap < urls:
+            new_url_cap *= 2
+        new_run_cap = run_cap
+        while new_run_cap < runs:
+            new_run_cap *= 2
+
+        if new_url_cap != url_cap or new_run_cap != run_cap:
+            positions = np.zeros((new_url_cap, new_run_cap), dtype=np.int8)
+            positions[:self.n_urls, :self.n_runs] = self.positions[:self.n_urls, :self.n_runs]
+            self.positions = positions
+        if new_url_cap != url_cap:
+            url_domain = np.zeros(new_url_cap, dtype=np.int32)
+            url_domain[:self.n_urls] = self.url_domain[:self.n_urls]
+            self.url_domain = url_domain
+        if new_run_cap != run_cap:
+            run_result_ids = np.zeros(new_run_cap, dtype=np.int64)
+            run_result_ids[:self.n_runs] = self.run_result_ids[:self.n_runs]
+            self.run_result_ids = run_result_ids
+            run_ts = np.zeros(new_run_cap, dtype=np.int64)
+            run_ts[:self.n_runs] = self.run_ts[:self.n_runs]
+            self.run_ts = run_ts
+
+    def refresh(self, db: Session) -> int:
+        """Son yüklenen çalıştırmadan sonraki kayıtları matrise ekler, eklenen run sayısını döndürür"""
+        with self.lock:
+            runs = db.query(SearchResult.id, SearchResult.search_date)\
+                .filter(SearchResult.id > self.last_result_id)\
+                .order_by(SearchResult.id.asc())\
+                .all()
+            if not runs:
+                return 0
+
+            first_col = self.n_runs
+            self._grow(runs=first_col + len(runs))
+            columns = {}
+            for offset, (result_id, search_date) in enumerate(runs):
+                col = first_col + offset
+                columns[result_id] = col
+                self.run_result_ids[col] = result_id
+                self.run_ts[col] = _to_epoch(search_date) if search_date else 0
+
+            links = db.query(
+                SearchLink.search_result_id,
+                SearchLink.url,
+                SearchLink.domain,
+                SearchLink.title,
+                SearchLink.position
+            ).filter(
+                SearchLink.search_result_id > self.last_result_id,
+                SearchLink.search_result_id <= runs[-1][0]
+            ).yield_per(5000)
+
+            rows, cols, values = [], [], []
+            for result_id, url, domain, title, position in links:
+                col = columns.get(result_id)
+                if col is None or not url or not position:
+                    continue
+                rows.append(self._url_id(url, domain or "", title or ""))
+                cols.append(col)
+                values.append(min(position, MAX_POSITION))
+
+            if rows:
+                rows = np.asarray(rows, dtype=np.int64)
+                cols = np.asarray(cols, dtype=np.int64)
+                values = np.asarray(values, dtype=np.int8)
+                # Aynı URL bir çalıştırmada birden fazla görünürse en iyi pozisyon kalır
+                order = np.argsort(-values, kind="stable")
+                self.positions[rows[order], cols[order]] = values[order]
+
+            self.n_runs = first_col + len(runs)
+            self.last_result_id = int(runs[-1][0])
+            return len(runs)
+
+    def snapshot(self, since: Optional[datetime] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Zaman penceresindeki (pozisyonlar, run zamanları, url→domain) dizilerini döndürür"""
+        with self.lock:
+            positions = self.positions[:self.n_urls, :self.n_runs]
+            run_ts = self.run_ts[:self.n_runs]
+            url_domain = self.url_domain[:self.n_urls]
+        if since is not None:
+            cols = np.flatnonzero(run_ts >= _to_epoch(since))
+            positions = positions[:, cols]
+            run_ts = run_ts[cols]
+        return positions, run_ts, url_domain
+
+    def top_movers(self, since: datetime, limit: int, direction: str = "both") -> List[dict]:
+        """Penceredeki ilk ve son görünme pozisyonuna göre en çok hareket eden URL'ler"""
+        positions, _, url_domain = self.snapshot(since)
+        if positions.size == 0:
+            return []
+
+        present = positions > 0
+        has_any = present.any(axis=1)
+        n_runs = positions.shape[1]
+        first_col = present.argmax(axis=1)
+        last_col = n_runs - 1 - present[:, ::-1].argmax(axis=1)
+        rows = np.arange(positions.shape[0])
+        first_pos = positions[rows, first_col].astype(np.int16)
+        last_pos = positions[rows, last_col].astype(np.int16)
+        change = first_pos - last_pos
+
+        mask = has_any & (change != 0)
+        if direction == "up":
+            mask &= change > 0
+        elif direction == "down":
+            mask &= change < 0
+
+        candidates = np.flatnonzero(mask)
+        order = candidates[np.argsort(-np.abs(change[candidates]), kind="stable")][:limit]
+
+        return [
+            {
+                "url": self.urls[i],
+                "domain": self.domains[url_domain[i]],
+                "title": self.titles[i],
+                "first_position": int(first_pos[i]),
+                "last_position": int(last_pos[i]),
+                "change": int(change[i]),
+                "direction": "up" if change[i] > 0 else "down"
+            }
+            for i in order
+        ]
+
+    def domain_distribution(self, since: datetime, limit: int) -> List[dict]:
+        """Domain başına toplam görünme, benzersiz URL, ortalama ve en iyi pozisyon"""
+        positions, _, url_domain = self.snapshot(since)
+        n_domains = len(self.domains)
+        if positions.size == 0 or n_domains == 0:
+            return []
+
+        present = positions > 0
+        url_counts = present.sum(axis=1)
+        url_sums = positions.sum(axis=1, dtype=np.int64)
+        url_best = np.where(present, positions.astype(np.int16), MAX_POSITION + 1).min(axis=1)
+
+        total_links = np.bincount(url_domain, weights=url_counts, minlength=n_domains)
+        unique_urls = np.bincount(url_domain, weights=url_counts > 0, minlength=n_domains)
+        position_sums = np.bincount(url_domain, weights=url_sums, minlength=n_domains)
+        best = np.full(n_domains, MAX_POSITION + 1, dtype=np.int16)
+        np.minimum.at(best, url_domain, url_best)
+
+        mask = total_links > 0
+        empty_domain = self.domain_ids.get("")
+        if empty_domain is not None:
+            mask[empty_domain] = False
+
+        candidates = np.flatnonzero(mask)
+        order = candidates[np.argsort(-total_links[candidates], kind="stable")][:limit]
+
+        return [
+            {
+                "domain": self.domains[d],
+                "total_links": int(total_links[d]),
+                "unique_urls": int(unique_urls[d]),
+                "avg_position": float(position_sums[d] / total_links[d]),
+                "best_position": int(best[d])
+            }
+            for d in order
+        ]
+
+    def unique_urls_by_domain(self, since: datetime, domains: List[str]) -> Dict[str, int]:
+        """Penceredeki benzersiz URL sayısını verilen domainler için döndürür"""
+        positions, _, url_domain = self.snapshot(since)
+        seen = (positions > 0).any(axis=1)
+        counts = np.bincount(url_domain[seen], minlength=len(self.domains))
+        return {
+            domain: int(counts[self.domain_ids[domain]]) if domain in self.domain_ids else 0
+            for domain in domains
+        }
+
+    def volatility(self, since: datetime, limit: int, min_appearances: int = 2) -> List[dict]:
+        """URL başına pozisyon standart sapması ve ardışık görünmeler arası ortalama değişim"""
+        positions, _, url_domain = self.snapshot(since)
+        if positions.size == 0:
+            return []
+
+        present = positions > 0
+        counts = present.sum(axis=1)
+        values = positions.astype(np.float64)
+        sums = values.sum(axis=1)
+        squares = (values * values).sum(axis=1)
+        safe_counts = np.maximum(counts, 1)
+        means = sums / safe_counts
+        stds = np.sqrt(np.maximum(squares / safe_counts - means * means, 0.0))
+
+        # Ardışık görünmeler arası mutlak değişim: boşlukları son görülen pozisyonla doldur
+        cols = np.where(present, np.arange(positions.shape[1]), 0)
+        np.maximum.accumulate(cols, axis=1, out=cols)
+        filled = np.take_along_axis(values, cols, axis=1)
+        steps = np.abs(np.diff(filled, axis=1)) * present[:, 1:] * (filled[:, :-1] > 0)
+        mean_steps = steps.sum(axis=1) / np.maximum(counts - 1, 1)
+
+        candidates = np.flatnonzero(counts >= max(min_appearances, 1))
+        order = candidates[np.argsort(-stds[candidates], kind="stable")][:limit]
+        best = np.where(present, positions.astype(np.int16), MAX_POSITION + 1).min(axis=1)
+        worst = positions.max(axis=1)
+
+        return [
+            {
+                "url": self.urls[i],
+                "domain": self.domains[url_domain[i]],
+                "appearances": int(counts[i]),
+                "avg_position": round(float(means[i]), 2),
+                "std_position": round(float(stds[i]), 3),
+                "avg_step_change": round(float(mean_steps[i]), 3),
+                "best_position": int(best[i]),
+                "worst_position": int(worst[i])
+            }
+            for i in order
+        ]
+
+
+class RankMatrixStore:
+    """Site matrislerini bellek bütçesine göre LRU olarak tutar"""
+
+    def __init__(self, max_bytes: int = RANK_MATRIX_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._matrices: "OrderedDict[str, SiteRankMatrix]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, site_id: str, db: Session) -> SiteRankMatrix:
+        """Site matrisini döndürür; yoksa yükler, varsa yeni çalıştırmalarla günceller"""
+        with self._lock:
+            matrix = self._matrices.get(site_id)
+            if matrix is None:
+                matrix = SiteRankMatrix(site_id)
+                self._matrices[site_id] = matrix
+            self._matrices.move_to_end(site_id)
+
+        added = matrix.refresh(db)
+        if added:
+            logger.debug(f"[{site_id}] Rank matrix: {added} yeni çalıştırma eklendi ({matrix.n_urls} url × {matrix.n_runs} run)")
+            self._evict()
+        return matrix
+
+    def extend(self, site_id: str, db: Session):
+        """Ingest sonrası çağrılır - matris yüklüyse yeni çalıştırmaları ekler (yüklenmemişse lazy kalır)"""
+        with self._lock:
+            matrix = self._matrices.get(site_id)
+        if matrix is None:
+            return
+        matrix.refresh(db)
+        self._evict()
+
+    def invalidate(self, site_id: Optional[str] = None):
+        """Bir sitenin (veya tüm sitelerin) matrisini bellekten atar"""
+        with self._lock:
+            if site_id is None:
+                self._matrices.clear()
+            else:
+                self._matrices.pop(site_id, None)
+
+    def _evict(self):
+        """Bütçe aşıldıysa en uzun süredir kullanılmayan matrisleri atar (en az bir matris kalır)"""
+        with self._lock:
+            total = sum(m.nbytes for m in self._matrices.values())
+            while total > self.max_bytes and len(self._matrices) > 1:
+                site_id, matrix = self._matrices.popitem(last=False)
+                total -= matrix.nbytes
+                logger.info(f"[{site_id}] Rank matrix bellekten atıldı ({matrix.nbytes} byte)")
+
+
+# Global store instance
+rank_matrix_store = RankMatrixStore()
@@ -0,0 +1,104 @@
+"""
+İstek logu ve HTTP metrikleri middleware'i
+
+İstek başına tek yapılandırılmış erişim kaydı (örneklemeli), route bazlı
+latency ve istek sayısı metrikleri. Saf ASGI middleware'i olarak `send`'i
+sarar: süre, response gövdesinin son parçası (`more_body=False`)
+gönderildiğinde ölçülür, böylece streaming export'larda (CSV/NDJSON, ZIP
+arşivi, değişiklik feed'i) ilk byte'a kadar değil tüm gövdenin süresi
+kaydedilir. İstek bazlı SQL özeti (`app.db_profiling`) de aynı anda
+kapatılır, böylece gövdeyi üretirken çalışan sorgular da sayılır. Gövde
+gönderilmeden biten isteklerde (ör. hata) kayıt uygulama döndüğünde
+yazılır.
+
+`X-Profile` + geçerli `X-Admin-Token` başlıklarıyla gelen istekler
+örnekleyici profiler ile profillenir; profil response başlıkları
+gönderilirken kaydedilir ve ID'si `X-Profile-Id` başlığında döner.
+"""
+import time
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.db_profiling import add_db_headers, begin_request, end_request, finish_request
+from app.dependencies import is_admin_token
+from app.logging_config import log_request
+from app.metrics import http_request_seconds, http_requests_total
+from app.profiler import SamplingProfiler, ProfilerBusy, store_profile
+from app.scheduler import VALID_SITE_IDS
+
+
+def _site_label(site_id: Optional[str]) -> str:
+    # Site etiketi query string'den gelir; bilinmeyen değerler tek bir etikette toplanır
+    site_label = site_id or "default"
+    return site_label if site_label in VALID_SITE_IDS else "other"
+
+
+class RequestLoggingMiddleware:
+    """İstek süresini response gövdesi tamamen gönderildiğinde kaydeden middleware"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        method = scope["method"]
+        path = scope["path"]
+        site_id = QueryParams(scope.get("query_string", b"")).get("site_id")
+        request_headers = Headers(scope=scope)
+        status_code = 500
+        finished = False
+        db_stats, db_token = begin_request()
+
+        profiler = None
+        if "x-profile" in request_headers and is_admin_token(request_headers.get("x-admin-token")):
+            profiler = SamplingProfiler(name=f"{method} {path}", skip_idle=True)
+            try:
+                profiler.start()
+            except ProfilerBusy:
+                profiler = None
+
+        def route_path() -> str:
+            # Metrik etiketi olarak ham path yerine route şablonu kullanılır (kardinalite sınırlı kalsın)
+            return getattr(scope.get("route"), "path", "unmatched")
+
+        def finish():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            duration = time.perf_counter() - start
+            route = route_path()
+            end_request(db_stats, method, route)
+            log_request(
+                method, path, status_code, duration * 1000, site_id,
+                db_stats.query_count, db_stats.total_seconds * 1000
+            )
+            http_request_seconds.observe(duration, method=method, route=route, site=_site_label(site_id))
+            http_requests_total.inc(method=method, route=route, status=status_code)
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, profiler
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                if profiler is not None:
+                    headers["X-Profile-Id"] = store_profile(profiler.stop())
+                    profiler = None
+                add_db_headers(db_stats, headers)
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler is not None:
+                store_profile(profiler.stop())
+            finish_request(db_token)
+            finish()
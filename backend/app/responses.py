@@ -0,0 +1,32 @@
+"""
+Hızlı JSON response sınıfı ve yardımcıları
+
+API router'larının varsayılan response sınıfı orjson tabanlıdır. Büyük liste
+döndüren endpoint'ler satırları Pydantic modellerine çevirmeden, doğrudan
+sorgu tuple'larından `rows_response` ile serialize eder; böylece FastAPI'nin
+`jsonable_encoder` ile veriyi ikinci kez dolaşması da atlanır.
+"""
+from typing import Any, Iterable, Sequence
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson ile serialize eden response (numpy dizileri ve datetime doğrudan desteklenir)"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+
+def rows_to_dicts(columns: Sequence[str], rows: Iterable[Sequence]) -> list:
+    """Sorgu tuple'larını kolon isimleriyle dict listesine çevirir"""
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def rows_response(columns: Sequence[str], rows: Iterable[Sequence]) -> FastJSONResponse:
+    """Sorgu tuple'larını doğrudan JSON response olarak döndürür"""
+    return FastJSONResponse(rows_to_dicts(columns, rows))
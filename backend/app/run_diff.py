@@ -0,0 +1,161 @@
+"""
+İki çalıştırma arasındaki snapshot farkı
+
+Önceki çalıştırma aynı kelimenin `(search_query, search_date)` index'i
+üzerinden bulunur, linkleri `search_links.search_result_id` index'i
+üzerinden URL -> pozisyon haritasına okunur ve yeni çalıştırmanın linkleri
+tek geçişte bu haritayla karşılaştırılır: sadece yeni çalıştırmada olan
+URL'ler giren, sadece eskide olanlar çıkan, ikisinde de olup pozisyonu
+değişenler yer değiştiren olarak raporlanır. `delta` önceki
+pozisyon eksi yeni pozisyondur (pozitif: yükseliş), diğer export'lardaki
+değişim kolonuyla aynı yönde.
+
+Ingest her yeni çalıştırmanın aynı kelimedeki bir önceki çalıştırmaya göre
+farkını aynı transaction içinde `run_diffs` tablosuna yazar; "son
+çalıştırma ile öncekinin farkı" istekleri, değişiklik akışındaki özet
+sayılar ve pozisyon uyarıları bu kayıttan üretilir.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+import orjson
+from sqlalchemy.orm import Session
+
+from app.database import RunDiff, SearchLink, SearchResult
+
+
+def previous_run_id(db: Session, search_result: SearchResult) -> Optional[int]:
+    """Aynı kelimenin bu çalıştırmadan önceki son çalıştırması"""
+    if not search_result.search_query:
+        return None
+    row = db.query(SearchResult.id).filter(
+        SearchResult.search_query == search_result.search_query,
+        SearchResult.search_date <= search_result.search_date,
+        SearchResult.id != search_result.id
+    ).order_by(
+        SearchResult.search_date.desc(), SearchResult.id.desc()
+    ).first()
+    return row[0] if row else None
+
+
+def latest_run(db: Session, keyword: Optional[str] = None) -> Optional[SearchResult]:
+    """En son çalıştırma (kelime verilirse o kelimenin)"""
+    query = db.query(SearchResult)
+    if keyword:
+        query = query.filter(SearchResult.search_query == keyword)
+    return query.order_by(SearchResult.search_date.desc(), SearchResult.id.desc()).first()
+
+
+def _run_links(db: Session, result_id: int) -> Dict[str, Tuple]:
+    """Çalıştırmanın URL -> (pozisyon, domain, başlık) haritası (index üzerinden tek sorgu)"""
+    return _best_positions(db.query(
+        SearchLink.url,
+        SearchLink.position,
+        SearchLink.domain,
+        SearchLink.title
+    ).filter(
+        SearchLink.search_result_id == result_id
+    ))
+
+
+def _best_positions(rows: Iterable[Tuple]) -> Dict[str, Tuple]:
+    # Aynı URL bir çalıştırmada birden fazla görünürse en iyi pozisyon alınır
+    links: Dict[str, Tuple] = {}
+    for url, position, domain, title in rows:
+        current = links.get(url)
+        if current is None or position < current[0]:
+            links[url] = (position, domain, title)
+    return links
+
+
+def compute_diff(
+    db: Session,
+    previous: SearchResult,
+    current: SearchResult,
+    current_links: Optional[Iterable[Dict]] = None
+) -> Dict:
+    """İki çalıştırmanın linklerini karşılaştırır
+
+    Ingest yeni çalıştırmanın linklerini (`extract_links` çıktısı) zaten
+    bellekte tuttuğu için `current_links` ile verir; bu durumda sadece önceki
+    çalıştırmanın linkleri okunur.
+    """
+    old = _run_links(db, previous.id)
+    if current_links is None:
+        new = _run_links(db, current.id)
+    else:
+        new = _best_positions(
+            (link["url"], link["position"], link.get("domain", ""), link.get("title")) for link in current_links
+        )
+
+    entered, moved = [], []
+    unchanged = 0
+    for url, (position, domain, title) in new.items():
+        old_link = old.pop(url, None)
+        if old_link is None:
+            entered.append({"url": url, "domain": domain, "title": title, "position": position})
+        elif old_link[0] != position:
+            moved.append({
+                "url": url,
+                "domain": domain,
+                "title": title,
+                "previous_position": old_link[0],
+                "position": position,
+                "delta": old_link[0] - position
+            })
+        else:
+            unchanged += 1
+    # Haritada kalanlar yeni çalıştırmada yok
+    exited = [
+        {"url": url, "domain": domain, "title": title, "previous_position": position}
+        for url, (position, domain, title) in old.items()
+    ]
+
+    entered.sort(key=lambda item: (item["position"], item["url"]))
+    exited.sort(key=lambda item: (item["previous_position"], item["url"]))
+    moved.sort(key=lambda item: (-abs(item["delta"]), item["position"], item["url"]))
+    return {
+        "search_query": current.search_query,
+        "from_run": previous.id,
+        "from_date": previous.search_date.isoformat(),
+        "to_run": current.id,
+        "to_date": current.search_date.isoformat(),
+        "entered": entered,
+        "exited": exited,
+        "moved": moved,
+        "unchanged": unchanged,
+    }
+
+
+def store_run_diff(
+    db: Session,
+    search_result: SearchResult,
+    links: Optional[Iterable[Dict]] = None
+) -> Optional[Dict]:
+    """Yeni çalıştırmanın farkını ingest transaction'ı içinde kaydeder ve döndürür (commit çağıran tarafta)
+
+    Dönen kayıt uyarılar gibi ingest sonrası tüketiciler tarafından tekrar
+    sorgu yapılmadan kullanılır; aynı kelimenin önceki çalıştırması yoksa None.
+    """
+    db.flush()
+    previous_id = previous_run_id(db, search_result)
+    if previous_id is None:
+        return None
+    diff = compute_diff(db, db.get(SearchResult, previous_id), search_result, links)
+    db.add(RunDiff(
+        search_result_id=search_result.id,
+        previous_result_id=previous_id,
+        search_query=search_result.search_query,
+        entered=len(diff["entered"]),
+        exited=len(diff["exited"]),
+        moved=len(diff["moved"]),
+        payload=orjson.dumps(diff).decode()
+    ))
+    return diff
+
+
+def get_diff(db: Session, previous: SearchResult, current: SearchResult) -> Dict:
+    """Kaydedilmiş farkı döndürür; yoksa (ya da başka bir çalıştırmayla karşılaştırılıyorsa) hesaplar"""
+    stored = db.get(RunDiff, current.id)
+    if stored is not None and stored.previous_result_id == previous.id:
+        return {**orjson.loads(stored.payload), "precomputed": True}
+    return {**compute_diff(db, previous, current), "precomputed": False}
@@ -0,0 +1,127 @@
+"""
+Arama çalıştırma defteri (run ledger)
+
+Her kelime araması için bir `run_ledger` satırı tutulur: tetikleyici,
+planlanan / başlangıç / bitiş zamanı, SerpApi gecikmesi, yazılan satır
+sayısı, tekrar deneme sayısı ve hata. Kayıtlar ingest session'ından ayrı
+kısa session'larla yazılır; böylece ingest transaction'ı rollback olsa bile
+başarısız çalıştırma deftere işlenir. Defter yazımı hiçbir zaman aramayı
+bozmaz, hatalar sadece loglanır.
+"""
+import logging
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, case, distinct
+from sqlalchemy.orm import Session
+
+from app.database import get_session_maker, RunLedger
+
+logger = logging.getLogger(__name__)
+
+LEDGER_COLUMNS = (
+    "id", "batch_id", "keyword", "trigger", "status", "queued_at", "started_at", "finished_at",
+    "serpapi_latency_ms", "rows_inserted", "retries", "error", "search_result_id"
+)
+
+
+def new_batch_id() -> str:
+    """Aynı tetiklemedeki kelime aramalarını gruplayan kimlik"""
+    return uuid.uuid4().hex
+
+
+def start_run(
+    site_id: str,
+    keyword: str,
+    trigger: str,
+    batch_id: Optional[str] = None,
+    queued_at: Optional[datetime] = None
+) -> Optional[int]:
+    """Çalıştırmayı 'running' olarak kaydeder ve ledger ID'sini döndürür"""
+    now = datetime.utcnow()
+    db = get_session_maker(site_id)()
+    try:
+        entry = RunLedger(
+            batch_id=batch_id or new_batch_id(),
+            site_id=site_id,
+            keyword=keyword,
+            trigger=trigger,
+            status="running",
+            queued_at=queued_at or now,
+            started_at=now
+        )
+        db.add(entry)
+        db.commit()
+        return entry.id
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"[{site_id}] Run ledger kaydı oluşturulamadı: {e}")
+        return None
+    finally:
+        db.close()
+
+
+def finish_run(site_id: str, run_id: Optional[int], **fields):
+    """Çalıştırmanın sonucunu (status, gecikme, satır sayısı, hata...) kaydeder"""
+    if run_id is None:
+        return
+    db = get_session_maker(site_id)()
+    try:
+        fields.setdefault("finished_at", datetime.utcnow())
+        db.query(RunLedger).filter(RunLedger.id == run_id).update(fields, synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"[{site_id}] Run ledger kaydı güncellenemedi: {e}")
+    finally:
+        db.close()
+
+
+def close_abandoned_runs(site_id: str) -> int:
+    """Process yeniden başladığında yarım kalmış 'running' kayıtlarını hata olarak kapatır"""
+    db = get_session_maker(site_id)()
+    try:
+        count = db.query(RunLedger).filter(RunLedger.status == "running").update(
+            {"status": "error", "error": "abandoned (process restarted)", "finished_at": datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+        return count
+    finally:
+        db.close()
+
+
+def last_run(db: Session) -> Optional[RunLedger]:
+    return db.query(RunLedger).order_by(RunLedger.started_at.desc()).first()
+
+
+def recent_runs(db: Session, limit: int = 50) -> List[tuple]:
+    columns = [getattr(RunLedger, name) for name in LEDGER_COLUMNS]
+    return db.query(*columns).order_by(RunLedger.id.desc()).limit(limit).all()
+
+
+def ledger_stats(db: Session, since: datetime) -> Dict:
+    """Belirli bir tarihten bu yana hata oranı ve scheduler gecikmesi"""
+    lag = (func.julianday(RunLedger.started_at) - func.julianday(RunLedger.queued_at)) * 86400.0
+    scheduled = RunLedger.trigger == "scheduled"
+    total, failures, avg_lag, max_lag = db.query(
+        func.count(RunLedger.id),
+        func.sum(case((RunLedger.status == "error", 1), else_=0)),
+        func.avg(case((scheduled, lag))),
+        func.max(case((scheduled, lag)))
+    ).filter(
+        RunLedger.started_at >= since,
+        RunLedger.status != "running"
+    ).one()
+
+    scheduled_batches = db.query(func.count(distinct(RunLedger.batch_id))).filter(scheduled).scalar()
+
+    return {
+        "recent_runs": total or 0,
+        "recent_failures": failures or 0,
+        "failure_rate": (failures or 0) / total if total else None,
+        "avg_lag_seconds": round(avg_lag, 3) if avg_lag is not None else None,
+        "max_lag_seconds": round(max_lag, 3) if max_lag is not None else None,
+        "total_scheduled_runs": scheduled_batches or 0,
+    }
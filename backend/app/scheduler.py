@@ -1,14 +1,25 @@
 import logging
-import asyncio
+import time
+from apscheduler.events import EVENT_JOB_SUBMITTED
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from datetime import datetime, timedelta
-from app.database import get_session_maker, SearchSettings, SearchResult, SearchLink
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from app.database import get_session_maker, init_db, SearchSettings, SearchResult, SearchLink
 from app.serpapi_client import SerpApiClient
-from app.email_service import email_service
+from app.alerts import alert_dispatcher, enqueue_alerts, position_alerts
+from app.daily_digest import queue_daily_digest
+from app.rank_matrix import rank_matrix_store
+from app.share_of_voice import record_run
+from app.run_diff import store_run_diff
+from app.run_ledger import start_run, finish_run, new_batch_id, close_abandoned_runs
+from app.metrics import (
+    ingest_duration_seconds, ingest_rows_total, scheduler_run_seconds,
+    scheduler_runs_total, scheduler_lag_seconds
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,8 +31,19 @@ serpapi_client = SerpApiClient()
 VALID_SITE_IDS = ['default', 'gala', 'hit', 'office', 'pipo', 'padisah']
 
 
-def perform_search(db: Session, settings: SearchSettings):
-    """Arama yapar ve sonuçları veritabanına kaydeder"""
+def perform_search(
+    db: Session,
+    settings: SearchSettings,
+    site_id: str = "default",
+    trigger: str = "manual",
+    batch_id: Optional[str] = None,
+    queued_at: Optional[datetime] = None
+):
+    """Arama yapar, sonuçları veritabanına kaydeder ve çalıştırmayı run ledger'a işler"""
+    start = time.perf_counter()
+    outcome = "error"
+    run_id = start_run(site_id, settings.search_query, trigger, batch_id, queued_at)
+    ledger = {"status": "error"}
     try:
         logger.info(f"Arama başlatılıyor: {settings.search_query} - {settings.location}")
         
@@ -30,12 +52,15 @@ def perform_search(db: Session, settings: SearchSettings):
         api_key = os.getenv("SERPAPI_KEY", "bb970a4dea7a4ea4952712cd9bd6d6cb73765f27eee2bcb221bc63c7ba7b6068")
         
         # Site'ye özel client oluştur
-        site_client = SerpApiClient(api_key=api_key)
+        site_client = SerpApiClient(api_key=api_key, site_id=site_id)
         
         # SerpApi ile arama yap
         search_data = site_client.search(settings.search_query, settings.location)
+        ledger["serpapi_latency_ms"] = search_data.get("latency_ms")
+        ledger["retries"] = search_data.get("retries", 0)
         
         if not search_data["success"]:
+            ledger["error"] = search_data.get("error")
             logger.error(f"Arama hatası: {search_data.get('error')}")
             return
         
@@ -45,6 +70,7 @@ def perform_search(db: Session, settings: SearchSettings):
         # Veritabanına kaydet
         search_result = SearchResult(
             settings_id=settings.id,
+            search_query=settings.search_query,
             search_date=datetime.utcnow(),
             total_results=search_data.get("total_results", 0)
         )
@@ -63,132 +89,82 @@ def perform_search(db: Session, settings: SearchSettings):
             )
             db.add(link)
         
+        # Domain görünürlük rollup'ını aynı transaction içinde güncelle
+        record_run(db, search_result.search_date, links)
+        
+        # Aynı kelimenin önceki çalıştırmasına göre farkı sakla
+        diff = store_run_diff(db, search_result, links)
+        
+        # Farktan üretilen pozisyon uyarılarını bildirim outbox'ına aynı transaction içinde yaz
+        check_position_changes(db, search_result, diff, site_id)
+        
         db.commit()
+        outcome = "success"
+        ledger.update(status="success", rows_inserted=len(links), search_result_id=search_result.id)
+        ingest_rows_total.inc(len(links), site=site_id)
         logger.info(f"✅ Arama tamamlandı: {len(links)} link kaydedildi")
         logger.info(f"✅ Veritabanına kaydedildi - SearchResult ID: {search_result.id}")
         
-        # Pozisyon değişikliklerini kontrol et ve email gönder
-        check_position_changes(db, links)
+        # Bellekteki rank matrisini yeni çalıştırmayla genişlet (yüklüyse)
+        try:
+            rank_matrix_store.extend(site_id, db)
+        except Exception as e:
+            logger.warning(f"[{site_id}] Rank matrix güncellenemedi: {e}")
+        
+        # Bildirim göndericisini uyandır (email gönderimi arka planda)
+        alert_dispatcher.notify(site_id)
         
     except Exception as e:
         logger.error(f"❌ Arama sırasında hata: {str(e)}", exc_info=True)
         db.rollback()
+        ledger.update(status="error", error=str(e))
         raise  # Hatayı yukarı fırlat ki çağıran fonksiyon görebilsin
+    finally:
+        finish_run(site_id, run_id, **ledger)
+        ingest_duration_seconds.observe(time.perf_counter() - start, site=site_id, outcome=outcome)
 
 
-def check_position_changes(db: Session, new_links: list):
-    """Pozisyon değişikliklerini kontrol et ve email gönder"""
+def check_position_changes(db: Session, search_result: SearchResult, diff: Optional[Dict], site_id: str = "default"):
+    """Çalıştırma farkından pozisyon uyarılarını üretip outbox'a ekler (commit çağıran tarafta)"""
+    if not diff:
+        return
     try:
-        # Son aramadan önceki son aramayı bul
-        last_result = db.query(SearchResult)\
-            .order_by(SearchResult.search_date.desc())\
-            .offset(1)\
-            .first()
-        
-        if not last_result:
-            return
-        
-        # Önceki aramadaki linkleri al
-        old_links = db.query(SearchLink)\
-            .filter(SearchLink.search_result_id == last_result.id)\
-            .all()
-        
-        old_positions = {link.url: link.position for link in old_links}
-        
-        # Yeni linklerle karşılaştır
-        for new_link_data in new_links:
-            url = new_link_data["url"]
-            new_position = new_link_data["position"]
-            
-            if url in old_positions:
-                old_position = old_positions[url]
-                change = new_position - old_position
-                
-                # Önemli değişiklik varsa email gönder (background thread'de)
-                if abs(change) >= 3:  # 3+ pozisyon değişikliği
-                    def send_email_async():
-                        """Background thread'de email gönder"""
-                        try:
-                            asyncio.run(
-                                email_service.send_position_change_alert(
-                                    url=url,
-                                    domain=new_link_data.get("domain", ""),
-                                    old_position=old_position,
-                                    new_position=new_position,
-                                    change=change
-                                )
-                            )
-                        except Exception as e:
-                            logger.error(f"Email gönderme hatası: {str(e)}")
-                    
-                    import threading
-                    threading.Thread(target=send_email_async, daemon=True).start()
-                
-                # Kritik düşüş (5+ pozisyon)
-                if change >= 5:
-                    def send_critical_email_async():
-                        """Background thread'de kritik email gönder"""
-                        try:
-                            asyncio.run(
-                                email_service.send_critical_drop_alert(
-                                    url=url,
-                                    domain=new_link_data.get("domain", ""),
-                                    old_position=old_position,
-                                    new_position=new_position
-                                )
-                            )
-                        except Exception as e:
-                            logger.error(f"Kritik email gönderme hatası: {str(e)}")
-                    
-                    import threading
-                    threading.Thread(target=send_critical_email_async, daemon=True).start()
+        enqueue_alerts(db, search_result.id, position_alerts(site_id, diff))
     except Exception as e:
         logger.error(f"Pozisyon kontrolü hatası: {str(e)}", exc_info=True)
 
 
-async def send_daily_summary_email():
-    """Günlük özet email gönder"""
-    db = SessionLocal()
+def run_daily_summary():
+    """Günlük özet job'u: tüm sitelerin dünkü özeti tek email olarak outbox'a eklenir"""
     try:
-        yesterday = datetime.utcnow() - timedelta(days=1)
-        yesterday_start = yesterday.replace(hour=0, minute=0, second=0, microsecond=0)
-        yesterday_end = yesterday.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # Dünkü aramaları al
-        results = db.query(SearchResult)\
-            .filter(SearchResult.search_date >= yesterday_start)\
-            .filter(SearchResult.search_date <= yesterday_end)\
-            .all()
-        
-        if not results:
-            return
-        
-        # Top linkleri al
-        from app.api.search import get_link_stats_for_period
-        top_links = get_link_stats_for_period(
-            db, yesterday_start, yesterday_end, limit=10
-        )
-        
-        # Email gönder
-        await email_service.send_daily_summary(
-            total_searches=len(results),
-            unique_links=len(set(link.url for result in results for link in result.links)),
-            top_links=[link.dict() if hasattr(link, 'dict') else link for link in top_links],
-            date=yesterday.strftime("%Y-%m-%d")
-        )
+        queue_daily_digest(VALID_SITE_IDS)
     except Exception as e:
-        logger.error(f"Günlük özet email hatası: {str(e)}")
-    finally:
-        db.close()
+        logger.error(f"Günlük özet oluşturulamadı: {str(e)}", exc_info=True)
 
 
-def run_daily_summary():
-    """Günlük özet email gönder (synchronous wrapper)"""
-    asyncio.run(send_daily_summary_email())
+def _planned_run_time(site_id: str) -> Optional[datetime]:
+    """Sitenin search job'unun şu ana kadarki son planlanan çalışma zamanı (UTC, run ledger'daki queued_at)
+
+    Interval trigger'ın başlangıç zamanı ve aralığından hesaplanır; kaçırılıp
+    birleştirilen çalıştırmalarda en son planlanan zaman döner.
+    """
+    job = scheduler.get_job(f"search_job_{site_id}")
+    if job is None or not isinstance(job.trigger, IntervalTrigger):
+        return None
+    trigger = job.trigger
+    now = datetime.now(tz=timezone.utc)
+    if now < trigger.start_date:
+        return None
+    run_time = trigger.start_date + trigger.interval * ((now - trigger.start_date) // trigger.interval)
+    return run_time.astimezone(timezone.utc).replace(tzinfo=None)
 
 
-def run_scheduled_searches(site_id: str = "default"):
+def run_scheduled_searches(site_id: str = "default", trigger: str = "scheduled", queued_at: Optional[datetime] = None):
     """Belirli bir site için zamanlanmış arama yapar (çoklu kelime desteği ile)"""
+    if queued_at is None:
+        planned = _planned_run_time(site_id) if trigger == "scheduled" else None
+        queued_at = planned or datetime.utcnow()
+    batch_id = new_batch_id()
     logger.info("=" * 50)
     logger.info(f"⏰ [{site_id}] Zamanlanmış arama tetiklendi: {datetime.utcnow()}")
     logger.info("=" * 50)
@@ -196,6 +172,8 @@ def run_scheduled_searches(site_id: str = "default"):
     # Site'e özel session oluştur
     SessionLocal = get_session_maker(site_id)
     db = SessionLocal()
+    start = time.perf_counter()
+    outcome = "success"
     try:
         settings = db.query(SearchSettings).filter(SearchSettings.enabled == True).first()
         
@@ -216,17 +194,34 @@ def run_scheduled_searches(site_id: str = "default"):
                     enabled=settings.enabled,
                     interval_hours=settings.interval_hours
                 )
-                perform_search(db, temp_settings)
+                perform_search(db, temp_settings, site_id, trigger, batch_id, queued_at)
                 logger.info(f"✅ [{site_id}] '{query}' araması tamamlandı")
         else:
+            outcome = "skipped"
             logger.warning(f"⚠️ [{site_id}] Aktif arama ayarı bulunamadı")
     except Exception as e:
+        outcome = "error"
         logger.error(f"❌ [{site_id}] Zamanlanmış arama hatası: {str(e)}", exc_info=True)
     finally:
         db.close()
+        scheduler_run_seconds.observe(time.perf_counter() - start, site=site_id)
+        scheduler_runs_total.inc(site=site_id, outcome=outcome)
         logger.info("=" * 50)
 
 
+def _record_scheduler_lag(event):
+    """Job'un planlanan zamanı ile executor'a gönderildiği an arasındaki farkı kaydeder"""
+    if not event.job_id.startswith("search_job_"):
+        return
+    site_id = event.job_id[len("search_job_"):]
+    now = datetime.now(tz=timezone.utc)
+    for run_time in event.scheduled_run_times:
+        scheduler_lag_seconds.observe(max((now - run_time).total_seconds(), 0.0), site=site_id)
+
+
+scheduler.add_listener(_record_scheduler_lag, EVENT_JOB_SUBMITTED)
+
+
 def start_scheduler():
     """Scheduler'ı başlatır - tüm site'lar için ayrı job'lar oluşturur"""
     if scheduler.running:
@@ -240,6 +235,14 @@ def start_scheduler():
     # Her site için ayrı job oluştur
     for site_id in VALID_SITE_IDS:
         try:
+            # Site tablolarını oluştur (yeni eklenen tablolar dahil)
+            init_db(site_id)
+            
+            # Önceki process'ten yarım kalan çalıştırmaları kapat
+            abandoned = close_abandoned_runs(site_id)
+            if abandoned:
+                logger.warning(f"⚠️ [{site_id}] {abandoned} yarım kalmış çalıştırma hata olarak kapatıldı")
+            
             # Site'e özel session oluştur
             SessionLocal = get_session_maker(site_id)
             db = SessionLocal()
@@ -272,7 +275,8 @@ def start_scheduler():
                     # Interval'e göre arama job'u ekle (site'e özel)
                     job_id = f"search_job_{site_id}"
                     scheduler.add_job(
-                        lambda sid=site_id: run_scheduled_searches(sid),
+                        run_scheduled_searches,
+                        args=[site_id],
                         trigger=IntervalTrigger(hours=interval_hours),
                         id=job_id,
                         replace_existing=True
@@ -282,14 +286,15 @@ def start_scheduler():
                     if should_run_immediately:
                         logger.info(f"🚀 [{site_id}] Hemen arama yapılıyor...")
                         import threading
-                        threading.Thread(target=run_scheduled_searches, args=(site_id,), daemon=True).start()
+                        threading.Thread(target=run_scheduled_searches, args=(site_id, "catchup"), daemon=True).start()
                     
                     logger.info(f"✅ [{site_id}] Scheduler job eklendi - {interval_hours} saatte bir arama yapılacak")
                 else:
                     # Varsayılan: 12 saatte bir
                     job_id = f"search_job_{site_id}"
                     scheduler.add_job(
-                        lambda sid=site_id: run_scheduled_searches(sid),
+                        run_scheduled_searches,
+                        args=[site_id],
                         trigger=IntervalTrigger(hours=12),
                         id=job_id,
                         replace_existing=True
@@ -300,7 +305,8 @@ def start_scheduler():
                 # Hata durumunda varsayılan değer
                 job_id = f"search_job_{site_id}"
                 scheduler.add_job(
-                    lambda sid=site_id: run_scheduled_searches(sid),
+                    run_scheduled_searches,
+                    args=[site_id],
                     trigger=IntervalTrigger(hours=12),
                     id=job_id,
                     replace_existing=True
@@ -310,6 +316,9 @@ def start_scheduler():
         except Exception as e:
             logger.error(f"❌ [{site_id}] Site için session oluşturulurken hata: {e}", exc_info=True)
     
+    # Önceki process'ten kalan bildirimleri de gönderecek outbox göndericisi
+    alert_dispatcher.start(VALID_SITE_IDS)
+    
     # Her gün saat 09:00'da günlük özet email gönder
     scheduler.add_job(
         run_daily_summary,
@@ -371,7 +380,8 @@ def update_scheduler_interval(interval_hours: int, site_id: str = "default"):
     
     # Yeni interval ile job ekle (site'e özel)
     scheduler.add_job(
-        lambda sid=site_id: run_scheduled_searches(sid),
+        run_scheduled_searches,
+        args=[site_id],
         trigger=IntervalTrigger(hours=interval_hours),
         id=job_id,
         replace_existing=True
@@ -381,7 +391,7 @@ def update_scheduler_interval(interval_hours: int, site_id: str = "default"):
     if should_run_immediately:
         logger.info(f"🚀 [{site_id}] Hemen arama yapılıyor...")
         import threading
-        threading.Thread(target=run_scheduled_searches, args=(site_id,), daemon=True).start()
+        threading.Thread(target=run_scheduled_searches, args=(site_id, "catchup"), daemon=True).start()
     
     # Eğer scheduler çalışmıyorsa başlat
     if not scheduler.running:
@@ -1,15 +1,33 @@
 import os
+import time
 import requests
 from typing import List, Dict, Optional
 from datetime import datetime
 
+from app.metrics import serpapi_request_seconds
+
 SERPAPI_KEY = os.getenv("SERPAPI_KEY", "bb970a4dea7a4ea4952712cd9bd6d6cb73765f27eee2bcb221bc63c7ba7b6068")
-SERPAPI_URL = "https://serpapi.com/search"
+SERPAPI_URL = os.getenv("SERPAPI_URL", "https://serpapi.com/search")
+
+# 429 ve geçici sunucu hatalarında tekrar deneme
+SERPAPI_MAX_RETRIES = int(os.getenv("SERPAPI_MAX_RETRIES", "2"))
+SERPAPI_RETRY_BACKOFF = float(os.getenv("SERPAPI_RETRY_BACKOFF", "1.0"))
+SERPAPI_RETRY_MAX_DELAY = 30.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
 
 
 class SerpApiClient:
-    def __init__(self, api_key: str = SERPAPI_KEY):
+    def __init__(
+        self,
+        api_key: str = SERPAPI_KEY,
+        site_id: str = "default",
+        max_retries: int = SERPAPI_MAX_RETRIES,
+        retry_backoff: float = SERPAPI_RETRY_BACKOFF
+    ):
         self.api_key = api_key
+        self.site_id = site_id
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
     
     def search(self, query: str, location: str = "Fatih,Istanbul") -> Dict:
         """
@@ -38,25 +56,58 @@ class SerpApiClient:
             else:
                 params["location"] = location
         
-        try:
-            response = requests.get(SERPAPI_URL, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
-            return {
-                "success": True,
-                "data": data,
-                "organic_results": data.get("organic_results", []),
-                "total_results": data.get("search_information", {}).get("total_results", 0),
-                "search_time": data.get("search_information", {}).get("time_taken_displayed", 0)
-            }
-        except requests.exceptions.RequestException as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "organic_results": [],
-                "total_results": 0
-            }
+        retries = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = requests.get(SERPAPI_URL, params=params, timeout=30)
+                if response.status_code in RETRY_STATUS_CODES and retries < self.max_retries:
+                    serpapi_request_seconds.observe(time.perf_counter() - start, site=self.site_id, outcome="retry")
+                    retries += 1
+                    time.sleep(self._retry_delay(retries, response.headers.get("Retry-After")))
+                    continue
+                response.raise_for_status()
+                data = response.json()
+                latency = time.perf_counter() - start
+                serpapi_request_seconds.observe(latency, site=self.site_id, outcome="success")
+                
+                return {
+                    "success": True,
+                    "data": data,
+                    "organic_results": data.get("organic_results", []),
+                    "total_results": data.get("search_information", {}).get("total_results", 0),
+                    "search_time": data.get("search_information", {}).get("time_taken_displayed", 0),
+                    "latency_ms": latency * 1000,
+                    "retries": retries
+                }
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                # Geçici ağ hataları tekrar denenir
+                if retries < self.max_retries:
+                    serpapi_request_seconds.observe(time.perf_counter() - start, site=self.site_id, outcome="retry")
+                    retries += 1
+                    time.sleep(self._retry_delay(retries))
+                    continue
+                return self._error_result(e, start, retries)
+            except requests.exceptions.RequestException as e:
+                return self._error_result(e, start, retries)
+    
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Üstel bekleme süresi; sayısal Retry-After başlığı varsa o kullanılır"""
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), SERPAPI_RETRY_MAX_DELAY)
+        return min(self.retry_backoff * (2 ** (attempt - 1)), SERPAPI_RETRY_MAX_DELAY)
+    
+    def _error_result(self, error: Exception, start: float, retries: int) -> Dict:
+        latency = time.perf_counter() - start
+        serpapi_request_seconds.observe(latency, site=self.site_id, outcome="error")
+        return {
+            "success": False,
+            "error": str(error),
+            "organic_results": [],
+            "total_results": 0,
+            "latency_ms": latency * 1000,
+            "retries": retries
+        }
     
     def extract_links(self, search_data: Dict) -> List[Dict]:
         """
@@ -0,0 +1,231 @@
+"""
+Share-of-voice (görünürlük payı) hesaplama
+
+Her link görünmesi pozisyona göre bir CTR eğrisiyle ağırlıklandırılır ve
+domain × gün bazında `domain_daily_rollup` tablosunda toplanır. Rollup
+ingest sırasında aynı transaction içinde artımlı güncellenir; böylece
+pazar payı sorguları ham link tablosuna dokunmadan rollup'tan okunur.
+
+CTR eğrisi `SOV_CTR_CURVE` ile (1. pozisyondan başlayarak virgülle ayrılmış
+oranlar) değiştirilebilir; eğrinin dışında kalan pozisyonların ağırlığı 0'dır.
+Eğri değiştirildiğinde geçmiş veriler için `python -m app.share_of_voice`
+ile rollup yeniden oluşturulmalıdır. Rollup tablosu boşken mevcut link
+verisi varsa (yükseltilen kurulum) `init_db` ilk ingest'ten önce bir kere
+doldurur; okuma fonksiyonları veritabanına yazmaz.
+"""
+import os
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, case, distinct, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.database import DomainDailyRollup, SearchResult, SearchLink
+
+logger = logging.getLogger(__name__)
+
+# Organik sonuçlar için yaygın kullanılan pozisyon bazlı CTR eğrisi
+DEFAULT_CTR_CURVE = [0.28, 0.15, 0.11, 0.08, 0.06, 0.05, 0.04, 0.03, 0.025, 0.02]
+
+
+def _load_ctr_curve() -> List[float]:
+    raw = os.getenv("SOV_CTR_CURVE", "")
+    if not raw:
+        return DEFAULT_CTR_CURVE
+    try:
+        curve = [float(v) for v in raw.split(",") if v.strip()]
+        return curve or DEFAULT_CTR_CURVE
+    except ValueError:
+        logger.warning(f"Geçersiz SOV_CTR_CURVE değeri, varsayılan eğri kullanılıyor: {raw}")
+        return DEFAULT_CTR_CURVE
+
+
+CTR_CURVE = _load_ctr_curve()
+
+
+def ctr_weight(position: Optional[int]) -> float:
+    """Pozisyonun CTR ağırlığını döndürür"""
+    if not position or position < 1 or position > len(CTR_CURVE):
+        return 0.0
+    return CTR_CURVE[position - 1]
+
+
+def record_run(db: Session, search_date: datetime, links: List[Dict]):
+    """Bir aramanın linklerini domain rollup'ına ekler (commit çağıran tarafta yapılır)"""
+    day = search_date.strftime("%Y-%m-%d")
+    per_domain: Dict[str, dict] = defaultdict(lambda: {
+        "links": 0, "position_sum": 0, "best": None, "worst": None, "weight": 0.0
+    })
+    for link in links:
+        domain = link.get("domain") or ""
+        position = link.get("position")
+        if not domain or not position:
+            continue
+        agg = per_domain[domain]
+        agg["links"] += 1
+        agg["position_sum"] += position
+        agg["best"] = position if agg["best"] is None else min(agg["best"], position)
+        agg["worst"] = position if agg["worst"] is None else max(agg["worst"], position)
+        agg["weight"] += ctr_weight(position)
+
+    if not per_domain:
+        return
+
+    stmt = sqlite_insert(DomainDailyRollup).values([
+        {
+            "day": day,
+            "domain": domain,
+            "appearances": 1,
+            "links": agg["links"],
+            "position_sum": agg["position_sum"],
+            "best_position": agg["best"],
+            "worst_position": agg["worst"],
+            "sov_weight": agg["weight"]
+        }
+        for domain, agg in per_domain.items()
+    ])
+    excluded = stmt.excluded
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["day", "domain"],
+        set_={
+            "appearances": DomainDailyRollup.appearances + excluded.appearances,
+            "links": DomainDailyRollup.links + excluded.links,
+            "position_sum": DomainDailyRollup.position_sum + excluded.position_sum,
+            "best_position": func.min(DomainDailyRollup.best_position, excluded.best_position),
+            "worst_position": func.max(DomainDailyRollup.worst_position, excluded.worst_position),
+            "sov_weight": DomainDailyRollup.sov_weight + excluded.sov_weight
+        }
+    ))
+
+
+def rebuild_domain_rollup(db: Session):
+    """Rollup'ı ham link tablosundan tek bir INSERT ... SELECT ile yeniden oluşturur"""
+    weight = case(
+        *[(SearchLink.position == pos, ctr) for pos, ctr in enumerate(CTR_CURVE, start=1)],
+        else_=0.0
+    )
+    day = func.date(SearchResult.search_date)
+    source = select(
+        day,
+        SearchLink.domain,
+        func.count(distinct(SearchResult.id)),
+        func.count(SearchLink.id),
+        func.sum(SearchLink.position),
+        func.min(SearchLink.position),
+        func.max(SearchLink.position),
+        func.sum(weight)
+    ).join(
+        SearchResult, SearchLink.search_result_id == SearchResult.id
+    ).where(
+        SearchLink.domain.isnot(None),
+        SearchLink.domain != "",
+        SearchLink.position.isnot(None)
+    ).group_by(day, SearchLink.domain)
+
+    db.query(DomainDailyRollup).delete()
+    db.execute(insert(DomainDailyRollup).from_select([
+        "day", "domain", "appearances", "links", "position_sum",
+        "best_position", "worst_position", "sov_weight"
+    ], source))
+    db.commit()
+
+
+def market_share(db: Session, since_day: str, limit: int = 20) -> List[dict]:
+    """Pencere için domain bazında görünürlük payı (%) ve pozisyon özetleri"""
+    total_weight = db.query(func.sum(DomainDailyRollup.sov_weight))\
+        .filter(DomainDailyRollup.day >= since_day)\
+        .scalar() or 0.0
+
+    rows = db.query(
+        DomainDailyRollup.domain,
+        func.sum(DomainDailyRollup.appearances).label("appearances"),
+        func.sum(DomainDailyRollup.links).label("links"),
+        func.sum(DomainDailyRollup.position_sum).label("position_sum"),
+        func.min(DomainDailyRollup.best_position).label("best_position"),
+        func.max(DomainDailyRollup.worst_position).label("worst_position"),
+        func.sum(DomainDailyRollup.sov_weight).label("sov_weight")
+    ).filter(
+        DomainDailyRollup.day >= since_day
+    ).group_by(
+        DomainDailyRollup.domain
+    ).order_by(
+        func.sum(DomainDailyRollup.appearances).desc()
+    ).limit(limit).all()
+
+    return [
+        {
+            "domain": row.domain,
+            "appearances": row.appearances,
+            "avg_position": float(row.position_sum) / row.links if row.links else 0.0,
+            "best_position": row.best_position,
+            "worst_position": row.worst_position,
+            "sov_weight": round(float(row.sov_weight or 0.0), 4),
+            "market_share": round(float(row.sov_weight or 0.0) / total_weight * 100, 2) if total_weight else 0.0
+        }
+        for row in rows
+    ]
+
+
+def share_timeseries(db: Session, since_day: str, top: int = 5, domains: Optional[List[str]] = None) -> dict:
+    """Günlük görünürlük payı zaman serisi (varsayılan: penceredeki en yüksek paylı domainler)"""
+    if not domains:
+        domains = [
+            row.domain for row in db.query(DomainDailyRollup.domain)
+            .filter(DomainDailyRollup.day >= since_day)
+            .group_by(DomainDailyRollup.domain)
+            .order_by(func.sum(DomainDailyRollup.sov_weight).desc())
+            .limit(top)
+            .all()
+        ]
+
+    daily_totals = db.query(
+        DomainDailyRollup.day,
+        func.sum(DomainDailyRollup.sov_weight)
+    ).filter(
+        DomainDailyRollup.day >= since_day
+    ).group_by(
+        DomainDailyRollup.day
+    ).order_by(
+        DomainDailyRollup.day.asc()
+    ).all()
+    dates = [day for day, _ in daily_totals]
+    day_index = {day: i for i, day in enumerate(dates)}
+
+    series = {domain: [0.0] * len(dates) for domain in domains}
+    if domains:
+        rows = db.query(
+            DomainDailyRollup.day,
+            DomainDailyRollup.domain,
+            DomainDailyRollup.sov_weight
+        ).filter(
+            DomainDailyRollup.day >= since_day,
+            DomainDailyRollup.domain.in_(domains)
+        ).all()
+        for day, domain, weight in rows:
+            total = daily_totals[day_index[day]][1]
+            if total:
+                series[domain][day_index[day]] = round(float(weight) / total * 100, 2)
+
+    return {
+        "dates": dates,
+        "series": [{"domain": domain, "market_share": shares} for domain, shares in series.items()]
+    }
+
+
+if __name__ == "__main__":
+    # Tüm siteler için rollup'ı yeniden oluştur (CTR eğrisi değiştiğinde)
+    from app.database import init_db, get_session_maker
+    from app.scheduler import VALID_SITE_IDS
+
+    logging.basicConfig(level=logging.INFO)
+    for site_id in VALID_SITE_IDS:
+        init_db(site_id)
+        db = get_session_maker(site_id)()
+        try:
+            rebuild_domain_rollup(db)
+            logger.info(f"[{site_id}] Domain rollup yeniden oluşturuldu")
+        finally:
+            db.close()
@@ -0,0 +1,110 @@
+"""
+Frontend statik dosyalarının sunumu
+
+Vite build çıktısındaki `assets/` dosyaları içerik hash'li isimlerle
+üretildiği için `immutable` cache başlığıyla sunulur. Build sırasında her
+dosyanın `.br` / `.gz` kopyası oluşturulur (`python -m app.static_assets
+<dist dizini>`); istek sırasında sıkıştırma yapılmaz, istemcinin kabul
+ettiği önceden sıkıştırılmış dosya doğrudan gönderilir. Hangi dosyanın
+hangi kopyalarının olduğu başlangıçta bir kere taranır, istek başına dosya
+sistemi kontrolü yapılmaz.
+"""
+import gzip
+import mimetypes
+import os
+import sys
+from typing import Dict, Set
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from app.compression import brotli, accepted_encodings
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+PRECOMPRESS_EXTENSIONS = (".js", ".css", ".html", ".svg", ".json", ".txt", ".map")
+PRECOMPRESS_MIN_BYTES = 1024
+
+_ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """Önceden sıkıştırılmış kopyaları tercih eden, immutable cache'li StaticFiles"""
+
+    def __init__(self, *, directory: str, cache_control: str = IMMUTABLE_CACHE_CONTROL, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.cache_control = cache_control
+        self.variants = self._scan(directory)
+
+    @staticmethod
+    def _scan(directory: str) -> Dict[str, Set[str]]:
+        """Dosya yolu -> mevcut sıkıştırılmış kopyalar (br, gzip) indeksi"""
+        files = set()
+        for root, _, names in os.walk(directory):
+            for name in names:
+                files.add(os.path.relpath(os.path.join(root, name), directory).replace(os.sep, "/"))
+
+        variants: Dict[str, Set[str]] = {}
+        for path in files:
+            if path.endswith((".br", ".gz")):
+                continue
+            variants[path] = {
+                encoding for encoding, suffix in _ENCODING_SUFFIXES.items()
+                if path + suffix in files
+            }
+        return variants
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        path = path.replace(os.sep, "/")
+        available = self.variants.get(path)
+        if available is None:
+            # İndekste olmayan dosyalar için standart davranış (404 vb.)
+            return await super().get_response(path, scope)
+
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        headers = {"Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        full_path = os.path.join(self.directory, path)
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+        for encoding in ("br", "gzip"):
+            if encoding in available and encoding in accepted:
+                return FileResponse(
+                    full_path + _ENCODING_SUFFIXES[encoding],
+                    media_type=media_type,
+                    headers={**headers, "Content-Encoding": encoding}
+                )
+
+        return FileResponse(full_path, media_type=media_type, headers=headers)
+
+
+def precompress(directory: str) -> int:
+    """Dizindeki sıkıştırılabilir dosyaların .gz (ve brotli varsa .br) kopyalarını oluşturur"""
+    count = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if not name.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < PRECOMPRESS_MIN_BYTES:
+                continue
+
+            with open(path + ".gz", "wb") as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(path + ".br", "wb") as f:
+                    f.write(brotli.compress(data, quality=11))
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "frontend/dist"
+    if not os.path.isdir(target):
+        print(f"Dizin bulunamadı, atlanıyor: {target}")
+        sys.exit(0)
+    total = precompress(target)
+    print(f"{total} dosya sıkıştırıldı ({'brotli + gzip' if brotli is not None else 'gzip'}): {target}")
@@ -0,0 +1 @@
+# Performans ölçüm script'leri (backend dizininden `python -m benchmarks.<modül>` ile çalıştırılır)
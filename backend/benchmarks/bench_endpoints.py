@@ -0,0 +1,188 @@
+"""
+Okuma endpoint'leri benchmark'ı
+
+`generate_data` ile doldurulmuş bir DATA_DIR üzerinde search ve analytics
+okuma endpoint'lerini TestClient ile (scheduler başlatılmadan) çağırır. Her
+endpoint için gecikme dağılımı, response boyutu, SQL ifadesi sayısı ve
+toplam veritabanı süresi (app.db_profiling başlıkları) ölçülür. Sonuçlar
+JSON olarak yazılır; `--compare` ile önceki bir sonuç dosyasıyla
+karşılaştırılır.
+
+Kullanım (backend dizininden):
+    python -m benchmarks.generate_data --data-dir /tmp/bench-1m --scale 1m
+    python -m benchmarks.bench_endpoints --data-dir /tmp/bench-1m --output results/1m.json
+    python -m benchmarks.bench_endpoints --data-dir /tmp/bench-1m --compare results/1m.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+# (isim, path, query parametreleri)
+ENDPOINTS: List[Tuple[str, str, Dict]] = [
+    ("search.results", "/api/search/results", {"limit": 50}),
+    ("search.links_stats", "/api/search/links/stats", {"days": 30, "limit": 50}),
+    ("search.stats", "/api/search/stats", {}),
+    ("search.reports_daily", "/api/search/reports/daily", {"days": 30}),
+    ("search.reports_weekly", "/api/search/reports/weekly", {"weeks": 12}),
+    ("search.reports_monthly", "/api/search/reports/monthly", {"months": 12}),
+    ("analytics.position_trend", "/api/analytics/position-trend", {"days": 30}),
+    ("analytics.position_trend_columnar", "/api/analytics/position-trend", {"days": 30, "format": "columnar"}),
+    ("analytics.domain_distribution", "/api/analytics/domain-distribution", {"days": 30}),
+    ("analytics.top_movers", "/api/analytics/top-movers", {"days": 7}),
+    ("analytics.volatility", "/api/analytics/volatility", {"days": 30}),
+    ("analytics.competitor_analysis", "/api/analytics/competitor-analysis", {"days": 30}),
+    ("analytics.share_of_voice", "/api/analytics/share-of-voice", {"days": 30}),
+    ("analytics.filter_links", "/api/analytics/filter-links", {"days": 30, "limit": 1000}),
+]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def count_links(site_id: str) -> int:
+    from sqlalchemy import func
+    from app.database import get_session_maker, SearchLink
+    db = get_session_maker(site_id)()
+    try:
+        return db.query(func.count(SearchLink.id)).scalar() or 0
+    finally:
+        db.close()
+
+
+def run_benchmarks(site_id: str, repeat: int, warmup: int, only: Optional[List[str]] = None) -> Dict:
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    # Lifespan (scheduler) başlatılmaz - sadece istek yolu ölçülür; hata veren
+    # endpoint'ler benchmark'ı durdurmaz, status olarak kaydedilir
+    client = TestClient(app, raise_server_exceptions=False)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    results = {}
+    for name, path, params in ENDPOINTS:
+        if only and name not in only:
+            continue
+        query = {**params, "site_id": site_id}
+        for _ in range(warmup):
+            client.get(path, params=query)
+
+        latencies, statuses = [], set()
+        size = queries = 0
+        db_ms: List[float] = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(path, params=query)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses.add(response.status_code)
+            size = len(response.content)
+            queries = int(response.headers.get("x-db-query-count", 0))
+            db_ms.append(float(response.headers.get("x-db-time-ms", 0)))
+
+        results[name] = {
+            "path": path,
+            "params": params,
+            "status": sorted(statuses),
+            "p50_ms": round(_percentile(latencies, 50), 3),
+            "p95_ms": round(_percentile(latencies, 95), 3),
+            "max_ms": round(max(latencies), 3),
+            "mean_ms": round(sum(latencies) / len(latencies), 3),
+            "db_queries": queries,
+            "db_ms_p50": round(_percentile(db_ms, 50), 3),
+            "response_bytes": size,
+        }
+        print(
+            f"{name:38s} p50={results[name]['p50_ms']:9.2f}ms p95={results[name]['p95_ms']:9.2f}ms "
+            f"queries={queries:5d} db={results[name]['db_ms_p50']:8.2f}ms bytes={size:,} status={sorted(statuses)}"
+        )
+    return results
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> int:
+    """Baseline'a göre p50 değişimini yazdırır; eşiği aşan gerileme sayısını döndürür"""
+    regressions = 0
+    print(f"\nKarşılaştırma: {baseline['meta'].get('commit')} ({baseline['meta'].get('links'):,} link) -> "
+          f"{current['meta'].get('commit')} ({current['meta'].get('links'):,} link)")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:38s} (baseline'da yok)")
+            continue
+        ratio = result["p50_ms"] / before["p50_ms"] if before["p50_ms"] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = "  <-- GERİLEME"
+            regressions += 1
+        print(
+            f"{name:38s} p50 {before['p50_ms']:9.2f} -> {result['p50_ms']:9.2f}ms ({ratio:5.2f}x)  "
+            f"queries {before['db_queries']} -> {result['db_queries']}{flag}"
+        )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Okuma endpoint'leri benchmark'ı")
+    parser.add_argument("--data-dir", required=True, help="generate_data ile doldurulmuş DATA_DIR")
+    parser.add_argument("--site", default="default")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--only", nargs="*", help="Sadece bu endpoint isimleri")
+    parser.add_argument("--output", help="Sonuçların yazılacağı JSON dosyası")
+    parser.add_argument("--compare", help="Karşılaştırılacak önceki sonuç dosyası")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Gerileme sayılacak p50 oranı")
+    args = parser.parse_args(argv)
+
+    # app modülleri import edilmeden önce ayarlanmalı
+    os.environ["DATA_DIR"] = os.path.abspath(args.data_dir)
+    os.environ["DB_PROFILE_HEADERS"] = "true"
+    os.environ.setdefault("LOG_SAMPLE_SUCCESS", "0")
+    os.environ.setdefault("DB_SLOW_QUERY_MS", "100000")
+
+    links = count_links(args.site)
+    print(f"Site: {args.site}, {links:,} link, repeat={args.repeat}\n")
+    current = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "site": args.site,
+            "links": links,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": run_benchmarks(args.site, args.repeat, args.warmup, args.only),
+    }
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, ensure_ascii=False)
+        print(f"\nSonuçlar yazıldı: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
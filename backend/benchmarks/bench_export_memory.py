@@ -0,0 +1,263 @@
+"""
+Export endpoint'leri bellek profili
+
+Her export endpoint'ini artan boyutlu üretilmiş veri setleri üzerinde ayrı
+bir alt process'te çalıştırır (ölçümler birbirini etkilemesin diye) ve
+şunları kaydeder:
+- Tepe RSS ve çağrı öncesine göre artış (Linux: /proc/self/status VmHWM)
+- İsteğe bağlı ikinci geçişte tracemalloc ile en çok bellek ayıran satırlar
+
+Yanıt gövdesi parça parça okunup atılır (sadece boyutu sayılır), böylece
+ölçülen bellek endpoint'in kendisine aittir. 200 dışı yanıtlar da bütçe
+aşımı gibi çıkış kodu 1 ile raporlanır.
+
+Her endpoint için en küçük ve en büyük veri seti arasındaki RSS artış
+eğimi (10k link başına MB) hesaplanır; eğim `--budget-mb-per-10k` değerini
+ya da tepe artış `--max-peak-mb` değerini aşarsa çıkış kodu 1 olur.
+
+Kullanım (backend dizininden):
+    python -m benchmarks.bench_export_memory --sizes 5000,20000,80000 --output results/export-memory.json
+    python -m benchmarks.bench_export_memory --only excel_daily pdf_daily --tracemalloc-top 10
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# isim -> (path, ek parametreler)
+EXPORTS: Dict[str, tuple] = {
+    "excel_daily": ("/api/export/excel/daily", {}),
+    "excel_position_history": ("/api/export/excel/position-history", {}),
+    "excel_summary": ("/api/export/excel/summary", {}),
+    "pdf_daily": ("/api/export/pdf/daily", {}),
+    "pdf_daily_summary": ("/api/export/pdf/daily", {"layout": "summary"}),
+    "pdf_summary": ("/api/export/pdf/summary", {}),
+    "csv_daily": ("/api/export/csv/daily", {}),
+    "csv_daily_gzip": ("/api/export/csv/daily", {"gzip": "true"}),
+    "csv_position_history": ("/api/export/csv/position-history", {}),
+    "csv_summary": ("/api/export/csv/summary", {}),
+    "ndjson_daily": ("/api/export/ndjson/daily", {}),
+    "ndjson_position_history": ("/api/export/ndjson/position-history", {}),
+    "ndjson_summary": ("/api/export/ndjson/summary", {}),
+    "archive_zip": ("/api/export/archive", {"sites": "default", "kinds": "daily,position-history,summary", "formats": "csv,xlsx"}),
+    "parquet_history": ("/api/export/parquet/history", {}),
+    "arrow_history": ("/api/export/arrow/history", {}),
+}
+
+KEYWORDS = 10
+POSITIONS = 10
+INTERVAL_HOURS = 12
+
+
+def _read_status_kb(field: str) -> Optional[int]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _reset_peak_rss():
+    # Linux 4.0+: VmHWM'i mevcut RSS'e sıfırlar
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def run_worker(args) -> Dict:
+    """Alt process: tek bir export'u çalıştırıp ölçüm sonucunu döndürür"""
+    os.environ["DATA_DIR"] = args.data_dir
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("LOG_SAMPLE_SUCCESS", "0")
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app, raise_server_exceptions=False)
+    path, extra = EXPORTS[args.export]
+    params = {**extra, "days": args.days, "site_id": "default"}
+
+    if args.tracemalloc_top:
+        import tracemalloc
+        tracemalloc.start(25)
+
+    rss_before = _read_status_kb("VmRSS")
+    _reset_peak_rss()
+    started = time.perf_counter()
+    body_bytes = 0
+    with client.stream("GET", path, params=params) as response:
+        for chunk in response.iter_raw():
+            body_bytes += len(chunk)
+    elapsed = time.perf_counter() - started
+    rss_peak = _read_status_kb("VmHWM")
+
+    result = {
+        "status": response.status_code,
+        "elapsed_s": round(elapsed, 3),
+        "body_bytes": body_bytes,
+    }
+    if rss_before is not None and rss_peak is not None:
+        result["rss_before_mb"] = round(rss_before / 1024, 1)
+        result["rss_peak_mb"] = round(rss_peak / 1024, 1)
+        result["rss_growth_mb"] = round(max(rss_peak - rss_before, 0) / 1024, 1)
+    else:
+        import resource
+        result["rss_peak_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    if args.tracemalloc_top:
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["tracemalloc_peak_mb"] = round(traced_peak / 1024 / 1024, 1)
+        result["top_allocators"] = [
+            {
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_kb": round(stat.size / 1024, 1),
+                "count": stat.count,
+            }
+            for stat in snapshot.statistics("lineno")[: args.tracemalloc_top]
+        ]
+    return result
+
+
+def ensure_dataset(root: str, links: int) -> tuple:
+    """Boyuta göre veri setini üretir (varsa tekrar kullanır); (dizin, gün) döndürür"""
+    runs = max(1, math.ceil(links / (KEYWORDS * POSITIONS)))
+    days = math.ceil(runs * INTERVAL_HOURS / 24) + 1
+    data_dir = os.path.join(root, f"links-{links}")
+    if not os.path.exists(os.path.join(data_dir, "default", "searchbot.db")):
+        # generate_data DATA_DIR'i import sırasında sabitlediği için ayrı process'te çalışır
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.generate_data", "--data-dir", data_dir,
+             "--keywords", str(KEYWORDS), "--runs", str(runs), "--positions", str(POSITIONS),
+             "--interval-hours", str(INTERVAL_HOURS)],
+            check=True
+        )
+    return data_dir, days
+
+
+def measure(export: str, data_dir: str, days: int, tracemalloc_top: int, timeout: float) -> Dict:
+    command = [
+        sys.executable, "-m", "benchmarks.bench_export_memory", "--worker",
+        "--export", export, "--data-dir", data_dir, "--days", str(days),
+        "--tracemalloc-top", str(tracemalloc_top)
+    ]
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"error": f"timeout ({timeout:.0f}s)"}
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    return {"error": (completed.stderr or completed.stdout)[-2000:]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export endpoint'leri bellek profili")
+    parser.add_argument("--sizes", default="5000,20000,80000", help="Virgülle ayrılmış link sayıları")
+    parser.add_argument("--only", nargs="*", choices=sorted(EXPORTS), help="Sadece bu export'lar")
+    parser.add_argument("--data-root", default=os.path.join(tempfile.gettempdir(), "bench-export-memory"))
+    parser.add_argument("--tracemalloc-top", type=int, default=0, help="tracemalloc geçişinde gösterilecek satır sayısı (0: kapalı)")
+    parser.add_argument("--budget-mb-per-10k", type=float, default=20.0, help="İzin verilen RSS artış eğimi (MB / 10k link)")
+    parser.add_argument("--max-peak-mb", type=float, default=512.0, help="İzin verilen en yüksek RSS artışı (MB)")
+    parser.add_argument("--timeout", type=float, default=900.0, help="Tek ölçüm için zaman aşımı (saniye)")
+    parser.add_argument("--output", help="Sonuçların yazılacağı JSON dosyası")
+    # Alt process argümanları
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--export", help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--days", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print("RESULT " + json.dumps(run_worker(args)))
+        return 0
+
+    sizes = sorted(int(size) for size in args.sizes.split(",") if size.strip())
+    exports = args.only or list(EXPORTS)
+    datasets = {size: ensure_dataset(args.data_root, size) for size in sizes}
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "sizes": sizes,
+            "budget_mb_per_10k": args.budget_mb_per_10k,
+            "max_peak_mb": args.max_peak_mb,
+        },
+        "exports": {},
+    }
+    failures: List[str] = []
+
+    for export in exports:
+        runs = []
+        for size in sizes:
+            data_dir, days = datasets[size]
+            result = measure(export, data_dir, days, 0, args.timeout)
+            if args.tracemalloc_top and "error" not in result:
+                traced = measure(export, data_dir, days, args.tracemalloc_top, args.timeout)
+                result["tracemalloc_peak_mb"] = traced.get("tracemalloc_peak_mb")
+                result["top_allocators"] = traced.get("top_allocators")
+            result["links"] = size
+            runs.append(result)
+            print(
+                f"{export:24s} {size:>9,} link  "
+                + (f"HATA: {result['error'][:200]}" if "error" in result else
+                   f"status={result['status']} süre={result['elapsed_s']:.2f}s "
+                   f"rss artışı={result.get('rss_growth_mb', '?')}MB tepe={result['rss_peak_mb']}MB "
+                   f"boyut={result['body_bytes']:,}B"),
+                flush=True
+            )
+
+        entry = {"runs": runs}
+        ok_runs = [run for run in runs if "error" not in run and "rss_growth_mb" in run]
+        if len(ok_runs) >= 2:
+            first, last = ok_runs[0], ok_runs[-1]
+            slope = (last["rss_growth_mb"] - first["rss_growth_mb"]) / ((last["links"] - first["links"]) / 10000)
+            entry["mb_per_10k_links"] = round(slope, 2)
+            if slope > args.budget_mb_per_10k:
+                failures.append(f"{export}: {slope:.1f} MB/10k link > bütçe {args.budget_mb_per_10k}")
+        peak_growth = max((run.get("rss_growth_mb", 0) for run in ok_runs), default=0)
+        if peak_growth > args.max_peak_mb:
+            failures.append(f"{export}: tepe artış {peak_growth} MB > {args.max_peak_mb} MB")
+        if any("error" in run for run in runs):
+            failures.append(f"{export}: ölçüm hatası")
+        for run in runs:
+            if "error" not in run and run["status"] != 200:
+                failures.append(f"{export}: {run['links']:,} link için HTTP {run['status']}")
+        report["exports"][export] = entry
+
+        if args.tracemalloc_top:
+            for allocation in (runs[-1].get("top_allocators") or [])[:args.tracemalloc_top]:
+                print(f"    {allocation['size_kb']:>10,.1f} KB  {allocation['count']:>8,}  {allocation['location']}")
+
+    report["failures"] = failures
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print()
+    for export, entry in report["exports"].items():
+        print(f"{export:24s} eğim: {entry.get('mb_per_10k_links', '?')} MB / 10k link")
+    if failures:
+        print("\nBÜTÇE AŞILDI:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Scheduler (fetch + ingest) throughput benchmark'ı
+
+Yerel SerpApi stub'ını (`benchmarks.serpapi_stub`) başlatır, geçici bir
+DATA_DIR'de her site için K kelimelik ayar oluşturur ve
+`run_scheduled_searches`'i tüm siteler için APScheduler'daki gibi paralel
+thread'lerde çalıştırır. Sonuçlar run ledger'dan okunur: saniyedeki kelime
+ve satır sayısı, kelime başına süre ve SerpApi gecikmesi yüzdelikleri,
+hata ve tekrar deneme sayıları.
+
+Kullanım (backend dizininden):
+    python -m benchmarks.bench_scheduler --sites 6 --keywords 20 --latency-ms 500
+    python -m benchmarks.bench_scheduler --sites 6 --keywords 20 --error-rate 0.05 --max-rps 20 --output results/scheduler.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from benchmarks.generate_data import SITE_IDS
+from benchmarks.serpapi_stub import start_stub
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(pct: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))], 2)
+
+    return {"p50": pick(50), "p95": pick(95), "p99": pick(99), "max": round(ordered[-1], 2)}
+
+
+def prepare_sites(sites: List[str], keywords: int):
+    from app.database import get_session_maker, init_db, SearchSettings
+    for site_id in sites:
+        init_db(site_id)
+        db = get_session_maker(site_id)()
+        try:
+            db.add(SearchSettings(
+                search_query=", ".join(f"{site_id} kelime {i}" for i in range(keywords)),
+                location="Fatih,Istanbul",
+                enabled=True,
+                interval_hours=12
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+
+def collect(sites: List[str]) -> Dict:
+    from app.database import get_session_maker, RunLedger
+    durations, serpapi, rows, statuses, retries = [], [], 0, {}, 0
+    for site_id in sites:
+        db = get_session_maker(site_id)()
+        try:
+            for entry in db.query(RunLedger).all():
+                statuses[entry.status] = statuses.get(entry.status, 0) + 1
+                rows += entry.rows_inserted or 0
+                retries += entry.retries or 0
+                if entry.finished_at and entry.started_at:
+                    durations.append((entry.finished_at - entry.started_at).total_seconds() * 1000)
+                if entry.serpapi_latency_ms is not None:
+                    serpapi.append(entry.serpapi_latency_ms)
+        finally:
+            db.close()
+    return {
+        "statuses": statuses,
+        "rows_inserted": rows,
+        "retries": retries,
+        "keyword_ms": _percentiles(durations),
+        "serpapi_ms": _percentiles(serpapi),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scheduler fetch + ingest throughput benchmark'ı")
+    parser.add_argument("--sites", type=int, default=len(SITE_IDS), help=f"Site sayısı (en fazla {len(SITE_IDS)})")
+    parser.add_argument("--keywords", type=int, default=20, help="Site başına kelime")
+    parser.add_argument("--rounds", type=int, default=1, help="Kaç zamanlanmış çalıştırma turu")
+    parser.add_argument("--workers", type=int, default=10, help="Paralel site thread'i (APScheduler varsayılanı: 10)")
+    parser.add_argument("--results", type=int, default=10, help="Stub'ın döndüğü organik sonuç sayısı")
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float, default=0.0)
+    parser.add_argument("--data-dir", help="DATA_DIR (varsayılan: geçici dizin)")
+    parser.add_argument("--output", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args(argv)
+
+    sites = SITE_IDS[: max(1, min(args.sites, len(SITE_IDS)))]
+    server, url, stub = start_stub(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, max_rps=args.max_rps, results=args.results
+    )
+
+    # app modülleri import edilmeden önce ayarlanmalı
+    os.environ["DATA_DIR"] = os.path.abspath(args.data_dir or tempfile.mkdtemp(prefix="bench-scheduler-"))
+    os.environ["SERPAPI_URL"] = url
+    os.environ["SERPAPI_KEY"] = "stub"
+    os.environ["EMAIL_ENABLED"] = "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("SERPAPI_RETRY_BACKOFF", "0.2")
+
+    from app.logging_config import setup_logging, shutdown_logging
+    from app.scheduler import run_scheduled_searches
+    setup_logging()
+
+    prepare_sites(sites, args.keywords)
+    print(f"{len(sites)} site × {args.keywords} kelime × {args.rounds} tur, stub: {url}, DATA_DIR={os.environ['DATA_DIR']}")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for _ in range(args.rounds):
+            list(pool.map(run_scheduled_searches, sites))
+    elapsed = time.perf_counter() - started
+
+    summary = collect(sites)
+    keywords_done = sum(summary["statuses"].values())
+    result = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "sites": len(sites),
+            "keywords_per_site": args.keywords,
+            "rounds": args.rounds,
+            "workers": args.workers,
+            "stub": {
+                "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "error_rate": args.error_rate,
+                "rate_limit_rate": args.rate_limit_rate, "max_rps": args.max_rps, "results": args.results
+            },
+        },
+        "elapsed_s": round(elapsed, 3),
+        "keywords_per_s": round(keywords_done / elapsed, 2),
+        "rows_per_s": round(summary["rows_inserted"] / elapsed, 2),
+        "stub_requests": dict(stub.stats),
+        **summary,
+    }
+    shutdown_logging()
+    server.shutdown()
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+JSON serialization benchmark'ı
+
+10k satırlık bir link listesi için FastAPI'nin varsayılan yolu (Pydantic
+doğrulaması + jsonable_encoder + JSONResponse) ile orjson tabanlı
+`FastJSONResponse` / `rows_response` yolunu karşılaştırır; her yol için
+ortalama süre ve tracemalloc ile ölçülen tepe bellek kullanımı yazdırılır.
+
+Kullanım (backend dizininden):
+    python -m benchmarks.bench_serialization --rows 10000 --repeat 5
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from app.responses import FastJSONResponse, rows_response
+
+COLUMNS = ("id", "url", "domain", "title", "position", "snippet", "search_date", "total_results")
+
+
+class FilterLinkRow(BaseModel):
+    id: int
+    url: str
+    domain: str
+    title: str
+    position: int
+    snippet: str
+    search_date: datetime
+    total_results: int
+
+
+def make_rows(n: int) -> List[tuple]:
+    """filter-links sorgusunun döndürdüğü şekilde tuple satırlar üretir"""
+    base = datetime(2024, 1, 1)
+    return [
+        (
+            i,
+            f"https://example{i % 500}.com/path/{i}",
+            f"example{i % 500}.com",
+            f"Örnek başlık {i}",
+            i % 10 + 1,
+            "Lorem ipsum dolor sit amet, consectetur adipiscing elit " * 2,
+            base + timedelta(minutes=i),
+            123456
+        )
+        for i in range(n)
+    ]
+
+
+def pydantic_path(rows: List[tuple]) -> bytes:
+    """Eski yol: satır başına model + response_model doğrulaması + jsonable_encoder"""
+    models = [FilterLinkRow(**dict(zip(COLUMNS, row))) for row in rows]
+    adapter = TypeAdapter(List[FilterLinkRow])
+    validated = adapter.validate_python(models)
+    content = adapter.dump_python(validated, mode="json")
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def dict_jsonable_path(rows: List[tuple]) -> bytes:
+    """Dict listesi + jsonable_encoder + stdlib json"""
+    content = [
+        {**dict(zip(COLUMNS, row)), "search_date": row[6].isoformat()}
+        for row in rows
+    ]
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def orjson_dict_path(rows: List[tuple]) -> bytes:
+    """Dict listesi + FastJSONResponse (jsonable_encoder yok)"""
+    return FastJSONResponse([dict(zip(COLUMNS, row)) for row in rows]).body
+
+
+def orjson_rows_path(rows: List[tuple]) -> bytes:
+    """Sorgu tuple'larından doğrudan rows_response"""
+    return rows_response(COLUMNS, rows).body
+
+
+PATHS = {
+    "pydantic+jsonable_encoder": pydantic_path,
+    "dict+jsonable_encoder": dict_jsonable_path,
+    "orjson(dict)": orjson_dict_path,
+    "orjson(rows_response)": orjson_rows_path,
+}
+
+
+def measure(fn: Callable[[List[tuple]], bytes], rows: List[tuple], repeat: int) -> dict:
+    """Bir yolu `repeat` kez çalıştırır; ortalama/min süre ve tepe belleği döndürür"""
+    fn(rows)  # ısınma
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        body = fn(rows)
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    fn(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "avg_ms": sum(timings) / len(timings) * 1000,
+        "min_ms": min(timings) * 1000,
+        "peak_mb": peak / 1024 / 1024,
+        "body_kb": len(body) / 1024
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="JSON serialization benchmark")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    rows = make_rows(args.rows)
+    print(f"{args.rows} satır, {args.repeat} tekrar")
+    print(f"{'yol':<28}{'ort. ms':>10}{'min ms':>10}{'tepe MB':>10}{'boyut KB':>11}")
+    for name, fn in PATHS.items():
+        result = measure(fn, rows, args.repeat)
+        print(f"{name:<28}{result['avg_ms']:>10.1f}{result['min_ms']:>10.1f}"
+              f"{result['peak_mb']:>10.1f}{result['body_kb']:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
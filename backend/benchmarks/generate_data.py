@@ -0,0 +1,226 @@
+"""
+Sentetik SERP geçmişi üreticisi
+
+Site başına SQLite veritabanlarını gerçekçi arama geçmişiyle doldurur:
+N site × K kelime × R çalıştırma × P pozisyon (10-100). Aynı parametreler
+ve seed ile her zaman aynı veri üretilir.
+
+Churn modeli (kelime başına):
+- Her kelimenin Zipf dağılımlı bir domain havuzu ve domain başına birkaç URL'i vardır.
+- Her çalıştırmada sıralama bir önceki sıralamadan türetilir: komşu
+  pozisyonlar küçük olasılıkla yer değiştirir, bazı URL'ler listeden düşüp
+  havuzdan yenileriyle değiştirilir.
+- Nadiren "algoritma güncellemesi" olur ve sıralamanın büyük kısmı karışır.
+
+Kullanım (backend dizininden):
+    python -m benchmarks.generate_data --data-dir /tmp/bench-data --scale 1m
+    python -m benchmarks.generate_data --data-dir /tmp/bench-data --sites 3 --keywords 20 --runs 500 --positions 10
+"""
+import argparse
+import itertools
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+# Ölçek ön ayarları: (kelime, çalıştırma, pozisyon) -> varsayılan sitedeki link sayısı
+SCALES: Dict[str, Tuple[int, int, int]] = {
+    "10k": (5, 200, 10),        # 10.000 link
+    "1m": (10, 1000, 100),      # 1.000.000 link
+    "10m": (50, 2000, 100),     # 10.000.000 link
+}
+
+SITE_IDS = ['default', 'gala', 'hit', 'office', 'pipo', 'padisah']
+
+BATCH_SIZE = 50000
+
+
+def _zipf_weights(n: int, s: float = 1.1) -> List[float]:
+    return [1.0 / math.pow(rank, s) for rank in range(1, n + 1)]
+
+
+class KeywordHistory:
+    """Tek bir kelimenin çalıştırmalar arası sıralama geçmişini üretir"""
+
+    def __init__(self, rng: random.Random, keyword: str, positions: int, domains: int = 200, urls_per_domain: int = 8):
+        self.rng = rng
+        self.positions = positions
+        self.domains = [f"{keyword.replace(' ', '-')}-site{i}.com" for i in range(domains)]
+        self.domain_weights = list(itertools.accumulate(_zipf_weights(domains)))
+        self.urls_per_domain = urls_per_domain
+        self.ranking: List[Tuple[str, str]] = []
+        while len(self.ranking) < positions:
+            candidate = self._draw_url()
+            if candidate not in self.ranking:
+                self.ranking.append(candidate)
+
+    def _draw_url(self) -> Tuple[str, str]:
+        domain = self.rng.choices(self.domains, cum_weights=self.domain_weights)[0]
+        path = self.rng.randrange(self.urls_per_domain)
+        return f"https://www.{domain}/page/{path}", domain
+
+    def next_run(self, churn: float, swap: float, shake: float) -> List[Tuple[str, str]]:
+        rng = self.rng
+        ranking = self.ranking
+        if rng.random() < shake:
+            # Algoritma güncellemesi: ilk yarı korunur ama kendi içinde karışır, geri kalanı yenilenir
+            head = ranking[: self.positions // 2]
+            rng.shuffle(head)
+            ranking = head
+        else:
+            ranking = list(ranking)
+            for i in range(len(ranking) - 1):
+                if rng.random() < swap:
+                    ranking[i], ranking[i + 1] = ranking[i + 1], ranking[i]
+            ranking = [entry for entry in ranking if rng.random() >= churn]
+
+        present = set(ranking)
+        while len(ranking) < self.positions:
+            candidate = self._draw_url()
+            if candidate not in present:
+                # Yeni girenler genelde alt sıralardan girer
+                index = len(ranking) if rng.random() < 0.8 else rng.randrange(len(ranking) + 1)
+                ranking.insert(index, candidate)
+                present.add(candidate)
+        self.ranking = ranking
+        return ranking
+
+
+def generate_site(
+    site_id: str,
+    keywords: int,
+    runs: int,
+    positions: int,
+    seed: int,
+    interval_hours: int,
+    end: datetime,
+    churn: float,
+    swap: float,
+    shake: float
+) -> int:
+    """Bir siteyi üretir ve yazılan link sayısını döndürür"""
+    from sqlalchemy import insert
+    from app.database import get_engine, init_db, SearchSettings, SearchResult, SearchLink
+
+    init_db(site_id)
+    engine = get_engine(site_id)
+    keyword_names = [f"keyword {i}" for i in range(keywords)]
+    histories = [
+        KeywordHistory(random.Random(f"{seed}:{site_id}:{name}"), name, positions)
+        for name in keyword_names
+    ]
+    snippet = "Sentetik sonuç açıklaması " * 4
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        settings_id = conn.execute(insert(SearchSettings.__table__).values(
+            search_query=", ".join(keyword_names),
+            location="Fatih,Istanbul",
+            enabled=True,
+            interval_hours=interval_hours,
+            created_at=end,
+            updated_at=end
+        )).inserted_primary_key[0]
+        next_result_id = (conn.exec_driver_sql("SELECT COALESCE(MAX(id), 0) FROM search_results").scalar() or 0) + 1
+
+        results: List[dict] = []
+        links: List[dict] = []
+        written = 0
+        start = end - timedelta(hours=interval_hours * runs)
+        for run in range(runs):
+            run_time = start + timedelta(hours=interval_hours * run)
+            for k, history in enumerate(histories):
+                search_date = run_time + timedelta(seconds=5 * k)
+                result_id = next_result_id
+                next_result_id += 1
+                results.append({
+                    "id": result_id,
+                    "settings_id": settings_id,
+                    "search_query": keyword_names[k],
+                    "search_date": search_date,
+                    "total_results": 1000000 + result_id
+                })
+                for position, (url, domain) in enumerate(history.next_run(churn, swap, shake), start=1):
+                    links.append({
+                        "search_result_id": result_id,
+                        "url": url,
+                        "title": f"{domain} sayfa {position}",
+                        "snippet": snippet,
+                        "position": position,
+                        "domain": domain,
+                        "created_at": search_date
+                    })
+            if len(links) >= BATCH_SIZE:
+                conn.execute(insert(SearchResult.__table__), results)
+                conn.execute(insert(SearchLink.__table__), links)
+                written += len(links)
+                results, links = [], []
+        if results:
+            conn.execute(insert(SearchResult.__table__), results)
+            conn.execute(insert(SearchLink.__table__), links)
+            written += len(links)
+
+    # Domain rollup'ını da oluştur (share-of-voice / competitor-analysis için)
+    from app.database import get_session_maker
+    from app.share_of_voice import rebuild_domain_rollup
+    db = get_session_maker(site_id)()
+    try:
+        rebuild_domain_rollup(db)
+    finally:
+        db.close()
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sentetik SERP geçmişi üretir")
+    parser.add_argument("--data-dir", required=True, help="DATA_DIR (site veritabanlarının kök dizini)")
+    parser.add_argument("--scale", choices=sorted(SCALES), help="Hazır ölçek (kelime/çalıştırma/pozisyon)")
+    parser.add_argument("--sites", type=int, default=1, help=f"Site sayısı (en fazla {len(SITE_IDS)})")
+    parser.add_argument("--keywords", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--positions", type=int, default=10, help="Çalıştırma başına pozisyon (10-100)")
+    parser.add_argument("--interval-hours", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end", help="Son çalıştırma zamanı (YYYY-MM-DD, varsayılan: bugün 00:00 UTC)")
+    parser.add_argument("--churn", type=float, default=0.03, help="Çalıştırma başına URL'in listeden düşme olasılığı")
+    parser.add_argument("--swap", type=float, default=0.15, help="Komşu pozisyonların yer değiştirme olasılığı")
+    parser.add_argument("--shake", type=float, default=0.01, help="Algoritma güncellemesi olasılığı")
+    parser.add_argument("--force", action="store_true", help="Mevcut veritabanlarının üzerine yaz")
+    args = parser.parse_args(argv)
+
+    if args.scale:
+        args.keywords, args.runs, args.positions = SCALES[args.scale]
+    if not 10 <= args.positions <= 100:
+        parser.error("--positions 10 ile 100 arasında olmalı")
+    if not 1 <= args.sites <= len(SITE_IDS):
+        parser.error(f"--sites 1 ile {len(SITE_IDS)} arasında olmalı")
+
+    # app.database DATA_DIR'i import sırasında okur
+    os.environ["DATA_DIR"] = os.path.abspath(args.data_dir)
+    os.makedirs(os.environ["DATA_DIR"], exist_ok=True)
+
+    end = (
+        datetime.strptime(args.end, "%Y-%m-%d") if args.end
+        else datetime.now(timezone.utc).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    )
+
+    for site_id in SITE_IDS[: args.sites]:
+        db_path = os.path.join(os.environ["DATA_DIR"], site_id, "searchbot.db")
+        if os.path.exists(db_path):
+            if not args.force:
+                print(f"[{site_id}] {db_path} zaten var, atlanıyor (--force ile üzerine yazılır)")
+                continue
+            os.remove(db_path)
+        started = time.perf_counter()
+        written = generate_site(
+            site_id, args.keywords, args.runs, args.positions, args.seed,
+            args.interval_hours, end, args.churn, args.swap, args.shake
+        )
+        print(f"[{site_id}] {written:,} link yazıldı ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
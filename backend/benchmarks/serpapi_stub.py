@@ -0,0 +1,198 @@
+"""
+Yerel SerpApi yerine geçen test sunucusu
+
+`SERPAPI_URL=http://127.0.0.1:<port>/search` ile kullanılır. Kaydedilmiş
+SerpApi JSON yanıtlarını (dizindeki *.json dosyaları) ya da kelimeye göre
+deterministik üretilmiş sonuçları döner. Gecikme, hata oranı ve 429
+davranışı ayarlanabilir:
+
+    --latency-ms / --jitter-ms   Her yanıtın bekleme süresi (ortalama ± jitter)
+    --error-rate                 500 dönme olasılığı (0-1)
+    --rate-limit-rate            Rastgele 429 dönme olasılığı (0-1)
+    --max-rps                    Saniyedeki istek limiti; aşılırsa 429 + Retry-After
+
+Kullanım (backend dizininden):
+    python -m benchmarks.serpapi_stub --port 8765 --latency-ms 800 --error-rate 0.02
+    python -m benchmarks.serpapi_stub --recorded ./recorded-serpapi
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+class StubConfig:
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        max_rps: float = 0.0,
+        results: int = 10,
+        recorded: Optional[str] = None,
+        seed: int = 42
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.max_rps = max_rps
+        self.results = results
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.recorded: List[Dict] = []
+        if recorded:
+            for path in sorted(glob.glob(os.path.join(recorded, "*.json"))):
+                with open(path, encoding="utf-8") as f:
+                    self.recorded.append(json.load(f))
+
+        # İstatistikler ve max-rps için kayan pencere
+        self.stats = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0}
+        self.stats_lock = threading.Lock()
+        self._window: List[float] = []
+        self._calls: Dict[str, int] = {}
+
+    def random(self) -> float:
+        with self.rng_lock:
+            return self.rng.random()
+
+    def count(self, key: str):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def over_rate_limit(self) -> bool:
+        if self.max_rps <= 0:
+            return False
+        now = time.monotonic()
+        with self.stats_lock:
+            self._window = [t for t in self._window if now - t < 1.0]
+            if len(self._window) >= self.max_rps:
+                return True
+            self._window.append(now)
+            return False
+
+    def next_call(self, query: str) -> int:
+        with self.stats_lock:
+            self._calls[query] = self._calls.get(query, 0) + 1
+            return self._calls[query]
+
+
+def generated_response(query: str, call: int, results: int) -> Dict:
+    """Kelimeye göre deterministik, çağrıdan çağrıya hafif değişen organik sonuçlar"""
+    base = int(hashlib.md5(query.encode("utf-8")).hexdigest()[:8], 16)
+    rng = random.Random(base + call)
+    slug = query.replace(" ", "-")
+    candidates = [f"https://www.{slug}-site{i}.com/page/{(base + i) % 7}" for i in range(results * 2)]
+    ranking = candidates[:results]
+    # Her çağrıda birkaç komşu yer değiştirir, bazen alt sıralara yeni URL girer
+    for i in range(results - 1):
+        if rng.random() < 0.2:
+            ranking[i], ranking[i + 1] = ranking[i + 1], ranking[i]
+    if rng.random() < 0.3:
+        ranking[-1] = rng.choice(candidates[results:])
+    return {
+        "search_information": {"total_results": 1000000 + base % 1000, "time_taken_displayed": 0.42},
+        "organic_results": [
+            {"position": i, "link": url, "title": f"{query} sonuç {i}", "snippet": f"{query} açıklama {i}"}
+            for i, url in enumerate(ranking, start=1)
+        ],
+    }
+
+
+def make_handler(config: StubConfig):
+    class SerpApiStubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            if parsed.path != "/search":
+                self._send(404, {"error": "not found"})
+                return
+            query = parse_qs(parsed.query).get("q", [""])[0]
+            config.count("requests")
+
+            delay = config.latency_ms + (config.random() * 2 - 1) * config.jitter_ms
+            if delay > 0:
+                time.sleep(delay / 1000.0)
+
+            if config.over_rate_limit() or config.random() < config.rate_limit_rate:
+                config.count("rate_limited")
+                self._send(429, {"error": "rate limited"}, {"Retry-After": "1"})
+                return
+            if config.random() < config.error_rate:
+                config.count("errors")
+                self._send(500, {"error": "stub server error"})
+                return
+
+            call = config.next_call(query)
+            if config.recorded:
+                payload = config.recorded[(call - 1) % len(config.recorded)]
+            else:
+                payload = generated_response(query, call, config.results)
+            config.count("ok")
+            self._send(200, payload)
+
+    return SerpApiStubHandler
+
+
+def start_stub(host: str = "127.0.0.1", port: int = 0, **options) -> Tuple[ThreadingHTTPServer, str, StubConfig]:
+    """Sunucuyu arka plan thread'inde başlatır; (server, search URL, config) döndürür"""
+    config = StubConfig(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="serpapi-stub", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/search", config
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Yerel SerpApi test sunucusu")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float, default=0.0)
+    parser.add_argument("--results", type=int, default=10, help="Üretilen organik sonuç sayısı")
+    parser.add_argument("--recorded", help="Kaydedilmiş SerpApi JSON yanıtlarının dizini")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    server, url, config = start_stub(
+        args.host, args.port,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, max_rps=args.max_rps, results=args.results,
+        recorded=args.recorded, seed=args.seed
+    )
+    print(f"SerpApi stub çalışıyor: SERPAPI_URL={url}")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"istatistik: {config.stats}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,44 @@
 import React, { useState, useEffect } from 'react'
 import axios from 'axios'
+import {
+  LineChart,
+  Line,
+  XAxis,
+  YAxis,
+  CartesianGrid,
+  Tooltip,
+  Legend,
+  ResponsiveContainer
+} from 'recharts'
+
+const COLORS = ['#667eea', '#764ba2', '#f093fb', '#4facfe', '#43e97b']
 
 function Analytics({ API_BASE, siteId = 'default' }) {
   const [competitors, setCompetitors] = useState([])
+  const [shareOfVoice, setShareOfVoice] = useState({ data: [], domains: [] })
 
   useEffect(() => {
     fetchCompetitors()
+    fetchShareOfVoice()
   }, [siteId])
 
+  const fetchShareOfVoice = async () => {
+    try {
+      const res = await axios.get(`${API_BASE}/analytics/share-of-voice?days=30&top=5&site_id=${siteId}`).catch(() => ({ data: { dates: [], series: [] } }))
+      const { dates = [], series = [] } = res.data || {}
+      // Recharts için tarih başına tek satır: { date, domain1: pay, domain2: pay, ... }
+      const data = dates.map((date, i) => {
+        const row = { date }
+        series.forEach(s => { row[s.domain] = s.market_share[i] })
+        return row
+      })
+      setShareOfVoice({ data, domains: series.map(s => s.domain) })
+    } catch (error) {
+      console.error('Görünürlük payı yüklenemedi:', error)
+      setShareOfVoice({ data: [], domains: [] })
+    }
+  }
+
   const fetchCompetitors = async () => {
     try {
       const res = await axios.get(`${API_BASE}/analytics/competitor-analysis?days=30&site_id=${siteId}`).catch(() => ({ data: [] }))
@@ -40,6 +71,7 @@ function Analytics({ API_BASE, siteId = 'default' }) {
                 <th>En İyi</th>
                 <th>En Kötü</th>
                 <th>Benzersiz URL</th>
+                <th>Pazar Payı</th>
               </tr>
             </thead>
             <tbody>
@@ -55,6 +87,7 @@ function Analytics({ API_BASE, siteId = 'default' }) {
                     <span className="badge badge-danger">#{comp.worst_position}</span>
                   </td>
                   <td>{comp.unique_urls}</td>
+                  <td>%{(comp.market_share || 0).toFixed(1)}</td>
                 </tr>
               ))}
             </tbody>
@@ -62,6 +95,30 @@ function Analytics({ API_BASE, siteId = 'default' }) {
         )}
       </div>
 
+      {shareOfVoice.data.length > 0 && (
+        <div className="card">
+          <h2>📊 Görünürlük Payı (CTR Ağırlıklı)</h2>
+          <ResponsiveContainer width="100%" height={350}>
+            <LineChart data={shareOfVoice.data}>
+              <CartesianGrid strokeDasharray="3 3" />
+              <XAxis dataKey="date" />
+              <YAxis unit="%" />
+              <Tooltip />
+              <Legend />
+              {shareOfVoice.domains.map((domain, index) => (
+                <Line
+                  key={domain}
+                  type="monotone"
+                  dataKey={domain}
+                  stroke={COLORS[index % COLORS.length]}
+                  strokeWidth={2}
+                />
+              ))}
+            </LineChart>
+          </ResponsiveContainer>
+        </div>
+      )}
+
     </div>
   )
 }
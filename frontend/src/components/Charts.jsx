@@ -33,26 +33,30 @@ function Charts({ API_BASE, siteId = 'default' }) {
     try {
       const urlParam = selectedUrl ? `&url=${encodeURIComponent(selectedUrl)}` : ''
       const [trendRes, domainRes] = await Promise.all([
-        axios.get(`${API_BASE}/analytics/position-trend?days=30&site_id=${siteId}${urlParam}`).catch(() => ({ data: { daily_data: {} } })),
+        axios.get(`${API_BASE}/analytics/position-trend?days=30&format=columnar&site_id=${siteId}${urlParam}`).catch(() => ({ data: { dates: [], positions: [] } })),
         axios.get(`${API_BASE}/analytics/domain-distribution?days=30&limit=10&site_id=${siteId}`).catch(() => ({ data: [] }))
       ])
 
-      // Position trend verilerini formatla
+      // Columnar trend: her tarih için URL'lerin ortalama pozisyonu (null = o gün görünmedi)
       const trendData = []
-      if (trendRes.data && trendRes.data.daily_data) {
-        Object.keys(trendRes.data.daily_data).sort().forEach(date => {
-          const dayData = trendRes.data.daily_data[date]
-          if (Array.isArray(dayData)) {
-            dayData.forEach(item => {
-              trendData.push({
-                date: date,
-                position: item.avg_position,
-                domain: item.domain
-              })
-            })
+      const { dates = [], positions = [] } = trendRes.data || {}
+      dates.forEach((date, dayIndex) => {
+        let sum = 0
+        let count = 0
+        for (const row of positions) {
+          const position = row[dayIndex]
+          if (position !== null && position !== undefined) {
+            sum += position
+            count += 1
           }
-        })
-      }
+        }
+        if (count > 0) {
+          trendData.push({
+            date: date,
+            position: Math.round((sum / count) * 100) / 100
+          })
+        }
+      })
       setPositionTrend(trendData)
 
       // Domain distribution - boş array kontrolü